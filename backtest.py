@@ -0,0 +1,122 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss
+
+import preptrainingdata
+import ratingengine
+import trainmodel
+
+# walk-forward backtest: train on every fight before period T, predict the
+# fights in T, move on to T + 1. No future fight ever leaks into training,
+# unlike the random split in trainmodel.py. The rows come from
+# preptrainingdata.write, so the backtest scores exactly the features (and
+# corner swap) the model is trained on. Folds run in a process pool; the .npy
+# files it writes are memory-mapped by every worker, so only (start, end) day
+# bounds are pickled per fold.
+
+# config
+FIRST_YEAR = 2010
+LAST_YEAR = 2025
+WORKERS = os.cpu_count() or 1
+
+_data = {} # per worker: memory-mapped X / y / day
+
+def build_features(data_dir, seed=preptrainingdata.SEED):
+    """
+    Writes the training rows of every decided fight into `data_dir` and
+    returns them memory-mapped as (X, y, day), oldest first.
+    """
+    preptrainingdata.write(ratingengine.run(), out_dir=data_dir, csv_path=None, seed=seed)
+    return preptrainingdata.load(data_dir)
+
+def year_folds(day, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    """
+    [(label, start day, end day)], one fold per calendar year.
+    """
+    folds = []
+    for year in range(first_year, last_year + 1):
+        start = ratingengine.parse_date(f"January 01, {year}")
+        end = ratingengine.parse_date(f"January 01, {year + 1}")
+        if np.any((day >= start) & (day < end)):
+            folds.append((str(year), start, end))
+    return folds
+
+def event_folds(day, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    """
+    One fold per event date (much slower: one model per card).
+    """
+    start = ratingengine.parse_date(f"January 01, {first_year}")
+    end = ratingengine.parse_date(f"January 01, {last_year + 1}")
+    days = np.unique(day[(day >= start) & (day < end)])
+    return [(ratingengine.day_to_datetime(d).date().isoformat(), int(d), int(d) + 1) for d in days]
+
+
+def _init_worker(data_dir):
+    _data['X'], _data['y'], _data['day'] = preptrainingdata.load(data_dir)
+
+def _run_fold(fold):
+    label, start, end = fold
+    day = _data['day']
+    # history is date sorted, so both sets are contiguous slices
+    train_end = int(np.searchsorted(day, start))
+    test_end = int(np.searchsorted(day, end))
+    X, y = _data['X'], _data['y']
+
+    model = trainmodel.make_model()
+    model.fit(X[:train_end], y[:train_end])
+    prob = model.predict_proba(X[train_end:test_end])[:, 1]
+    return label, train_end, np.asarray(y[train_end:test_end]), prob
+
+def _scores(y, prob):
+    return {
+        'accuracy': accuracy_score(y, prob >= 0.5),
+        'log_loss': log_loss(y, prob, labels=[0, 1]),
+        'brier': brier_score_loss(y, prob),
+    }
+
+
+def run(folds="year", workers=WORKERS, first_year=FIRST_YEAR, last_year=LAST_YEAR):
+    """
+    Runs the walk-forward backtest. Returns a DataFrame with one row per
+    fold plus an 'overall' row pooled over every test prediction.
+    """
+    start = time.perf_counter()
+    data_dir = tempfile.mkdtemp(prefix="backtest_")
+    try:
+        day = build_features(data_dir)[2]
+        fold_list = (event_folds if folds == "event" else year_folds)(day, first_year, last_year)
+        del day # the memmap has to be closed before the directory goes
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir,)) as pool:
+                results = list(pool.map(_run_fold, fold_list))
+        else:
+            _init_worker(data_dir)
+            results = [_run_fold(fold) for fold in fold_list]
+    finally:
+        _data.clear()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    rows = []
+    for label, n_train, y_test, prob in results:
+        rows.append({'fold': label, 'train': n_train, 'test': len(y_test), **_scores(y_test, prob)})
+    all_y = np.concatenate([r[2] for r in results])
+    all_prob = np.concatenate([r[3] for r in results])
+    rows.append({'fold': 'overall', 'train': '-', 'test': len(all_y), **_scores(all_y, all_prob)})
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n{len(fold_list)} folds with {workers} worker(s) in {time.perf_counter() - start:.1f}s")
+    return report
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else WORKERS
+    run(folds="event" if "--by-event" in sys.argv else "year", workers=workers)
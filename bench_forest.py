@@ -0,0 +1,72 @@
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# sklearn RandomForestClassifier vs the packed numpy forest (forestmodel.py):
+# cold start (imports + load) in a fresh process, single-row and batch
+# predict_proba latency, and a check that the probabilities are identical.
+
+ROWS = 10000
+SINGLE_CALLS = 200
+BATCH_ROUNDS = 5
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+if {packed}:
+    import forestmodel
+    model = forestmodel.load()
+else:
+    import joblib
+    model = joblib.load(forestmodel_path)
+print(json.dumps({{'load_ms': (time.perf_counter() - start) * 1000, 'sklearn_imported': 'sklearn' in sys.modules}}))
+"""
+
+def cold_start(packed):
+    code = CHILD.format(packed=packed).replace("forestmodel_path", repr("ufc_predictor_v2.pkl"))
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+def main():
+    import warnings
+    warnings.filterwarnings("ignore")
+    import joblib
+    import forestmodel
+    import predictor
+
+    sk = joblib.load(predictor.MODEL_FILE)
+    packed = forestmodel.load()
+    if packed is None:
+        sys.exit("No current ufc_predictor_v2.npz, run python forestmodel.py first")
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        'elo_diff': rng.normal(0, 150, ROWS),
+        'streak_diff': rng.integers(-6, 7, ROWS).astype(float),
+        'months_since_diff': rng.normal(0, 15, ROWS),
+        'exp_diff': rng.integers(-25, 26, ROWS).astype(float),
+    }, columns=predictor.FEATURES)
+    one = X.iloc[:1]
+
+    identical = np.array_equal(sk.predict_proba(X), packed.predict_proba(X))
+    print(f"predict_proba identical on {ROWS} rows: {identical}\n")
+
+    print(f"{'':<8} {'cold load ms':>13} {'1 row ms':>9} {f'{ROWS} rows ms':>12}")
+    for label, model, is_packed in (("sklearn", sk, False), ("packed", packed, True)):
+        cold = cold_start(is_packed)
+        single = timed(lambda: model.predict_proba(one), SINGLE_CALLS)
+        batch = timed(lambda: model.predict_proba(X), BATCH_ROUNDS)
+        print(f"{label:<8} {cold['load_ms']:>13.1f} {single:>9.3f} {batch:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+
+import glickoengine
+import ratingengine
+import tuneelo
+
+# elo loop (ratingengine.replay) vs the batched Glicko-2 engine on the full
+# fight history: replay time, and how well each one's pre-fight win
+# probability predicted the actual winner (every row is a win for the
+# winner, so log-loss is just -log p). The glicko numbers are also split by
+# the combined deviation going into the fight.
+
+ROUNDS = 5
+EVAL_FROM = "January 01, 2005" # later window, after both engines have warmed up
+
+def best_time(fn, *args):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        out = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+def main():
+    history = ratingengine.load_history()
+    elo_secs, elo = best_time(ratingengine.replay, history)
+    glicko_secs, glicko = best_time(glickoengine.replay, history)
+
+    p_elo = ratingengine.get_expected_score(elo.elo_w, elo.elo_l)
+    p_glicko = glicko.expected
+    cut = int(np.searchsorted(history.day, ratingengine.parse_date(EVAL_FROM)))
+
+    print(f"{len(history)} fights, best of {ROUNDS}")
+    print(f"{'engine':<10} {'replay ms':>10} {'window':<8} {'log-loss':>9} {'brier':>7} {'accuracy':>9}")
+    for name, secs, p in (("elo", elo_secs, p_elo), ("glicko-2", glicko_secs, p_glicko)):
+        for window, rows in (("all", slice(None)), ("2005+", slice(cut, None))):
+            s = tuneelo.scores(p[rows])
+            print(f"{name:<10} {secs * 1000:>10.1f} {window:<8} {s['log_loss']:>9.4f} {s['brier']:>7.4f} {s['accuracy']:>9.2%}")
+
+    print("\nglicko-2 by combined RD going into the fight (2005+):")
+    rd = np.sqrt(glicko.rd_w ** 2 + glicko.rd_l ** 2)[cut:]
+    edges = np.quantile(rd, [0, 1 / 3, 2 / 3, 1])
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        rows = (rd >= lo) & (rd <= hi)
+        s_g, s_e = tuneelo.scores(p_glicko[cut:][rows]), tuneelo.scores(p_elo[cut:][rows])
+        confidence = np.mean(np.abs(p_glicko[cut:][rows] - 0.5)) + 0.5
+        print(f"  RD {lo:6.1f}-{hi:6.1f}: {rows.sum():5d} fights, mean confidence {confidence:.3f},"
+              f" log-loss glicko {s_g['log_loss']:.4f} / elo {s_e['log_loss']:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import htmlparsers
+from database import STAT_COLUMNS
+
+# compares the html parser backends on the synthetic ufcstats pages in
+# fixtures/ufcstats/synthetic (rebuilt from ufc_data.db rows in the site's
+# markup, not downloaded; see the README there): checks they agree with html.parser, then reports
+# pages/sec and peak memory. Each backend runs in its own process so the
+# peak RSS numbers don't bleed into each other.
+#
+#   python bench_parsers.py --check   -> backends agree, fight-details pages parse to the known stats
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ufcstats", "synthetic")
+ROUNDS = 5
+
+# fight-details fixture -> (fighters, rounds, first fighter's round 2 in STAT_COLUMNS order), read off the page by hand
+DETAILS_EXPECTED = {
+    'e0f7a1a2b6a54d4f': (
+        [('Khabib Nurmagomedov', '032cc3922d871c7f'), ('Edson Barboza', 'a7f1ae5f1bc1f7ba')],
+        3,
+        (0, 31, 54, 55, 86, 3, 4, 0, 0, 220, 22, 43, 6, 8, 3, 3, 3, 8, 1, 2, 27, 44),
+    ),
+}
+
+def load_fixtures():
+    with open(os.path.join(FIXTURES, "events_completed.html"), "rb") as f:
+        listing = f.read()
+    events = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "event-details_*.html"))):
+        event_id = os.path.basename(path)[len("event-details_"):-len(".html")]
+        with open(path, "rb") as f:
+            events.append((event_id, f.read()))
+    return listing, events
+
+def load_details():
+    details = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "fight-details_*.html"))):
+        with open(path, "rb") as f:
+            details.append((os.path.basename(path)[len("fight-details_"):-len(".html")], f.read()))
+    return details
+
+def parse_all(backend, listing, events):
+    return htmlparsers.parse_event_list(listing, backend), [htmlparsers.parse_event_fights(e, html, backend) for e, html in events]
+
+def run_backend(backend):
+    """
+    Child process: time the backend and report peak RSS growth as JSON.
+    """
+    listing, events = load_fixtures()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for event_id, html in events:
+            htmlparsers.parse_event_fights(event_id, html, backend)
+    detail_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        htmlparsers.parse_event_list(listing, backend)
+    listing_secs = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        'backend': backend,
+        'detail_pages_per_sec': ROUNDS * len(events) / detail_secs,
+        'listing_pages_per_sec': ROUNDS / listing_secs,
+        'peak_rss_growth_kb': rss_after - rss_before,
+    }))
+
+def check():
+    """
+    Every backend matches html.parser on all fixtures, and the fight-details
+    pages give the fighters and per round stats in DETAILS_EXPECTED. Returns True if so.
+    """
+    listing, events = load_fixtures()
+    details = load_details()
+    ok = True
+    reference = parse_all("html.parser", listing, events)
+    details_ref = {fight: htmlparsers.parse_fight_details(html, "html.parser") for fight, html in details}
+    for backend in htmlparsers.BACKENDS:
+        if parse_all(backend, listing, events) != reference:
+            print(f"FAIL: {backend} event pages differ from html.parser")
+            ok = False
+        if {fight: htmlparsers.parse_fight_details(html, backend) for fight, html in details} != details_ref:
+            print(f"FAIL: {backend} fight-details pages differ from html.parser")
+            ok = False
+
+    for fight, (people, rows) in details_ref.items():
+        if fight not in DETAILS_EXPECTED:
+            continue
+        names, rounds, round_2 = DETAILS_EXPECTED[fight]
+        got = {(r, side): values for r, side, values in rows}
+        if people != names or {r for r, _ in got} != set(range(1, rounds + 1)) or got.get((2, 0)) != round_2:
+            print(f"FAIL: fight-details {fight} parsed to {people}, {sorted(got)}")
+            ok = False
+        # significant strikes split two ways must add up in every round
+        for (r, side), values in got.items():
+            stat = dict(zip(STAT_COLUMNS, values))
+            if not stat['sig_landed'] == stat['head_landed'] + stat['body_landed'] + stat['leg_landed'] \
+                    == stat['distance_landed'] + stat['clinch_landed'] + stat['ground_landed']:
+                print(f"FAIL: fight-details {fight} round {r} side {side} strikes don't add up")
+                ok = False
+
+    print(f"{len(events)} event pages, {len(details)} fight-details pages: {'ok' if ok else 'FAILED'}")
+    return ok
+
+def main():
+    listing, events = load_fixtures()
+    print(f"{len(events)} event pages + events listing, {ROUNDS} rounds each\n")
+
+    # every backend has to agree with the original html.parser path
+    reference = parse_all("html.parser", listing, events)
+    for backend in htmlparsers.BACKENDS:
+        if parse_all(backend, listing, events) != reference:
+            print(f"WARNING: {backend} output differs from html.parser")
+
+    print(f"{'backend':<12} {'detail pages/s':>15} {'listing pages/s':>16} {'peak RSS +KB':>13}")
+    for backend in htmlparsers.BACKENDS:
+        out = subprocess.run([sys.executable, __file__, "--backend", backend], capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout)
+        print(f"{backend:<12} {r['detail_pages_per_sec']:>15.1f} {r['listing_pages_per_sec']:>16.1f} {r['peak_rss_growth_kb']:>13}")
+
+if __name__ == "__main__":
+    if "--backend" in sys.argv:
+        run_backend(sys.argv[sys.argv.index("--backend") + 1])
+    elif "--check" in sys.argv:
+        sys.exit(0 if check() else 1)
+    else:
+        main()
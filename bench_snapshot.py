@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+import time
+
+# csv vs binary snapshot for fighter_stats: load time, cold start of a fresh
+# process and memory. Needs fighter_stats.npz (python statssnapshot.py).
+
+ROUNDS = 20
+
+CHILD = """
+import json, resource, time
+start = time.perf_counter()
+import pandas as pd
+import statssnapshot
+imported = time.perf_counter()
+df = statssnapshot.load_stats() if {snapshot} else pd.read_csv(statssnapshot.STATS_FILE)
+loaded = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'load_ms': (loaded - imported) * 1000,
+    'frame_kb': df.memory_usage(deep=True).sum() / 1024,
+    'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}}))
+"""
+
+def cold_start(snapshot):
+    out = subprocess.run([sys.executable, "-c", CHILD.format(snapshot=snapshot)], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def warm_load(fn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+def main():
+    import pandas as pd
+    import statssnapshot
+
+    csv_ms = warm_load(lambda: pd.read_csv(statssnapshot.STATS_FILE))
+    npz_ms = warm_load(lambda: statssnapshot.load_stats())
+
+    print(f"{'':<10} {'load ms':>8} {'cold load ms':>13} {'frame KB':>9} {'peak RSS KB':>12}")
+    for label, snapshot, warm in (("csv", False, csv_ms), ("snapshot", True, npz_ms)):
+        r = cold_start(snapshot)
+        print(f"{label:<10} {warm:>8.2f} {r['load_ms']:>13.2f} {r['frame_kb']:>9.0f} {r['peak_rss_kb']:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+
+import database
+
+# end to end benchmarks for the data pipeline: parsing the saved ufcstats
+# pages, then process_history (eloengine.py), the stats export, feature
+# generation (preptrainingdata.py), training and single / batch prediction
+# on synthetic fight histories of 10k, 100k and 1M fights.
+#
+# the histories are generated from a fixed seed straight into the
+# ufc_data.db schema (same seed + GENERATOR_VERSION = same rows), so only
+# this generator is checked in; the databases are built on first use and
+# cached in DATA_DIR. Every benchmark runs its real script in a fresh
+# process inside a scratch copy of the db, so the numbers include the
+# script's own imports and IO and peak RSS is per stage.
+#
+#   python bench_suite.py                     -> all sizes, writes RESULTS_FILE
+#   python bench_suite.py --sizes 10k,100k --only process_history,train
+#   python bench_suite.py --save-baseline     -> also saves the run as BASELINE_FILE
+#   python bench_suite.py --compare [file]    -> flags anything REGRESSION times slower / bigger than the baseline
+#   --repeat N keeps the fastest of N runs of every benchmark, for noisy machines
+
+# config
+DATA_DIR = "bench_data"
+RESULTS_FILE = "bench_results.json"
+BASELINE_FILE = "bench_baseline.json"
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+SEED = 7
+GENERATOR_VERSION = 1 # bump when make_history changes, cached dbs get rebuilt
+REGRESSION = 1.2 # allowed slowdown / memory growth before --compare fails
+MIN_SECONDS = 0.05 # faster than this is timer noise, never a regression
+
+PARSE_ROUNDS = 5
+SINGLE_CALLS = 500
+BATCH_ROWS = 10_000
+
+# shape of the synthetic histories, roughly the real table
+FIGHTS_PER_EVENT = 12
+FIGHTS_PER_FIGHTER = 6.4 # appearances per fighter over a career
+ROSTER = 400 # fighters active at any time
+SPAN_DAYS = 11_700 # ~32 years of events, one per day once there are more events than that
+LAST_DAY = 20435 # 2025-12-13
+DRAW_RATE = 0.02
+METHODS = ['U-DEC', 'S-DEC', 'KO/TKO Punches', 'KO/TKO Kick', 'SUB Rear Naked Choke', 'SUB Guillotine Choke', 'M-DEC']
+METHOD_P = [0.36, 0.10, 0.25, 0.05, 0.12, 0.08, 0.04]
+WEIGHT_CLASSES = [
+    'Flyweight', 'Bantamweight', 'Featherweight', 'Lightweight', 'Welterweight',
+    'Middleweight', 'Light Heavyweight', 'Heavyweight', "Women's Strawweight", "Women's Flyweight",
+]
+
+BENCHMARKS = ['parse', 'process_history', 'stats_export', 'features', 'train', 'predict_single', 'predict_batch']
+PER_SIZE = BENCHMARKS[1:] # parse only reads the fixtures
+
+
+# synthetic histories
+def history_path(size, seed=SEED):
+    return os.path.join(DATA_DIR, f"history_{size}_s{seed}_v{GENERATOR_VERSION}.db")
+
+def make_history(path, n_fights, seed=SEED):
+    """
+    Writes a deterministic history of `n_fights` fights to a new db at `path`.
+    Fighters debut in id order and stay on a ROSTER sized window, so careers
+    overlap like the real ones; winners come from a hidden skill.
+    """
+    rng = np.random.default_rng([seed, n_fights])
+    n_events = -(-n_fights // FIGHTS_PER_EVENT)
+    n_fighters = max(ROSTER, int(2 * n_fights / FIGHTS_PER_FIGHTER))
+
+    # fighters
+    skill = rng.normal(0, 1, n_fighters)
+    home_class = rng.integers(0, len(WEIGHT_CLASSES), n_fighters)
+
+    # fights: both corners drawn from the roster window at that point of time
+    top = np.minimum(n_fighters, (np.arange(n_fights) + 1) * (n_fighters - ROSTER) // n_fights + ROSTER)
+    a = top - 1 - rng.integers(0, ROSTER, n_fights)
+    b = top - 1 - rng.integers(0, ROSTER - 1, n_fights)
+    b = np.where(b == a, top - ROSTER, b) # never fight yourself
+    p_a = 1 / (1 + np.exp(-1.2 * (skill[a] - skill[b])))
+    a_won = rng.random(n_fights) < p_a
+    winner, loser = np.where(a_won, a, b), np.where(a_won, b, a)
+    outcome = np.where(rng.random(n_fights) < DRAW_RATE, database.DRAW, database.WIN)
+    method = rng.choice(len(METHODS), n_fights, p=METHOD_P)
+    decision = np.char.endswith(np.array(METHODS)[method], 'DEC')
+    rounds = np.where(decision, 3, rng.integers(1, 4, n_fights))
+    seconds = np.where(decision, 300, rng.integers(10, 300, n_fights))
+
+    # events, oldest first, ending on LAST_DAY
+    spacing = max(1, SPAN_DAYS // n_events)
+    event_day = LAST_DAY - (n_events - 1 - np.arange(n_events)) * spacing
+    fight_event = np.arange(n_fights) // FIGHTS_PER_EVENT
+
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = database.connect(tmp)
+    with conn:
+        conn.executemany("INSERT INTO fighters (id, name) VALUES (?, ?)", ((i + 1, f"Fighter {i:07d}") for i in range(n_fighters)))
+        conn.executemany(
+            "INSERT INTO events (id, name, event_date, event_day, location, url) VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"{e:016x}", f"Synthetic {e}", (database.EPOCH + timedelta(days=d)).date().isoformat(), int(d), "Nowhere", "")
+             for e, d in enumerate(event_day.tolist())),
+        )
+        conn.executemany('''
+            INSERT INTO fights (fight_id, event_id, event_day, fighter_a, fighter_b, outcome, method, round, time, weight_class)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            (f"{e:016x}_{i}", f"{e:016x}", int(event_day[e]), w + 1, l + 1, o, METHODS[m], r, f"{s // 60}:{s % 60:02d}", WEIGHT_CLASSES[home_class[w]])
+            for i, (e, w, l, o, m, r, s) in enumerate(zip(
+                fight_event.tolist(), winner.tolist(), loser.tolist(), outcome.tolist(), method.tolist(), rounds.tolist(), seconds.tolist()))
+        ))
+    conn.close()
+    os.replace(tmp, path)
+
+def fights_hash(path):
+    """
+    sha256 of the fights table, to check a cached history is the one the seed makes.
+    """
+    h = hashlib.sha256()
+    conn = database.connect(path)
+    for row in conn.execute("SELECT * FROM fights ORDER BY rowid"):
+        h.update(repr(row).encode())
+    conn.close()
+    return h.hexdigest()
+
+def ensure_history(size, seed=SEED):
+    path = history_path(size, seed)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"Generating {size} history ({SIZES[size]} fights)...")
+        start = time.perf_counter()
+        make_history(path, SIZES[size], seed)
+        print(f"  {path} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+# benchmarks, each one runs in a child process inside the scratch dir
+@contextlib.contextmanager
+def _argv(*args):
+    saved = sys.argv
+    sys.argv = list(args)
+    try:
+        yield
+    finally:
+        sys.argv = saved
+
+def _n_fights():
+    conn = database.connect(database.DB_NAME)
+    n = conn.execute("SELECT COUNT(*) FROM fights").fetchone()[0]
+    conn.close()
+    return n
+
+def bench_parse():
+    import bench_parsers
+    import htmlparsers
+    listing, events = bench_parsers.load_fixtures()
+    start = time.perf_counter()
+    for _ in range(PARSE_ROUNDS):
+        htmlparsers.parse_event_list(listing)
+        for event_id, html in events:
+            htmlparsers.parse_event_fights(event_id, html)
+    return time.perf_counter() - start, PARSE_ROUNDS * (len(events) + 1), "pages"
+
+def bench_process_history():
+    import eloengine
+    start = time.perf_counter()
+    with _argv("eloengine.py", "--full"):
+        eloengine.process_history()
+    return time.perf_counter() - start, _n_fights(), "fights"
+
+def bench_stats_export():
+    import exportcurrentstats
+    start = time.perf_counter()
+    with _argv("exportcurrentstats.py", "--full"):
+        exportcurrentstats.main()
+    return time.perf_counter() - start, _n_fights(), "fights"
+
+def bench_features():
+    import preptrainingdata
+    start = time.perf_counter()
+    with _argv("preptrainingdata.py"):
+        preptrainingdata.main()
+    return time.perf_counter() - start, preptrainingdata.read_manifest()['rows'], "rows"
+
+def bench_train():
+    import preptrainingdata
+    import trainmodel
+    start = time.perf_counter()
+    trainmodel.main()
+    return time.perf_counter() - start, preptrainingdata.read_manifest()['rows'], "rows"
+
+def _predictor_pairs(n):
+    import predictor
+    model = predictor.MatchupPredictor.from_files()
+    names = model.stats['Fighter'].drop_duplicates().to_numpy()
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(0, len(names), n)
+    b = (a + 1 + rng.integers(0, len(names) - 1, n)) % len(names)
+    return model, names[a].tolist(), names[b].tolist()
+
+def bench_predict_single():
+    model, fighters_a, fighters_b = _predictor_pairs(SINGLE_CALLS)
+    start = time.perf_counter()
+    for x, y in zip(fighters_a, fighters_b):
+        model.predict_one(x, y)
+    return time.perf_counter() - start, SINGLE_CALLS, "predictions"
+
+def bench_predict_batch():
+    model, fighters_a, fighters_b = _predictor_pairs(BATCH_ROWS)
+    start = time.perf_counter()
+    model.predict(fighters_a, fighters_b)
+    return time.perf_counter() - start, BATCH_ROWS, "predictions"
+
+def run_child(name):
+    """
+    Child process: runs one benchmark in the current directory and prints its numbers as JSON.
+    """
+    import warnings
+    warnings.filterwarnings("ignore")
+    with contextlib.redirect_stdout(io.StringIO()): # the scripts' own progress output
+        seconds, items, unit = globals()[f"bench_{name}"]()
+    print(json.dumps({
+        'wall_s': seconds,
+        'items': items,
+        'unit': unit,
+        'per_sec': items / seconds if seconds else None,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def run_benchmark(name, workdir, repeat=1):
+    """
+    Fastest of `repeat` runs, None if the benchmark failed.
+    """
+    runs = [_run_once(name, workdir) for _ in range(repeat)]
+    if None in runs:
+        return None
+    return min(runs, key=lambda r: r['wall_s'])
+
+def _run_once(name, workdir):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    out = subprocess.run([sys.executable, os.path.join(here, "bench_suite.py"), "--child", name],
+                         cwd=workdir, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"{name} failed")
+        return None
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run_suite(sizes, only=None, seed=SEED, repeat=1):
+    """
+    {'<benchmark>@<size>': numbers}, benchmarks in pipeline order so every stage finds its inputs.
+    """
+    only = set(only or BENCHMARKS)
+    results = {}
+    if 'parse' in only:
+        results['parse@fixtures'] = run_benchmark('parse', ".", repeat)
+        _print_row('parse@fixtures', results['parse@fixtures'])
+
+    for size in sizes:
+        names = [b for b in PER_SIZE if b in only]
+        if not names:
+            continue
+        source = ensure_history(size, seed)
+        workdir = os.path.join(DATA_DIR, f"work_{size}")
+        shutil.rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        shutil.copy(source, os.path.join(workdir, database.DB_NAME))
+        # stages that only consume earlier outputs still need them built
+        for name in PER_SIZE[:PER_SIZE.index(names[-1]) + 1]:
+            r = run_benchmark(name, workdir, repeat if name in only else 1)
+            if name in only:
+                results[f"{name}@{size}"] = r
+                _print_row(f"{name}@{size}", r)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def _print_row(key, r):
+    if r is None:
+        print(f"{key:<28} FAILED")
+        return
+    print(f"{key:<28} {r['wall_s']:>9.3f}s {r['per_sec']:>14,.0f} {r['unit'] + '/s':<14} {r['peak_rss_kb'] / 1024:>8.1f} MB")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def report(results, seed=SEED):
+    return {
+        'meta': {
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': seed,
+            'generator_version': GENERATOR_VERSION,
+        },
+        'results': results,
+    }
+
+def read_report(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def compare(current, baseline):
+    """
+    Lines describing every benchmark against the baseline, plus the keys that regressed.
+    """
+    lines, regressions = [], []
+    base = baseline.get('results', {})
+    for key, r in current.get('results', {}).items():
+        b = base.get(key)
+        if r is None or b is None:
+            continue
+        time_ratio = r['wall_s'] / b['wall_s'] if b['wall_s'] else 1.0
+        rss_ratio = r['peak_rss_kb'] / b['peak_rss_kb'] if b['peak_rss_kb'] else 1.0
+        slow = time_ratio > REGRESSION and r['wall_s'] > MIN_SECONDS
+        big = rss_ratio > REGRESSION
+        flag = "  REGRESSION" if slow or big else ""
+        lines.append(f"{key:<28} {b['wall_s']:>8.3f}s -> {r['wall_s']:>8.3f}s ({time_ratio:.2f}x)  rss {rss_ratio:.2f}x{flag}")
+        if flag:
+            regressions.append(key)
+    return lines, regressions
+
+
+def main():
+    sizes = sys.argv[sys.argv.index("--sizes") + 1].split(",") if "--sizes" in sys.argv else list(SIZES)
+    only = sys.argv[sys.argv.index("--only") + 1].split(",") if "--only" in sys.argv else None
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else SEED
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 1
+    unknown = [s for s in sizes if s not in SIZES] + [b for b in (only or []) if b not in BENCHMARKS]
+    if unknown:
+        sys.exit(f"Unknown size / benchmark: {', '.join(unknown)} (sizes: {', '.join(SIZES)}; benchmarks: {', '.join(BENCHMARKS)})")
+
+    if "--generate" in sys.argv:
+        for size in sizes:
+            path = ensure_history(size, seed)
+            print(f"{size}: {fights_hash(path)}")
+        return
+
+    baseline = None
+    if "--compare" in sys.argv:
+        i = sys.argv.index("--compare") + 1
+        path = sys.argv[i] if i < len(sys.argv) and not sys.argv[i].startswith("--") else BASELINE_FILE
+        baseline = read_report(path)
+        if baseline is None:
+            sys.exit(f"No baseline at {path}, run with --save-baseline first")
+
+    print(f"{'benchmark':<28} {'wall':>10} {'throughput':>14} {'':<14} {'peak RSS':>11}")
+    current = report(run_suite(sizes, only, seed, repeat), seed)
+    with open(RESULTS_FILE, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"\nSaved to {RESULTS_FILE}")
+
+    if "--save-baseline" in sys.argv:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+    if baseline is not None:
+        lines, regressions = compare(current, baseline)
+        print(f"\nAgainst {path} ({baseline['meta'].get('commit')}, {baseline['meta'].get('created')}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {REGRESSION - 1:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+    if any(r is None for r in current['results'].values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child(sys.argv[sys.argv.index("--child") + 1])
+    else:
+        main()
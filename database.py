@@ -0,0 +1,335 @@
+import re
+import sqlite3
+import unicodedata
+from datetime import datetime
+
+# ufc_data.db schema. Fighters have integer ids, every fight stores both
+# participants plus an outcome code, and event dates are stored as ISO text
+# plus days since 1970-01-01 so nothing has to re-parse 'December 13, 2025'.
+# connect() migrates an older database in place the first time it is opened.
+#
+#   fighters(id, name, ufc_id)                 ufc_id from the fighter-details url
+#   fighter_aliases(alias_key, fighter_id)     normalized spellings, see identity.py
+#   events(id, name, event_date, event_day, location, url)
+#   fights(fight_id, event_id, event_day, fighter_a, fighter_b, outcome,
+#          method, round, time, weight_class)
+#   fight_pages(fight_id, url, status)         fight-details page of each fight
+#   round_stats(fight_id, fighter_id, round, <STAT_COLUMNS>)
+#
+# for a win fighter_a is the winner, for draws / no contests the two fighters
+# are in page order. fights.event_day is copied from the event so history
+# loads are a single index scan without a join. round_stats has one row per
+# fighter per round (round 0 when a page only has whole-fight totals); the
+# fight_stats view adds the rounds up.
+#
+# fighters.name is the display name and stays unique: a second fighter with
+# the same name gets a numbered one (identity.FighterResolver).
+#
+# schema versions: 1 = integer fighter ids, 2 = fight_pages / round_stats,
+# 3 = fighters.ufc_id / fighter_aliases, 4 = fights.method whitespace collapsed.
+# Every table is CREATE ... IF NOT EXISTS, so going up a version runs SCHEMA again.
+
+# config
+DB_NAME = "ufc_data.db"
+SCHEMA_VERSION = 4 # stored in PRAGMA user_version
+
+DATE_FORMAT = '%B %d, %Y'
+EPOCH = datetime(1970, 1, 1)
+
+# fights.outcome
+WIN = 1 # fighter_a beat fighter_b
+DRAW = 2
+NO_CONTEST = 3
+OUTCOMES = {WIN: "Win", DRAW: "Draw", NO_CONTEST: "NC"}
+
+# fight_pages.status
+PAGE_PENDING = 0
+PAGE_DONE = 1
+PAGE_NO_STATS = 2 # page has no stats tables (older events), not retried
+PAGE_MISMATCH = 3 # page's fighters aren't the stored fight's, not retried (--rescrape does)
+
+# round_stats counters, landed / attempted pairs from "17 of 42" cells
+STAT_COLUMNS = (
+    'kd', 'sig_landed', 'sig_attempted', 'total_landed', 'total_attempted',
+    'td_landed', 'td_attempted', 'sub_attempts', 'reversals', 'ctrl_seconds',
+    'head_landed', 'head_attempted', 'body_landed', 'body_attempted',
+    'leg_landed', 'leg_attempted', 'distance_landed', 'distance_attempted',
+    'clinch_landed', 'clinch_attempted', 'ground_landed', 'ground_attempted',
+)
+
+LEGACY_DRAW = "Draw/NC" # winner/loser sentinel of the old schema
+# methods that end in a no contest rather than a draw
+NO_CONTEST_METHODS = ("overturned", "cnc", "other", "dq")
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS fighters (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        ufc_id TEXT
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_fighters_ufc_id ON fighters(ufc_id);
+
+    CREATE TABLE IF NOT EXISTS fighter_aliases (
+        alias_key TEXT NOT NULL,  -- normalize(name)
+        fighter_id INTEGER NOT NULL,
+        PRIMARY KEY (alias_key, fighter_id),
+        FOREIGN KEY(fighter_id) REFERENCES fighters(id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS events (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        event_date TEXT,     -- YYYY-MM-DD
+        event_day INTEGER,   -- days since 1970-01-01
+        location TEXT,
+        url TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS fights (
+        fight_id TEXT PRIMARY KEY,
+        event_id TEXT NOT NULL,
+        event_day INTEGER,
+        fighter_a INTEGER NOT NULL,
+        fighter_b INTEGER NOT NULL,
+        outcome INTEGER NOT NULL,
+        method TEXT,
+        round INTEGER,
+        time TEXT,
+        weight_class TEXT,
+        FOREIGN KEY(event_id) REFERENCES events(id),
+        FOREIGN KEY(fighter_a) REFERENCES fighters(id),
+        FOREIGN KEY(fighter_b) REFERENCES fighters(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_events_day ON events(event_day);
+    CREATE INDEX IF NOT EXISTS idx_fights_day ON fights(event_day);
+    CREATE INDEX IF NOT EXISTS idx_fights_event ON fights(event_id);
+    CREATE INDEX IF NOT EXISTS idx_fights_fighter_a ON fights(fighter_a);
+    CREATE INDEX IF NOT EXISTS idx_fights_fighter_b ON fights(fighter_b);
+
+    -- names resolved, for ad-hoc queries
+    CREATE VIEW IF NOT EXISTS fight_results AS
+    SELECT f.fight_id, f.event_id, f.event_day, e.event_date,
+           a.name AS fighter_a, b.name AS fighter_b, f.outcome,
+           f.method, f.round, f.time, f.weight_class
+    FROM fights f
+    JOIN events e ON e.id = f.event_id
+    JOIN fighters a ON a.id = f.fighter_a
+    JOIN fighters b ON b.id = f.fighter_b;
+
+    CREATE TABLE IF NOT EXISTS fight_pages (
+        fight_id TEXT PRIMARY KEY,
+        url TEXT NOT NULL,
+        status INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(fight_id) REFERENCES fights(fight_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_fight_pages_status ON fight_pages(status);
+
+    CREATE TABLE IF NOT EXISTS round_stats (
+        fight_id TEXT NOT NULL,
+        fighter_id INTEGER NOT NULL,
+        round INTEGER NOT NULL,
+        {stat_columns},
+        PRIMARY KEY (fight_id, fighter_id, round),
+        FOREIGN KEY(fight_id) REFERENCES fights(fight_id),
+        FOREIGN KEY(fighter_id) REFERENCES fighters(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_round_stats_fighter ON round_stats(fighter_id);
+
+    -- whole-fight totals per fighter
+    CREATE VIEW IF NOT EXISTS fight_stats AS
+    SELECT fight_id, fighter_id, MAX(round) AS rounds, {stat_sums}
+    FROM round_stats
+    GROUP BY fight_id, fighter_id;
+'''.format(
+    stat_columns=",\n        ".join(f"{c} INTEGER" for c in STAT_COLUMNS),
+    stat_sums=", ".join(f"SUM({c}) AS {c}" for c in STAT_COLUMNS),
+)
+
+FIGHTER_FIGHTS_QUERY = '''
+    SELECT fight_id, event_day, fighter_a, fighter_b, outcome, method, round, weight_class
+    FROM fights WHERE fighter_a = :id
+    UNION ALL
+    SELECT fight_id, event_day, fighter_a, fighter_b, outcome, method, round, weight_class
+    FROM fights WHERE fighter_b = :id
+    ORDER BY event_day
+'''
+
+
+def parse_event_date(date_str):
+    """
+    'December 13, 2025' -> ('2025-12-13', days since 1970-01-01), (None, None) if unparseable.
+    """
+    try:
+        date = datetime.strptime(date_str.strip(), DATE_FORMAT)
+    except (AttributeError, ValueError):
+        return None, None
+    return date.date().isoformat(), (date - EPOCH).days
+
+
+def normalize(name):
+    """
+    'José Aldo' -> 'jose aldo' (accents dropped, punctuation -> spaces).
+    """
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def connect(path=DB_NAME):
+    """
+    Opens the database, creating or migrating the schema if needed.
+    """
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    return conn
+
+def migrate(conn):
+    """
+    Brings the schema up to SCHEMA_VERSION. Safe to call on every connect.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    # explicit transaction: the sqlite3 module would autocommit the DDL
+    conn.execute("BEGIN")
+    try:
+        legacy = "date" in _columns(conn, "events")
+        if legacy:
+            conn.execute("ALTER TABLE fights RENAME TO legacy_fights")
+            conn.execute("ALTER TABLE events RENAME TO legacy_events")
+        elif "name" in _columns(conn, "fighters") and "ufc_id" not in _columns(conn, "fighters"):
+            conn.execute("ALTER TABLE fighters ADD COLUMN ufc_id TEXT")
+        # executescript would commit on its own, so run the statements one by one
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        if legacy:
+            _migrate_legacy(conn)
+            conn.execute("DROP TABLE legacy_fights")
+            conn.execute("DROP TABLE legacy_events")
+        _backfill_aliases(conn)
+        _collapse_methods(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if legacy:
+        conn.execute("VACUUM") # give back the pages of the dropped tables
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _split_squashed(squashed):
+    # 'DeAnnaBennett' -> 'DeAnna Bennett', 'CJFernandes' -> 'CJ Fernandes'
+    parts = re.split(r"(?<=[a-z])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", squashed)
+    return squashed if len(parts) < 2 else "".join(parts[:-1]) + " " + parts[-1]
+
+def _draw_participants(fight_id, event_id, squashed_names):
+    """
+    The old schema dropped both names of a draw/NC; fight_id still has them
+    as '<event>_<Name1>_<Name2>' with the spaces removed.
+    """
+    parts = fight_id[len(event_id) + 1:].split("_")
+    if len(parts) != 2:
+        return None
+    return [squashed_names.get(p) or _split_squashed(p) for p in parts]
+
+def _legacy_outcome(method):
+    method = (method or "").strip().lower()
+    return NO_CONTEST if method.startswith(NO_CONTEST_METHODS) else DRAW
+
+def _collapse_methods(conn):
+    # older scrapes kept the method cell's whitespace ('KO/TKO\n\n   Punches'),
+    # the parsers now store 'KO/TKO Punches'
+    rows = conn.execute('''
+        SELECT fight_id, method FROM fights
+        WHERE instr(method, char(10)) OR instr(method, char(9)) OR instr(method, '  ') OR method != trim(method)
+    ''').fetchall()
+    conn.executemany("UPDATE fights SET method = ? WHERE fight_id = ?", [(" ".join(method.split()), fight_id) for fight_id, method in rows])
+
+def _migrate_legacy(conn):
+    event_days = {}
+    events = []
+    for event_id, name, date, location, url in conn.execute("SELECT id, name, date, location, url FROM legacy_events ORDER BY rowid"):
+        event_date, day = parse_event_date(date)
+        event_days[event_id] = day
+        events.append((event_id, name, event_date, day, location, url))
+    conn.executemany("INSERT INTO events (id, name, event_date, event_day, location, url) VALUES (?, ?, ?, ?, ?, ?)", events)
+
+    rows = conn.execute('''
+        SELECT fight_id, event_id, winner, loser, method, round, time, weight_class
+        FROM legacy_fights ORDER BY rowid
+    ''').fetchall()
+
+    known = {}
+    for _, _, winner, loser, *_ in rows:
+        for name in (winner.strip(), loser.strip()):
+            if name != LEGACY_DRAW:
+                known.setdefault(name.replace(" ", ""), name)
+
+    ids = {}
+    fights = []
+    for fight_id, event_id, winner, loser, method, round_num, time_val, weight_class in rows:
+        winner, loser = winner.strip(), loser.strip()
+        if winner == LEGACY_DRAW or loser == LEGACY_DRAW:
+            names = _draw_participants(fight_id, event_id, known)
+            if names is None:
+                print(f"Skipping {fight_id}: can't recover the fighters")
+                continue
+            outcome = _legacy_outcome(method)
+        else:
+            names = [winner, loser]
+            outcome = WIN
+        a, b = (ids.setdefault(n, len(ids) + 1) for n in names)
+        fights.append((fight_id, event_id, event_days.get(event_id), a, b, outcome, method, round_num, time_val, weight_class))
+
+    conn.executemany("INSERT INTO fighters (id, name) VALUES (?, ?)", [(i, n) for n, i in ids.items()])
+    conn.executemany('''
+        INSERT INTO fights (fight_id, event_id, event_day, fighter_a, fighter_b, outcome, method, round, time, weight_class)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', fights)
+
+
+def _backfill_aliases(conn):
+    # every stored name is an alias of its own fighter
+    conn.executemany(
+        "INSERT OR IGNORE INTO fighter_aliases (alias_key, fighter_id) VALUES (?, ?)",
+        [(normalize(name), fighter_id) for fighter_id, name in conn.execute("SELECT id, name FROM fighters").fetchall()],
+    )
+
+
+# helpers for writers / readers
+
+def fighter_names(conn):
+    """
+    {id: name} for every fighter.
+    """
+    return dict(conn.execute("SELECT id, name FROM fighters").fetchall())
+
+def save_round_stats(conn, fight_id, rows):
+    """
+    Replaces the round_stats of one fight. rows: [(fighter_id, round, *STAT_COLUMNS)].
+    Call inside the caller's transaction.
+    """
+    conn.execute("DELETE FROM round_stats WHERE fight_id = ?", (fight_id,))
+    placeholders = ", ".join("?" * (len(STAT_COLUMNS) + 3))
+    conn.executemany(
+        f"INSERT INTO round_stats (fight_id, fighter_id, round, {', '.join(STAT_COLUMNS)}) VALUES ({placeholders})",
+        [(fight_id, *row) for row in rows],
+    )
+
+def fighter_fights(conn, name):
+    """
+    Every fight of one fighter in date order (two index lookups, no table scan).
+    """
+    row = conn.execute("SELECT id FROM fighters WHERE name = ?", (name.strip(),)).fetchone()
+    if row is None:
+        return []
+    return conn.execute(FIGHTER_FIGHTS_QUERY, {'id': row[0]}).fetchall()
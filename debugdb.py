@@ -1,7 +1,13 @@
-import sqlite3
 import pandas as pd
 
-conn = sqlite3.connect("ufc_data.db")
-df = pd.read_sql("SELECT winner, count(*) as count FROM fights GROUP BY winner ORDER BY count DESC LIMIT 10", conn)
+import database
+
+conn = database.connect()
+df = pd.read_sql(f"""
+    SELECT fr.name AS winner, count(*) as count
+    FROM fights f JOIN fighters fr ON fr.id = f.fighter_a
+    WHERE f.outcome = {database.WIN}
+    GROUP BY f.fighter_a ORDER BY count DESC LIMIT 10
+""", conn)
 print(df)
 conn.close()
\ No newline at end of file
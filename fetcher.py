@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import httpcache
+import tracing
+
+# shared HTTP layer for the scrapers: one pooled session, a token bucket so
+# concurrent workers stay polite to ufcstats.com, and retries with backoff.
+
+# config
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+REQUESTS_PER_SECOND = 4.0 # sustained rate across all workers
+BURST = 4
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0 # seconds, doubled every retry
+TIMEOUT = 20
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available.
+    """
+    def __init__(self, rate=REQUESTS_PER_SECOND, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=8):
+    """
+    requests.Session with a connection pool big enough for `pool_size` workers.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+_default_session = None
+_default_bucket = TokenBucket()
+_default_lock = threading.Lock()
+
+def default_session():
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = make_session()
+        return _default_session
+
+
+def fetch(url, session=None, bucket=None, retries=MAX_RETRIES, headers=None):
+    """
+    GETs `url` and returns the response. Connection errors and 429/5xx
+    responses are retried with exponential backoff (+ jitter); anything
+    still failing after `retries` attempts raises.
+    """
+    session = session or default_session()
+    bucket = bucket or _default_bucket
+
+    for attempt in range(retries + 1):
+        with tracing.span("http.wait_token"):
+            bucket.acquire()
+        try:
+            with tracing.span("http.request", attempt=attempt) as s:
+                response = session.get(url, timeout=TIMEOUT, headers=headers)
+                s.set(status=response.status_code, bytes=len(response.content))
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+            response = None
+
+        if response is not None:
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return response
+            if attempt == retries:
+                response.raise_for_status()
+
+        tracing.count("http.retries")
+        delay = BACKOFF_BASE * (2 ** attempt) + random.uniform(0, BACKOFF_BASE)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        time.sleep(delay)
+
+
+def fetch_content(url, session=None, bucket=None, use_cache=True, revalidate=False):
+    """
+    Returns the body of `url`, going through the response cache: fresh
+    entries cost no request, stale ones are revalidated with
+    If-None-Match / If-Modified-Since. `revalidate` treats a fresh (or
+    permanent) entry as stale, so a corrected page is downloaded again.
+    In offline mode only the cache is used.
+    """
+    if not use_cache:
+        return fetch(url, session=session, bucket=bucket).content
+
+    cache = httpcache.get_cache()
+    cached = cache.get(url)
+
+    if httpcache.OFFLINE:
+        if cached is None:
+            raise httpcache.CacheMiss(f"{url} is not cached (offline mode)")
+        cache.count("hits")
+        tracing.count("http.cache_hit")
+        return cached[0]
+
+    headers = {}
+    if cached is not None:
+        body, etag, last_modified, fresh = cached
+        if fresh and not revalidate:
+            cache.count("hits")
+            tracing.count("http.cache_hit")
+            return body
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    response = fetch(url, session=session, bucket=bucket, headers=headers or None)
+    if response.status_code == 304 and cached is not None:
+        cache.count("revalidated")
+        tracing.count("http.revalidated")
+        cache.touch(url)
+        return cached[0]
+
+    cache.count("misses")
+    tracing.count("http.downloaded")
+    cache.put(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return response.content
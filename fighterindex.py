@@ -0,0 +1,116 @@
+import bisect
+from collections import defaultdict
+
+from database import normalize
+
+# prebuilt lookups over fighter_stats so the dashboard and the API never
+# rescan the DataFrame: name -> row offset, presorted names per weight class,
+# and a token prefix + trigram index for accent-insensitive fuzzy search.
+
+ALL = 'All'
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FighterIndex:
+    def __init__(self, stats):
+        # stats: DataFrame or statssnapshot.load_columns() dict
+        names = [str(n) for n in stats['Fighter']]
+
+        # first row wins for duplicate names, same as df[df['Fighter'] == x].iloc[0]
+        self.row_of = {}
+        for row, name in enumerate(names):
+            self.row_of.setdefault(name, row)
+        self.names = list(self.row_of)
+
+        # presorted dropdown lists
+        self.by_class = {ALL: tuple(sorted(self.names))}
+        if 'Weight_Class' in stats:
+            groups = defaultdict(list)
+            for name, wc in zip(names, stats['Weight_Class']):
+                groups[str(wc)].append(name)
+            for wc, members in groups.items():
+                self.by_class[wc] = tuple(sorted(set(members)))
+        self.weight_classes = [ALL] + sorted(wc for wc in self.by_class if wc != ALL)
+        self.class_members = {wc: frozenset(members) for wc, members in self.by_class.items()}
+
+        # search structures
+        self.normalized = [normalize(n) for n in self.names]
+        self.tokens = sorted(
+            (token, i)
+            for i, norm in enumerate(self.normalized)
+            for token in [norm] + norm.split()
+        )
+        self.token_keys = [t for t, _ in self.tokens]
+        self.grams = defaultdict(set)
+        self.gram_count = []
+        for i, norm in enumerate(self.normalized):
+            grams = trigrams(norm)
+            self.gram_count.append(len(grams))
+            for g in grams:
+                self.grams[g].add(i)
+
+    def row(self, name):
+        """
+        Row offset of `name` in the stats table (KeyError if unknown).
+        """
+        return self.row_of[name]
+
+    def options(self, weight_class=ALL):
+        """
+        Sorted fighter names for a weight class dropdown.
+        """
+        return self.by_class.get(weight_class, ())
+
+    def prefix(self, query, weight_class=ALL, limit=10):
+        """
+        Fighters whose full name or any name token starts with `query`.
+        """
+        q = normalize(query)
+        if not q:
+            return []
+        members = self.class_members.get(weight_class, frozenset())
+        out = []
+        seen = set()
+        for j in range(bisect.bisect_left(self.token_keys, q), len(self.tokens)):
+            token, i = self.tokens[j]
+            if not token.startswith(q):
+                break
+            name = self.names[i]
+            if i not in seen and name in members:
+                seen.add(i)
+                out.append(name)
+        return sorted(out)[:limit]
+
+    def search(self, query, weight_class=ALL, limit=10):
+        """
+        Prefix matches first, then fuzzy matches ranked by trigram similarity.
+        """
+        results = self.prefix(query, weight_class, limit)
+        if len(results) >= limit:
+            return results
+
+        q = normalize(query)
+        if not q:
+            return results
+        q_grams = trigrams(q)
+
+        hits = defaultdict(int)
+        for g in q_grams:
+            for i in self.grams.get(g, ()):
+                hits[i] += 1
+
+        members = self.class_members.get(weight_class, frozenset())
+        taken = set(results)
+        scored = []
+        for i, shared in hits.items():
+            name = self.names[i]
+            if name in taken or name not in members:
+                continue
+            score = shared / (len(q_grams) + self.gram_count[i] - shared) # jaccard
+            if score >= 0.2:
+                scored.append((-score, name))
+        scored.sort()
+        return results + [name for _, name in scored[:limit - len(results)]]
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+# the trained RandomForestClassifier flattened into packed numpy node arrays
+# (ufc_predictor_v2.npz) plus a pure numpy predict_proba, so the dashboard
+# and the API never import sklearn or unpickle the forest.
+#
+# every tree's nodes are concatenated; leaves point back at themselves, so a
+# batch walks all trees at once for max_depth steps with no branching.
+# sklearn compares float32 inputs against float64 thresholds and adds the
+# trees up one at a time, both of which are copied here so the probabilities
+# are bit-for-bit the same as predict_proba.
+
+# config
+MODEL_FILE = "ufc_predictor_v2.pkl"
+SCHEMA_VERSION = 1
+CHUNK_ROWS = 256 # rows walked together, keeps the (rows x trees) arrays in cache
+
+def packed_path(model_path):
+    return os.path.splitext(model_path)[0] + ".npz"
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def export(model, path, source=None):
+    """
+    Packs a fitted binary RandomForestClassifier into `path` (.npz).
+    `source` is the pickle it came from (its hash marks the export as current).
+    """
+    feature, threshold, left, right, p0, p1, roots = [], [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        node = np.arange(n) + offset
+        leaf = tree.children_left < 0
+
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(np.where(leaf, 0.0, tree.threshold))
+        left.append(np.where(leaf, node, tree.children_left + offset))
+        right.append(np.where(leaf, node, tree.children_right + offset))
+
+        # same normalisation as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        p0.append(value[:, 0] / normalizer)
+        p1.append(value[:, 1] / normalizer)
+
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += n
+
+    tmp = path + ".tmp.npz"
+    np.savez(
+        tmp,
+        schema_version=np.array(SCHEMA_VERSION),
+        source_sha256=np.array(file_hash(source) if source else ""),
+        feature_names=np.array([str(f) for f in getattr(model, 'feature_names_in_', [])]),
+        classes=np.asarray(model.classes_),
+        depth=np.array(depth),
+        roots=np.array(roots, dtype=np.int32),
+        feature=np.concatenate(feature).astype(np.int8),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        p0=np.concatenate(p0),
+        p1=np.concatenate(p1),
+    )
+    os.replace(tmp, path)
+
+
+class PackedForest:
+    """
+    Drop-in for the fitted forest wherever only predict_proba / predict are used.
+    """
+    def __init__(self, path):
+        with np.load(path, allow_pickle=False) as z:
+            if int(z['schema_version']) != SCHEMA_VERSION:
+                raise ValueError(f"forest schema {int(z['schema_version'])}, expected {SCHEMA_VERSION}")
+            self.source_sha256 = str(z['source_sha256'])
+            self.feature_names_in_ = z['feature_names']
+            self.classes_ = z['classes']
+            self.depth = int(z['depth'])
+            self.roots = z['roots'].astype(np.intp)
+            self.feature = z['feature'].astype(np.intp)
+            self.threshold = z['threshold']
+            # children[2 * node + (x > threshold)] is the next node
+            self.children = np.column_stack([z['left'], z['right']]).ravel().astype(np.intp)
+            self.p0 = z['p0']
+            self.p1 = z['p1']
+        self.n_estimators = len(self.roots)
+
+    def _float_input(self, X):
+        # sklearn casts to float32 first, then compares against float64 thresholds
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    def _leaves(self, X):
+        n, n_features = X.shape
+        flat = X.ravel()
+        base = (np.arange(n) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, self.n_estimators))
+        for _ in range(self.depth):
+            right = flat[base + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + right]
+        return nodes
+
+    def apply(self, X):
+        """
+        (n_samples, n_trees) leaf node ids.
+        """
+        return self._leaves(self._float_input(X))
+
+    def predict_proba(self, X):
+        X = self._float_input(X)
+        out = np.empty((len(X), 2))
+        for lo in range(0, len(X), CHUNK_ROWS):
+            nodes = self._leaves(X[lo:lo + CHUNK_ROWS])
+            # cumsum adds the trees one at a time, in the order sklearn accumulates them
+            out[lo:lo + CHUNK_ROWS, 0] = np.cumsum(self.p0[nodes], axis=1)[:, -1]
+            out[lo:lo + CHUNK_ROWS, 1] = np.cumsum(self.p1[nodes], axis=1)[:, -1]
+        out /= self.n_estimators
+        return out
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load(model_path=MODEL_FILE):
+    """
+    PackedForest for `model_path` if its export exists and was made from
+    that pickle (or the pickle is gone), else None. An export without a
+    source hash counts as stale while the pickle is there.
+    """
+    path = packed_path(model_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        forest = PackedForest(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if os.path.exists(model_path) and forest.source_sha256 != file_hash(model_path):
+        return None
+    return forest
+
+
+if __name__ == "__main__":
+    # re-export an existing pickle without retraining
+    import joblib
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_FILE
+    export(joblib.load(model_path), packed_path(model_path), source=model_path)
+    print(f"Wrote {packed_path(model_path)}")
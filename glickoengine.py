@@ -0,0 +1,273 @@
+import math
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import ratingengine
+
+# Glicko-2 alongside the elo engine: every fighter has a rating, a rating
+# deviation (how sure we are of it) and a volatility. Every event date is a
+# rating period and the whole card is updated at once with array operations
+# (a fighter with two fights on one night, as in the early tournaments, gets
+# both results in the same update). Consecutive event dates with no fighter
+# in common can't affect each other, so they go through as one batch; that
+# turns ~750 small updates into far fewer bigger ones. Between fights the deviation grows with
+# the time out, one period of volatility per PERIOD_DAYS, so a long layoff
+# makes a rating less trusted again. The win probability combines both
+# deviations, so a matchup between barely known fighters stays closer to a
+# coin flip than the same rating gap between veterans. The predictor uses the
+# exported deviations (RATINGS_FILE) the same way: confidence_shrink pulls the
+# model's probability towards 0.5 for matchups of barely known fighters.
+#
+# Same interface as ratingengine: get_expected_score, replay(history), run(),
+# ratings_frame(). Maths from Glickman, "Example of the Glicko-2 system".
+
+# config
+STARTING_RATING = 1500
+STARTING_RD = 150 # lower than the usual 350: most fighters have few fights, 350 overreacts to them
+STARTING_VOLATILITY = 0.06
+TAU = 0.5 # volatility change constraint
+PERIOD_DAYS = 30 # idle time that counts as one rating period for the deviation
+SCALE = 173.7178 # glicko-2 internal scale
+EPSILON = 1e-6 # volatility solver tolerance
+RATINGS_FILE = "current_glicko_ratings.csv"
+RD_ESTABLISHED = 100 # about the deviation of the best known active fighters; pairs at or under it aren't shrunk
+
+
+def _g(phi):
+    return 1 / np.sqrt(1 + 3 * phi ** 2 / math.pi ** 2)
+
+def get_expected_score(rating_a, rating_b, rd_a=0.0, rd_b=0.0):
+    """
+    Returns the probability (0-1) that A beats B. With both deviations at 0
+    it's the logistic curve on the glicko scale.
+    """
+    mu_diff = (np.asarray(rating_a) - rating_b) / SCALE
+    phi = np.sqrt(np.square(rd_a) + np.square(rd_b)) / SCALE
+    return 1 / (1 + np.exp(-_g(phi) * mu_diff))
+
+
+def confidence_shrink(rd_a, rd_b):
+    """
+    Factor in (0, 1] to pull a win probability towards 0.5 by: 1 for two
+    fighters at RD_ESTABLISHED or better, lower the less is known about them.
+    The same g() that widens get_expected_score.
+    """
+    phi = np.sqrt(np.square(rd_a) + np.square(rd_b)) / SCALE
+    return np.minimum(_g(phi) / _g(math.sqrt(2) * RD_ESTABLISHED / SCALE), 1.0)
+
+
+def _volatility(sigma, phi, v, delta):
+    """
+    New volatility for every player at once (step 5, Illinois method).
+    """
+    a = np.log(sigma ** 2)
+    d2, p2 = delta ** 2, phi ** 2
+
+    def f(x, i=slice(None)):
+        ex = np.exp(x)
+        return ex * (d2[i] - p2[i] - v[i] - ex) / (2 * (p2[i] + v[i] + ex) ** 2) - (x - a[i]) / TAU ** 2
+
+    A = a.copy()
+    big = d2 > p2 + v
+    B = np.where(big, np.log(np.where(big, d2 - p2 - v, 1.0)), a - TAU)
+    # bracket the root from below where delta is small
+    k = 1
+    low = ~big & (f(B) < 0)
+    while low.any():
+        k += 1
+        B[low] = a[low] - k * TAU
+        low &= f(B) < 0
+
+    fA, fB = f(A), f(B)
+    active = np.flatnonzero(np.abs(B - A) > EPSILON)
+    while len(active):
+        i = active
+        C = A[i] + (A[i] - B[i]) * fA[i] / (fB[i] - fA[i])
+        fC = f(C, i)
+        flip = fC * fB[i] <= 0
+        A[i] = np.where(flip, B[i], A[i])
+        fA[i] = np.where(flip, fB[i], fA[i] / 2)
+        B[i] = C
+        fB[i] = fC
+        active = i[np.abs(B[i] - A[i]) > EPSILON]
+    return np.exp(A / 2)
+
+def rate_period(mu, phi, sigma, me, opp, score):
+    """
+    One Glicko-2 rating period on the internal scale. mu / phi / sigma are
+    per player (phi already grown for time out); me / opp / score hold one
+    row per game. Returns the new (mu, phi, sigma).
+    """
+    m = len(mu)
+    g = _g(phi[opp])
+    E = 1 / (1 + np.exp(-g * (mu[me] - mu[opp])))
+
+    v = 1 / np.bincount(me, weights=g ** 2 * E * (1 - E), minlength=m)
+    improvement = np.bincount(me, weights=g * (score - E), minlength=m)
+
+    sigma_new = _volatility(sigma, phi, v, v * improvement)
+    phi_star = np.sqrt(phi ** 2 + sigma_new ** 2)
+    phi_new = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+    return mu + phi_new ** 2 * improvement, phi_new, sigma_new
+
+
+@dataclass
+class GlickoReplay:
+    """
+    Output of a replay: final per-fighter state plus pre-fight values per fight.
+    """
+    history: ratingengine.History
+    # per fighter
+    rating: np.ndarray
+    rd: np.ndarray
+    volatility: np.ndarray
+    last_day: np.ndarray      # -1 for fighters who never fought
+    fights: np.ndarray
+    # per fight (pre-fight values)
+    rating_w: np.ndarray
+    rating_l: np.ndarray
+    rd_w: np.ndarray
+    rd_l: np.ndarray
+    expected: np.ndarray      # winner's pre-fight win probability
+
+
+def independent_periods(history):
+    """
+    Fight index bounds of consecutive runs of rating periods (event dates)
+    in which no fighter appears in more than one period.
+    """
+    day = history.day
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(day)) + 1]).tolist()
+    ends = starts[1:] + [len(day)]
+    winners = history.winner.tolist()
+    losers = history.loser.tolist()
+
+    bounds = [0]
+    seen = set()
+    for lo, hi in zip(starts, ends):
+        card = set(winners[lo:hi]) | set(losers[lo:hi])
+        if not seen.isdisjoint(card):
+            bounds.append(lo)
+            seen = set()
+        seen |= card
+    bounds.append(len(day))
+    return bounds
+
+def replay(history):
+    """
+    Replays the whole history, a batch of independent rating periods at a time.
+    """
+    n_fighters = len(history.names)
+    n = len(history)
+    phi0 = STARTING_RD / SCALE
+
+    mu = np.zeros(n_fighters)
+    phi = np.full(n_fighters, phi0)
+    sigma = np.full(n_fighters, float(STARTING_VOLATILITY))
+    last_day = np.full(n_fighters, -1, dtype=np.int64)
+    fights = np.zeros(n_fighters, dtype=np.int32)
+
+    rating_w = np.empty(n)
+    rating_l = np.empty(n)
+    rd_w = np.empty(n)
+    rd_l = np.empty(n)
+
+    bounds = independent_periods(history)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        w = history.winner[lo:hi]
+        l = history.loser[lo:hi]
+
+        # everyone fighting in the batch, deviation grown over their time out
+        players, first, inverse = np.unique(np.concatenate([w, l]), return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        d = np.tile(history.day[lo:hi], 2)[first].astype(np.int64)
+        seen = last_day[players] >= 0
+        periods = np.where(seen, (d - last_day[players]) / PERIOD_DAYS, 0)
+        phi_p = np.minimum(np.sqrt(phi[players] ** 2 + periods * sigma[players] ** 2), phi0)
+        mu_p = mu[players]
+        sigma_p = sigma[players]
+
+        pw, pl = inverse[:hi - lo], inverse[hi - lo:]
+        rating_w[lo:hi] = mu_p[pw] * SCALE + STARTING_RATING
+        rating_l[lo:hi] = mu_p[pl] * SCALE + STARTING_RATING
+        rd_w[lo:hi] = phi_p[pw] * SCALE
+        rd_l[lo:hi] = phi_p[pl] * SCALE
+
+        # one row per (player, opponent, score)
+        me = np.concatenate([pw, pl])
+        opp = np.concatenate([pl, pw])
+        score = np.concatenate([np.ones(hi - lo), np.zeros(hi - lo)])
+        mu[players], phi[players], sigma[players] = rate_period(mu_p, phi_p, sigma_p, me, opp, score)
+        last_day[players] = d
+        fights[players] += np.bincount(me, minlength=len(players)).astype(np.int32)
+
+    return GlickoReplay(
+        history=history,
+        rating=mu * SCALE + STARTING_RATING,
+        rd=phi * SCALE,
+        volatility=sigma,
+        last_day=last_day,
+        fights=fights,
+        rating_w=rating_w, rating_l=rating_l,
+        rd_w=rd_w, rd_l=rd_l,
+        expected=get_expected_score(rating_w, rating_l, rd_w, rd_l),
+    )
+
+
+def current_rd(result, today=None):
+    """
+    Each fighter's deviation as of `today`, grown over the time since their last fight.
+    """
+    today_day = ((today or pd.Timestamp.now().to_pydatetime()) - ratingengine.EPOCH).days
+    periods = np.where(result.last_day >= 0, (today_day - result.last_day) / PERIOD_DAYS, 0)
+    return np.minimum(np.sqrt(result.rd ** 2 + periods * (result.volatility * SCALE) ** 2), STARTING_RD)
+
+def ratings_frame(result, today=None):
+    """
+    Current rating, deviation and volatility, best first. Conservative is
+    rating - 2 RD, the rating we're ~95% sure the fighter is above.
+    """
+    rd = current_rd(result, today)
+    df = pd.DataFrame({
+        'Fighter': result.history.names,
+        'Rating': result.rating,
+        'RD': rd,
+        'Volatility': result.volatility,
+        'Conservative': result.rating - 2 * rd,
+        'Fights': result.fights,
+    })
+    return df.sort_values('Rating', ascending=False, kind='stable')
+
+def win_probability(result, fighter_a, fighter_b, today=None):
+    """
+    P(fighter_a beats fighter_b) today, shrunk towards 0.5 by both current deviations.
+    """
+    ids = {name: i for i, name in enumerate(result.history.names)}
+    missing = [f for f in (fighter_a, fighter_b) if f not in ids]
+    if missing:
+        raise KeyError(f"Unknown fighter(s): {', '.join(missing)}")
+    a, b = ids[fighter_a], ids[fighter_b]
+    rd = current_rd(result, today)
+    return float(get_expected_score(result.rating[a], result.rating[b], rd[a], rd[b]))
+
+def run(conn=None):
+    """
+    Loads and replays the full history in one go.
+    """
+    return replay(ratingengine.load_history(conn))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    result = run()
+    df = ratings_frame(result)
+    print("\n--- TOP 10 FIGHTERS (GLICKO-2, 2+ fights) ---")
+    print(df[df['Fights'] >= 2].head(10).to_string(index=False))
+    if "--save" in sys.argv:
+        df.to_csv(RATINGS_FILE, index=False)
+        print(f"\nSaved ratings to '{RATINGS_FILE}'")
+    print(f"\n{len(result.history)} fights in {time.perf_counter() - start:.3f}s")
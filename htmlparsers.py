@@ -0,0 +1,363 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+import tracing
+from database import DRAW, NO_CONTEST, STAT_COLUMNS, WIN
+
+# parser backends for the ufcstats pages. All backends return exactly the
+# same tuples; BACKEND picks the fastest one that is installed:
+#   lxml        - lxml.html + targeted XPath (fastest)
+#   strainer    - BeautifulSoup limited to the table rows with a SoupStrainer
+#   html.parser - the original full BeautifulSoup tree (always available)
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+BACKENDS = (["lxml"] if HAS_LXML else []) + ["strainer", "html.parser"]
+BACKEND = BACKENDS[0]
+
+EVENT_ROW_CLASS = "b-statistics__table-row"
+FIGHT_ROW_CLASS = "b-fight-details__table-row"
+PERSON_NAME_CLASS = "b-fight-details__person-name"
+
+
+def _xpath_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+EVENT_ROWS_XPATH = f"//tr[{_xpath_class(EVENT_ROW_CLASS)}]"
+FIGHT_ROWS_XPATH = f"//tr[{_xpath_class(FIGHT_ROW_CLASS)}]"
+PERSON_NAMES_XPATH = f"//h3[{_xpath_class(PERSON_NAME_CLASS)}]"
+
+
+def _result(event_id, fighter_1, fighter_2, win_text, weight_class, method, round_num, time_val, ufc_ids=(None, None)):
+    """
+    Shared W/L logic so every backend decides winners the same way.
+    Both fighters are kept; for a win fighter_a is the winner.
+    """
+    fighter_a, fighter_b, outcome = fighter_1, fighter_2, NO_CONTEST # no result shown
+    ufc_a, ufc_b = ufc_ids
+
+    if len(win_text) > 0:
+        first_status = win_text[0].lower()
+        if 'draw' in first_status:
+            outcome = DRAW
+        elif 'nc' in first_status:
+            outcome = NO_CONTEST
+        elif 'win' in first_status:
+            outcome = WIN
+        else:
+            fighter_a, fighter_b, outcome = fighter_2, fighter_1, WIN
+            ufc_a, ufc_b = ufc_b, ufc_a
+
+    # the method cell holds two <p>s ("KO/TKO", "Punches") and the whitespace
+    # between them depends on the parser, so it is collapsed to single spaces
+    method = " ".join(method.split())
+
+    return (_fight_id(event_id, fighter_1, fighter_2), event_id, fighter_a, fighter_b, outcome, method, round_num, time_val, weight_class, ufc_a, ufc_b)
+
+def _fight_id(event_id, fighter_1, fighter_2):
+    return f"{event_id}_{fighter_1}_{fighter_2}".replace(" ", "")
+
+def _unique_fight_ids(rows):
+    # squashed names can collide on one card ('Jo Ao Silva' / 'Joao Silva');
+    # later rows get _2, _3 ... in page order, the same in every parser
+    seen = {}
+    out = []
+    for row in rows:
+        n = seen[row[0]] = seen.get(row[0], 0) + 1
+        out.append(row if n == 1 else (f"{row[0]}_{n}",) + tuple(row[1:]))
+    return out
+
+def _ufc_id(href):
+    # 'http://ufcstats.com/fighter-details/e9c3cc0c46751816' -> 'e9c3cc0c46751816'
+    return href.rstrip("/").rsplit("/", 1)[-1] if href else None
+
+def _href_soup(tag):
+    link = tag.find('a')
+    return link.get('href') if link else None
+
+def _href_lxml(el):
+    links = el.xpath('.//a/@href')
+    return links[0] if links else None
+
+
+# event listing (statistics/events/completed)
+def _events_soup(soup):
+    rows = soup.find_all('tr', class_=EVENT_ROW_CLASS)
+
+    events_data = []
+
+    # Skip the first row (header)
+    for row in rows[1:]:
+        cols = row.find_all('td')
+        if len(cols) < 2:
+            continue
+
+        # Extract Link and Name
+        link_tag = cols[0].find('a')
+        if not link_tag:
+            continue
+
+        event_url = link_tag['href']
+        event_name = link_tag.text.strip()
+        event_date = cols[0].find('span').text.strip()
+        event_location = cols[1].text.strip()
+        event_id = event_url.split('/')[-1]
+
+        events_data.append((event_id, event_name, event_date, event_location, event_url))
+
+    return events_data
+
+def _events_lxml(html):
+    tree = lxml.html.fromstring(html)
+
+    events_data = []
+
+    for row in tree.xpath(EVENT_ROWS_XPATH)[1:]:
+        cols = row.xpath('.//td')
+        if len(cols) < 2:
+            continue
+
+        links = cols[0].xpath('.//a')
+        if not links:
+            continue
+
+        event_url = links[0].get('href')
+        event_name = links[0].text_content().strip()
+        event_date = cols[0].xpath('.//span')[0].text_content().strip()
+        event_location = cols[1].text_content().strip()
+        event_id = event_url.split('/')[-1]
+
+        events_data.append((event_id, event_name, event_date, event_location, event_url))
+
+    return events_data
+
+
+# event details (event-details/<id>)
+def _fights_soup(event_id, soup):
+    rows = soup.find_all('tr', class_=FIGHT_ROW_CLASS)
+
+    fights_data = []
+
+    for row in rows:
+        cols = row.find_all('td')
+        if len(cols) < 10: continue
+
+        names_col = cols[1].find_all('p')
+        if len(names_col) < 2: continue
+
+        fights_data.append(_result(
+            event_id,
+            names_col[0].text.strip(),
+            names_col[1].text.strip(),
+            list(cols[0].stripped_strings),
+            cols[6].text.strip(),
+            cols[7].text.strip(),
+            cols[8].text.strip(),
+            cols[9].text.strip(),
+            (_ufc_id(_href_soup(names_col[0])), _ufc_id(_href_soup(names_col[1]))),
+        ))
+
+    return fights_data
+
+def _fights_lxml(event_id, html):
+    tree = lxml.html.fromstring(html)
+
+    fights_data = []
+
+    for row in tree.xpath(FIGHT_ROWS_XPATH):
+        cols = row.xpath('.//td')
+        if len(cols) < 10: continue
+
+        names_col = cols[1].xpath('.//p')
+        if len(names_col) < 2: continue
+
+        win_text = [t.strip() for t in cols[0].itertext() if t.strip()]
+        fights_data.append(_result(
+            event_id,
+            names_col[0].text_content().strip(),
+            names_col[1].text_content().strip(),
+            win_text,
+            cols[6].text_content().strip(),
+            cols[7].text_content().strip(),
+            cols[8].text_content().strip(),
+            cols[9].text_content().strip(),
+            (_ufc_id(_href_lxml(names_col[0])), _ufc_id(_href_lxml(names_col[1]))),
+        ))
+
+    return fights_data
+
+
+def _links_soup(event_id, soup):
+    links = []
+    for row in soup.find_all('tr', class_=FIGHT_ROW_CLASS):
+        cols = row.find_all('td')
+        names_col = cols[1].find_all('p') if len(cols) >= 10 else []
+        if len(names_col) < 2 or not row.get('data-link'): continue
+        links.append((_fight_id(event_id, names_col[0].text.strip(), names_col[1].text.strip()), row['data-link']))
+    return links
+
+def _links_lxml(event_id, html):
+    links = []
+    for row in lxml.html.fromstring(html).xpath(FIGHT_ROWS_XPATH):
+        cols = row.xpath('.//td')
+        names_col = cols[1].xpath('.//p') if len(cols) >= 10 else []
+        if len(names_col) < 2 or not row.get('data-link'): continue
+        links.append((_fight_id(event_id, names_col[0].text_content().strip(), names_col[1].text_content().strip()), row.get('data-link')))
+    return links
+
+
+# fight details (fight-details/<id>): a totals table and a significant
+# strikes table, each once for the whole fight and once split by round.
+# Every <td> holds one <p> per fighter. The backends only flatten the page
+# into header cells and data rows, _round_stats does the rest.
+
+# normalised header text -> round_stats columns ("17 of 42" fills both)
+STAT_HEADERS = {
+    'kd': ('kd',),
+    'sigstr': ('sig_landed', 'sig_attempted'),
+    'totalstr': ('total_landed', 'total_attempted'),
+    'td': ('td_landed', 'td_attempted'),
+    'subatt': ('sub_attempts',),
+    'rev': ('reversals',),
+    'ctrl': ('ctrl_seconds',),
+    'head': ('head_landed', 'head_attempted'),
+    'body': ('body_landed', 'body_attempted'),
+    'leg': ('leg_landed', 'leg_attempted'),
+    'distance': ('distance_landed', 'distance_attempted'),
+    'clinch': ('clinch_landed', 'clinch_attempted'),
+    'ground': ('ground_landed', 'ground_attempted'),
+}
+ROUND_RE = re.compile(r"round\s+(\d+)", re.IGNORECASE)
+
+def _stat_values(text, n):
+    """
+    '17 of 42' -> (17, 42), '4:05' -> (245,), '3' -> (3,); '--' and blanks -> None.
+    """
+    text = text.strip()
+    if n == 2:
+        m = re.match(r"(\d+)\s+of\s+(\d+)$", text)
+        return (int(m.group(1)), int(m.group(2))) if m else (None, None)
+    m = re.match(r"(\d+):(\d{2})$", text)
+    if m:
+        return (int(m.group(1)) * 60 + int(m.group(2)),)
+    return (int(text),) if text.isdigit() else (None,)
+
+def _round_stats(items):
+    """
+    [('th', text) | ('td', [[texts of each <p>] per cell])] in page order ->
+    [(round, side, values in STAT_COLUMNS order)], side 0/1 = first/second fighter.
+    """
+    stats = {}
+    header, in_header, round_num = [], False, 0
+    columns = []
+    for kind, value in items:
+        if kind == 'th':
+            m = ROUND_RE.match(value.strip())
+            if m:
+                round_num = int(m.group(1))
+                continue
+            if not in_header:
+                header, in_header, round_num = [], True, 0 # new table
+            header.append(re.sub(r"[^a-z%]", "", value.lower()))
+            continue
+        if in_header:
+            columns, in_header = header, False
+        if 'fighter' not in columns:
+            continue
+        for col, cell in zip(columns, value):
+            fields = STAT_HEADERS.get(col)
+            if fields is None:
+                continue
+            for side, text in enumerate(cell[:2]):
+                row = stats.setdefault((round_num, side), {})
+                row.update(zip(fields, _stat_values(text, len(fields))))
+
+    # whole-fight rows only when the page has no per round split
+    if any(r > 0 for r, _ in stats):
+        stats = {key: row for key, row in stats.items() if key[0] > 0}
+    return [(r, side, tuple(row.get(c) for c in STAT_COLUMNS)) for (r, side), row in sorted(stats.items())]
+
+def _details_soup(soup):
+    names = [(h.get_text(" ", strip=True), _ufc_id(_href_soup(h))) for h in soup.find_all('h3', class_=PERSON_NAME_CLASS)]
+    items = []
+    for el in soup.find_all(['th', 'tr']):
+        if el.name == 'th':
+            items.append(('th', el.get_text(" ", strip=True)))
+        elif el.find('td') is not None:
+            items.append(('td', [[p.get_text(" ", strip=True) for p in td.find_all('p')] for td in el.find_all('td')]))
+    return names, _round_stats(items)
+
+def _details_lxml(html):
+    tree = lxml.html.fromstring(html)
+    names = [(" ".join(h.text_content().split()), _ufc_id(_href_lxml(h))) for h in tree.xpath(PERSON_NAMES_XPATH)]
+    items = []
+    for el in tree.xpath('//th | //tr[td]'): # union comes back in document order
+        if el.tag == 'th':
+            items.append(('th', " ".join(el.text_content().split())))
+        else:
+            items.append(('td', [[" ".join(p.text_content().split()) for p in td.xpath('.//p')] for td in el.xpath('./td')]))
+    return names, _round_stats(items)
+
+
+def _strainer_soup(html, row_class):
+    # while parsing, the strainer sees the raw class string, not the split list
+    features = "lxml" if HAS_LXML else "html.parser"
+    class_re = re.compile(rf"(^|\s){re.escape(row_class)}(\s|$)")
+    return BeautifulSoup(html, features, parse_only=SoupStrainer('tr', class_=class_re))
+
+
+@tracing.timed("parse.event_list")
+def parse_event_list(html, backend=None):
+    """
+    Completed events listing -> [(event_id, name, date, location, url)].
+    """
+    backend = backend or BACKEND
+    if backend == "lxml":
+        return _events_lxml(html)
+    if backend == "strainer":
+        return _events_soup(_strainer_soup(html, EVENT_ROW_CLASS))
+    return _events_soup(BeautifulSoup(html, 'html.parser'))
+
+@tracing.timed("parse.event_fights")
+def parse_event_fights(event_id, html, backend=None):
+    """
+    Event details page -> [(fight_id, event_id, winner, loser, outcome, method, round, time, weight_class,
+    winner ufc_id, loser ufc_id)], ufc ids from the fighter-details links (None if missing).
+    """
+    backend = backend or BACKEND
+    if backend == "lxml":
+        return _unique_fight_ids(_fights_lxml(event_id, html))
+    if backend == "strainer":
+        return _unique_fight_ids(_fights_soup(event_id, _strainer_soup(html, FIGHT_ROW_CLASS)))
+    return _unique_fight_ids(_fights_soup(event_id, BeautifulSoup(html, 'html.parser')))
+
+@tracing.timed("parse.fight_links")
+def parse_fight_links(event_id, html, backend=None):
+    """
+    Event details page -> [(fight_id, fight-details url)], fight_id as in parse_event_fights.
+    """
+    backend = backend or BACKEND
+    if backend == "lxml":
+        return _unique_fight_ids(_links_lxml(event_id, html))
+    if backend == "strainer":
+        return _unique_fight_ids(_links_soup(event_id, _strainer_soup(html, FIGHT_ROW_CLASS)))
+    return _unique_fight_ids(_links_soup(event_id, BeautifulSoup(html, 'html.parser')))
+
+@tracing.timed("parse.fight_details")
+def parse_fight_details(html, backend=None):
+    """
+    Fight details page -> ([(name, ufc_id) in page order], [(round, side, stats)]),
+    stats in database.STAT_COLUMNS order. No rows if the page has no stats.
+    """
+    backend = backend or BACKEND
+    if backend == "lxml":
+        return _details_lxml(html)
+    if backend == "strainer":
+        features = "lxml" if HAS_LXML else "html.parser"
+        return _details_soup(BeautifulSoup(html, features, parse_only=SoupStrainer(['h3', 'th', 'tr'])))
+    return _details_soup(BeautifulSoup(html, 'html.parser'))
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# on-disk response cache for the scrapers. Bodies are zlib-compressed in a
+# small SQLite file keyed by URL. Past event/fight pages never change so they
+# are kept forever, the completed-events index is only trusted for an hour
+# and then revalidated with ETag / Last-Modified. Corrected pages are picked
+# up with --rescrape, which revalidates even the permanent entries.
+
+# config
+CACHE_DB = "http_cache.db"
+INDEX_TTL = 60 * 60 # completed events listing
+DEFAULT_TTL = 24 * 60 * 60
+PERMANENT_PATHS = ("/event-details/", "/fight-details/")
+
+# offline replay: serve everything from the cache and never touch the network
+OFFLINE = os.environ.get("UFC_OFFLINE") == "1"
+
+
+class CacheMiss(Exception):
+    pass
+
+
+def ttl_for(url):
+    """
+    Seconds a cached copy of `url` stays fresh, None for forever.
+    """
+    if any(path in url for path in PERMANENT_PATHS):
+        return None
+    if "/statistics/events/" in url:
+        return INDEX_TTL
+    return DEFAULT_TTL
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    expires_at REAL
+                )
+            ''')
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+    def get(self, url):
+        """
+        Returns (body, etag, last_modified, fresh) or None.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, expires_at = row
+        fresh = expires_at is None or expires_at > time.time()
+        return zlib.decompress(body), etag, last_modified, fresh
+
+    def put(self, url, body, etag=None, last_modified=None):
+        now = time.time()
+        ttl = ttl_for(url)
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO responses (url, body, etag, last_modified, fetched_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (url, zlib.compress(body, 6), etag, last_modified, now, None if ttl is None else now + ttl))
+
+    def touch(self, url):
+        """
+        Marks a revalidated (304) entry as fresh again.
+        """
+        now = time.time()
+        ttl = ttl_for(url)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, expires_at = ? WHERE url = ?",
+                (now, None if ttl is None else now + ttl, url),
+            )
+
+    def count(self, field):
+        # hits / misses / revalidated, bumped from the scraper worker threads
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self):
+        with self.lock:
+            return f"cache: {self.hits} hits, {self.revalidated} revalidated, {self.misses} downloaded"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
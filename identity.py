@@ -0,0 +1,119 @@
+import sys
+from collections import defaultdict
+
+import database
+import tracing
+from database import normalize
+
+# fighter identity for the scrapers. ufcstats gives every fighter a page
+# (fighter-details/<ufc_id>, read by htmlparsers), and that id, not the spelling of the name, is
+# what identifies a fighter:
+#   fighters.ufc_id                  the ufcstats id, once a page row has shown it
+#   fighter_aliases(alias_key, id)   every normalized spelling seen for a fighter
+# alias_key is database.normalize(name) ('José Aldo' / 'Jose  Aldo' ->
+# 'jose aldo'). FighterResolver loads both into dicts once, so resolving a
+# row during ingest is a couple of dict lookups; normalized keys are cached
+# per raw name, so each spelling is normalized once per run.
+#
+# resolution order: ufc_id, then the exact name, then the alias key. A row
+# whose ufc_id is new but whose name belongs to a fighter with another
+# ufc_id is a different person with the same name; they get a new fighter
+# with a numbered display name ('Bruno Silva (2)') so their careers stay apart.
+
+class FighterResolver:
+    def __init__(self, conn):
+        self.conn = conn
+        self.by_ufc = {}
+        self.ufc_of = {}
+        self.by_name = {}
+        for fighter_id, name, ufc_id in conn.execute("SELECT id, name, ufc_id FROM fighters"):
+            self.by_name[name] = fighter_id
+            if ufc_id:
+                self.by_ufc[ufc_id] = fighter_id
+                self.ufc_of[fighter_id] = ufc_id
+        self.by_key = defaultdict(list)
+        self.aliases = set()
+        for key, fighter_id in conn.execute("SELECT alias_key, fighter_id FROM fighter_aliases"):
+            self.by_key[key].append(fighter_id)
+            self.aliases.add((key, fighter_id))
+        self._keys = {} # raw name -> alias key
+
+    def key(self, name):
+        key = self._keys.get(name)
+        if key is None:
+            key = self._keys[name] = normalize(name)
+        return key
+
+    def resolve(self, name, ufc_id=None):
+        """
+        Fighter id for a name (and ufcstats id, if the page had one), creating the fighter if needed.
+        Writes go through self.conn, so call it inside the caller's transaction.
+        """
+        name = " ".join(name.split())
+        key = self.key(name)
+
+        fighter_id = self.by_ufc.get(ufc_id) if ufc_id else None
+        if fighter_id is None:
+            exact = self.by_name.get(name)
+            candidates = ([exact] if exact is not None else []) + [f for f in self.by_key.get(key, ()) if f != exact]
+            if ufc_id:
+                # only a fighter we don't have an id for yet can be this one
+                candidates = [f for f in candidates if f not in self.ufc_of]
+            elif exact is None and len(candidates) > 1:
+                candidates = [] # ambiguous spelling, don't guess
+            fighter_id = candidates[0] if candidates else self._new_fighter(name)
+            if ufc_id:
+                self._set_ufc_id(fighter_id, ufc_id)
+
+        if (key, fighter_id) not in self.aliases:
+            self.conn.execute("INSERT OR IGNORE INTO fighter_aliases (alias_key, fighter_id) VALUES (?, ?)", (key, fighter_id))
+            self.aliases.add((key, fighter_id))
+            self.by_key[key].append(fighter_id)
+        return fighter_id
+
+    def resolve_many(self, people):
+        """
+        [(name, ufc_id or None)] -> [fighter id].
+        """
+        return [self.resolve(name, ufc_id) for name, ufc_id in people]
+
+    def _new_fighter(self, name):
+        display = name
+        n = 2
+        while display in self.by_name:
+            display = f"{name} ({n})"
+            n += 1
+        fighter_id = self.conn.execute("INSERT INTO fighters (name) VALUES (?)", (display,)).lastrowid
+        self.by_name[display] = fighter_id
+        tracing.count("identity.new_fighters")
+        return fighter_id
+
+    def _set_ufc_id(self, fighter_id, ufc_id):
+        self.conn.execute("UPDATE fighters SET ufc_id = ? WHERE id = ?", (ufc_id, fighter_id))
+        self.by_ufc[ufc_id] = fighter_id
+        self.ufc_of[fighter_id] = ufc_id
+        tracing.count("identity.ufc_ids_attached")
+
+
+def possible_duplicates(conn):
+    """
+    Alias keys shared by more than one fighter: [(alias_key, [names])]. Either
+    a spelling variant stored twice before ufc ids were scraped, or two people
+    with the same name.
+    """
+    names = database.fighter_names(conn)
+    rows = conn.execute('''
+        SELECT alias_key, GROUP_CONCAT(fighter_id) FROM fighter_aliases
+        GROUP BY alias_key HAVING COUNT(*) > 1 ORDER BY alias_key
+    ''').fetchall()
+    return [(key, [names[int(i)] for i in ids.split(",")]) for key, ids in rows]
+
+
+if __name__ == "__main__":
+    # python identity.py          -> fighters sharing a normalized name
+    conn = database.connect(sys.argv[1] if len(sys.argv) > 1 else database.DB_NAME)
+    total, with_id = conn.execute("SELECT COUNT(*), COUNT(ufc_id) FROM fighters").fetchone()
+    print(f"{total} fighters, {with_id} with a ufcstats id")
+    for key, names in possible_duplicates(conn):
+        print(f"  {key}: {' | '.join(names)}")
+    conn.close()
@@ -0,0 +1,97 @@
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlparse
+
+import pandas as pd
+
+# local load test for predictserver.py. Starts the server (unless --url is
+# given), fires GET /predict requests from a few keep-alive connections and
+# reports p50/p99 latency and requests per second.
+
+# config
+REQUESTS = 5000
+CONNECTIONS = 4
+PORT = 8765
+SEED = 42
+
+def make_pairs(n, seed=SEED):
+    """
+    Mostly same-division matchups (what dashboard users click through), with repeats.
+    """
+    stats = pd.read_csv("fighter_stats.csv")
+    rng = random.Random(seed)
+    by_class = {wc: grp['Fighter'].tolist() for wc, grp in stats.groupby('Weight_Class') if len(grp) > 1}
+    classes = list(by_class)
+    pool = [tuple(rng.sample(by_class[rng.choice(classes)], 2)) for _ in range(max(1, n // 4))]
+    return [rng.choice(pool) for _ in range(n)]
+
+def worker(host, port, pairs, latencies, errors):
+    conn = http.client.HTTPConnection(host, port)
+    for a, b in pairs:
+        start = time.perf_counter()
+        conn.request("GET", f"/predict?a={quote(a)}&b={quote(b)}")
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+def wait_for(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("prediction server did not come up")
+
+def main(url=None, requests=REQUESTS, connections=CONNECTIONS):
+    server = None
+    if url is None:
+        server = subprocess.Popen([sys.executable, "predictserver.py", "--port", str(PORT)], stdout=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{PORT}"
+    parsed = urlparse(url)
+    host, port = parsed.hostname, parsed.port or 80
+
+    try:
+        wait_for(host, port)
+        pairs = make_pairs(requests)
+        chunks = [pairs[i::connections] for i in range(connections)]
+        latencies, errors = [], []
+
+        threads = [threading.Thread(target=worker, args=(host, port, chunk, latencies, errors)) for chunk in chunks]
+        start = time.perf_counter()
+        for t in threads: t.start()
+        for t in threads: t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat = pd.Series(latencies) * 1000
+    report = {
+        'requests': len(latencies),
+        'connections': connections,
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(lat.quantile(0.50), 3),
+        'p99_ms': round(lat.quantile(0.99), 3),
+        'max_ms': round(lat.max(), 3),
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    url = sys.argv[sys.argv.index("--url") + 1] if "--url" in sys.argv else None
+    requests = int(sys.argv[sys.argv.index("--requests") + 1]) if "--requests" in sys.argv else REQUESTS
+    main(url=url, requests=requests)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+import predictor
+
+# offline build of the all-pairs win probability matrix for every weight
+# class. matrix[i, j] = P(fighter i beats fighter j) with i in the red corner,
+# stored as float32 .npy (memory-mapped at load time) next to a json list of
+# fighter names. The manifest records hashes of the stats and model files so
+# the matrices are only rebuilt when one of them changes.
+
+# config
+MATRIX_DIR = "matchup_matrices"
+MANIFEST = "manifest.json"
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_hashes(stats_path, model_path):
+    return {'stats_sha256': file_hash(stats_path), 'model_sha256': file_hash(model_path)}
+
+def slug(weight_class):
+    return re.sub(r"[^a-z0-9]+", "_", weight_class.lower()).strip("_") or "unknown"
+
+def read_manifest(out_dir=MATRIX_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def is_current(stats_path=predictor.STATS_FILE, model_path=predictor.MODEL_FILE, out_dir=MATRIX_DIR):
+    manifest = read_manifest(out_dir)
+    return manifest is not None and manifest['sources'] == source_hashes(stats_path, model_path)
+
+
+def build(stats_path=predictor.STATS_FILE, model_path=predictor.MODEL_FILE, out_dir=MATRIX_DIR, force=False):
+    """
+    Computes and saves every weight class matrix. Skips the work if the
+    stats and model haven't changed since the last build. Returns True if it built.
+    """
+    sources = source_hashes(stats_path, model_path)
+    manifest = read_manifest(out_dir)
+    if not force and manifest is not None and manifest['sources'] == sources:
+        print("Matchup matrices are up to date.")
+        return False
+
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    model = predictor.MatchupPredictor.from_files(stats_path, model_path)
+    stats = model.stats
+
+    classes = {}
+    for weight_class in stats['Weight_Class'].astype(str).unique():
+        names = stats.loc[stats['Weight_Class'].astype(str) == weight_class, 'Fighter'].drop_duplicates().tolist()
+        rows = model.lookup(names)
+        n = len(rows)
+
+        # every ordered pair (i, j), i != j, scored in one batch
+        ii, jj = np.nonzero(~np.eye(n, dtype=bool))
+        matrix = np.full((n, n), np.nan, dtype=np.float32)
+        if len(ii):
+            X = model._features(rows[ii], rows[jj])[0]
+            matrix[ii, jj] = model.model.predict_proba(X)[:, 1]
+
+        name = slug(weight_class)
+        np.save(os.path.join(out_dir, f"{name}.npy"), matrix)
+        with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+            json.dump(names, f)
+        classes[weight_class] = name
+        print(f"{weight_class}: {n} fighters, {len(ii)} matchups")
+
+    # manifest last, so a half finished build is never picked up as current
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({'sources': sources, 'classes': classes, 'built_at': time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+
+    print(f"Built {len(classes)} matrices in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+class MatchupMatrices:
+    """
+    Memory-mapped matrices with an O(1) name -> (class, position) index.
+    """
+    def __init__(self, out_dir=MATRIX_DIR):
+        manifest = read_manifest(out_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No matchup matrices in {out_dir}, run matchupmatrix.py first")
+
+        self.matrices = []
+        self.position = {} # fighter -> (class id, index in that class)
+        for weight_class, name in manifest['classes'].items():
+            with open(os.path.join(out_dir, f"{name}.json")) as f:
+                names = json.load(f)
+            class_id = len(self.matrices)
+            self.matrices.append(np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r"))
+            for i, fighter in enumerate(names):
+                self.position.setdefault(fighter, (class_id, i))
+
+    def lookup(self, fighter_a, fighter_b):
+        """
+        P(a beats b), or None if the two aren't in the same weight class matrix.
+        """
+        pa = self.position.get(fighter_a)
+        pb = self.position.get(fighter_b)
+        if pa is None or pb is None or pa[0] != pb[0] or fighter_a == fighter_b:
+            return None
+        return float(self.matrices[pa[0]][pa[1], pb[1]])
+
+    def lookup_many(self, fighters_a, fighters_b):
+        """
+        Vectorized lookup: float64 array with NaN where no matrix covers the pair.
+        """
+        out = np.full(len(fighters_a), np.nan)
+        none = (-1, -1)
+        pos_a = np.array([self.position.get(f, none) for f in fighters_a], dtype=np.int64).reshape(-1, 2)
+        pos_b = np.array([self.position.get(f, none) for f in fighters_b], dtype=np.int64).reshape(-1, 2)
+        same = (pos_a[:, 0] == pos_b[:, 0]) & (pos_a[:, 0] >= 0)
+        for class_id in np.unique(pos_a[same, 0]):
+            sel = same & (pos_a[:, 0] == class_id)
+            out[sel] = self.matrices[class_id][pos_a[sel, 1], pos_b[sel, 1]]
+        return out
+
+
+def load(stats_path=predictor.STATS_FILE, model_path=predictor.MODEL_FILE, out_dir=MATRIX_DIR):
+    """
+    MatchupMatrices if they exist and match the current stats/model, else None.
+    """
+    if not is_current(stats_path, model_path, out_dir):
+        return None
+    return MatchupMatrices(out_dir)
+
+
+if __name__ == "__main__":
+    build(force="--force" in sys.argv)
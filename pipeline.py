@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date
+
+import database
+
+# one command for a data refresh. Every script is a stage of a DAG with the
+# tables / files it reads as inputs; before a stage runs the pipeline hashes
+# those inputs (plus the stage's own code) and skips it if nothing changed
+# since its last successful run and its outputs are still there:
+#
+#   scrape_events -> scrape_fights -> elo -> stats
+#                                  -> training_data -> train
+#                                  -> fight_details
+#
+# stages whose dependencies are done run in parallel, each script in its own
+# process. The scrapers read the website, which can't be hashed, so they
+# always run but only with --scrape; after them a card with no new fights
+# leaves the fights table hash alone and everything downstream is skipped.
+# Hashes of the last good run are kept in STATE_FILE.
+#
+# elo and stats both rewrite the engine state tables (ratingengine.update),
+# so stats waits for elo instead of racing it. The stats export measures
+# Months_Inactive against today, so "date:today" in its inputs reruns it once a day.
+
+# config
+DB_NAME = database.DB_NAME
+STATE_FILE = "pipeline_state.json"
+WORKERS = 3 # the widest level of the DAG
+ENGINE = ["ratingengine.py", "engine_config.json"] # elo maths + tuned config, shared by the derived stages
+TABLE_ORDER = {'events': 'id', 'fights': 'fight_id', 'fighters': 'id'} # stable order whatever the rowids are
+HISTORY = ["table:fights", "table:fighters"] # what ratingengine.load_history reads
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    deps: tuple = ()
+    inputs: tuple = ()   # "table:<name>", "date:today" or file paths, missing files hash as missing
+    outputs: tuple = ()
+    source: bool = False # reads the network, always runs (with --scrape)
+
+STAGES = [
+    Stage("scrape_events", "scraper.py", source=True),
+    Stage("scrape_fights", "scrape_fights.py", ("scrape_events",), source=True),
+    Stage("fight_details", "scrape_fight_details.py", ("scrape_fights",), source=True),
+    Stage("elo", "eloengine.py", ("scrape_fights",),
+          (*HISTORY, *ENGINE, "ratingtimeline.py"),
+          ("current_ratings.csv", "rating_timeline/manifest.json")),
+    Stage("stats", "exportcurrentstats.py", ("elo",),
+          (*HISTORY, *ENGINE, "statssnapshot.py", "glickoengine.py", "date:today"),
+          ("fighter_stats.csv", "fighter_stats.npz", "current_glicko_ratings.csv")),
+    Stage("training_data", "preptrainingdata.py", ("scrape_fights",),
+          (*HISTORY, *ENGINE),
+          ("ufc_training_data_v2.csv", "training_data/manifest.json")),
+    Stage("train", "trainmodel.py", ("training_data",),
+          ("training_data/manifest.json", "training_data/X.npy", "training_data/target.npy", "forestmodel.py", "preptrainingdata.py"),
+          ("ufc_predictor_v2.pkl", "ufc_predictor_v2.npz")),
+]
+
+
+def _file_hash(path):
+    if not os.path.exists(path):
+        return "missing"
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _table_hash(conn, table):
+    h = hashlib.sha256()
+    cursor = conn.execute(f"SELECT * FROM {table} ORDER BY {TABLE_ORDER[table]}")
+    while rows := cursor.fetchmany(4096):
+        h.update(repr(rows).encode())
+    return h.hexdigest()
+
+def input_hashes(stage, conn):
+    """
+    {input: sha256} for a stage, its script included.
+    """
+    hashes = {}
+    for item in (stage.script, *stage.inputs):
+        if item.startswith("table:"):
+            hashes[item] = _table_hash(conn, item[len("table:"):])
+        elif item == "date:today":
+            hashes[item] = date.today().isoformat()
+        else:
+            hashes[item] = _file_hash(item)
+    return hashes
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, path=STATE_FILE):
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def is_fresh(stage, hashes, state):
+    """
+    True if the last successful run saw the same inputs and left all outputs in place.
+    """
+    return (not stage.source and state.get(stage.name, {}).get('inputs') == hashes
+            and all(os.path.exists(p) for p in stage.outputs))
+
+
+def run_stage(stage, args=()):
+    """
+    Runs one stage's script, returns (returncode, output, seconds).
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, stage.script, *args], capture_output=True, text=True)
+    return proc.returncode, proc.stdout + proc.stderr, time.perf_counter() - start
+
+def _report(stage, returncode, output, seconds):
+    status = "done" if returncode == 0 else f"FAILED (exit {returncode})"
+    print(f"[{stage.name}] {status} in {seconds:.1f}s")
+    if returncode != 0 or "--verbose" in sys.argv:
+        for line in output.rstrip().splitlines():
+            print(f"  {stage.name} | {line}")
+
+
+def run(stages=None, scrape=False, force=False, workers=WORKERS, stage_args=None):
+    """
+    Brings every stage up to date, dependencies first. Returns {stage: 'ran' | 'skipped' | 'failed'}.
+    """
+    stages = [s for s in (stages or STAGES) if scrape or not s.source]
+    names = {s.name for s in stages}
+    stage_args = stage_args or {}
+    state = load_state()
+    status = {}
+    conn = database.connect(DB_NAME)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        pending = list(stages)
+        while pending or running:
+            for stage in list(pending):
+                deps = [d for d in stage.deps if d in names]
+                if any(status.get(d) == 'failed' for d in deps):
+                    pending.remove(stage)
+                    status[stage.name] = 'failed'
+                    print(f"[{stage.name}] not run, a dependency failed")
+                    continue
+                if not all(d in status for d in deps):
+                    continue
+                pending.remove(stage)
+                hashes = input_hashes(stage, conn)
+                if not force and is_fresh(stage, hashes, state):
+                    status[stage.name] = 'skipped'
+                    print(f"[{stage.name}] up to date")
+                    continue
+                print(f"[{stage.name}] running {stage.script}...")
+                running[pool.submit(run_stage, stage, stage_args.get(stage.name, ()))] = (stage, hashes)
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, hashes = running.pop(future)
+                returncode, output, seconds = future.result()
+                _report(stage, returncode, output, seconds)
+                if returncode == 0:
+                    status[stage.name] = 'ran'
+                    # hashes from before the run: inputs changed mid-run get picked up next time
+                    state[stage.name] = {'inputs': hashes, 'finished_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+                    save_state(state)
+                else:
+                    status[stage.name] = 'failed'
+
+    conn.close()
+    return status
+
+def show_status():
+    """
+    Prints whether each stage is fresh given its inputs right now.
+    """
+    state = load_state()
+    conn = database.connect(DB_NAME)
+    for stage in STAGES:
+        if stage.source:
+            print(f"{stage.name:15} source, runs with --scrape")
+            continue
+        last = state.get(stage.name, {}).get('finished_at', 'never')
+        fresh = is_fresh(stage, input_hashes(stage, conn), state)
+        print(f"{stage.name:15} {'up to date' if fresh else 'stale':12} last run {last}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    # python pipeline.py              -> rebuild whatever is stale from the current db
+    # python pipeline.py --scrape     -> fetch new events / fights first (add --offline for the http cache only)
+    # --force reruns every stage, --status only reports, --verbose prints every stage's output
+    if "--status" in sys.argv:
+        show_status()
+        sys.exit(0)
+
+    start = time.perf_counter()
+    offline = ["--offline"] if "--offline" in sys.argv else []
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else WORKERS
+    status = run(
+        scrape="--scrape" in sys.argv or bool(offline),
+        force="--force" in sys.argv,
+        workers=workers,
+        stage_args={'scrape_events': offline, 'scrape_fights': offline, 'fight_details': offline},
+    )
+    counts = {k: list(status.values()).count(k) for k in ('ran', 'skipped', 'failed')}
+    print(f"\n{counts['ran']} ran, {counts['skipped']} up to date, {counts['failed']} failed ({time.perf_counter() - start:.2f}s)")
+    sys.exit(1 if counts['failed'] else 0)
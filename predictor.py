@@ -0,0 +1,329 @@
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import forestmodel
+import glickoengine
+import statssnapshot
+import tracing
+
+# batch matchup prediction, independent of streamlit. Features for N matchups
+# are built with vectorized lookups into fighter_stats.csv and scored with a
+# single predict_proba call. When the glicko deviations have been exported
+# (glickoengine.RATINGS_FILE) the probability is shrunk towards 0.5 for
+# fighters whose rating is still uncertain (glickoengine.confidence_shrink).
+
+# config
+STATS_FILE = "fighter_stats.csv"
+MODEL_FILE = "ufc_predictor_v2.pkl"
+RD_FILE = glickoengine.RATINGS_FILE
+UNCERTAIN_RD = 140 # a fighter above this deviation gets the 'uncertainty' factor (STARTING_RD is the cap)
+FEATURES = ['elo_diff', 'streak_diff', 'months_since_diff', 'exp_diff']
+
+WEIGHT_ORDER = {
+    'Flyweight': 1, 'Bantamweight': 2, 'Featherweight': 3, 'Lightweight': 4,
+    'Welterweight': 5, 'Middleweight': 6, 'Light Heavyweight': 7, 'Heavyweight': 8
+}
+SIZE_PENALTY = 0.10 # effective ELO lost per weight class of size difference
+
+@tracing.timed("stats.load")
+def load_stats(path=STATS_FILE):
+    # typed .npz snapshot when it matches the csv, the csv otherwise
+    return statssnapshot.load_stats(path)
+
+@tracing.timed("model.load")
+def load_model(path=MODEL_FILE):
+    # packed numpy forest (forestmodel.py) when it matches the pickle, so
+    # sklearn is only imported if the export is missing or stale
+    forest = forestmodel.load(path)
+    if forest is not None:
+        return forest
+    import joblib
+    return joblib.load(path)
+
+def load_rd(path=RD_FILE):
+    # {fighter: current glicko deviation}, None until exportcurrentstats.py has written it
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path, usecols=['Fighter', 'RD'])
+    return dict(zip(df['Fighter'], df['RD']))
+
+
+def size_adjusted_elo(elo_a, elo_b, size_a, size_b):
+    """
+    Size penalty depending on weight class: the smaller fighter loses 10%
+    effective ELO per class of difference. Sizes of 0 (unknown) are ignored.
+    Returns (adj_elo_a, adj_elo_b, class_diff) as arrays.
+    """
+    known = (size_a > 0) & (size_b > 0)
+    diff = np.where(known, size_a - size_b, 0)
+    penalty = np.abs(diff) * SIZE_PENALTY
+    adj_a = np.where(diff < 0, elo_a * (1 - penalty), elo_a)
+    adj_b = np.where(diff > 0, elo_b * (1 - penalty), elo_b)
+    return adj_a, adj_b, diff
+
+
+def penalty_message(fighter_a, fighter_b, class_diff):
+    if class_diff > 0:
+        return f"SIZE MISMATCH: {fighter_b} loses {int(class_diff * SIZE_PENALTY * 100)}% effective ELO due to size difference ({class_diff} classes)."
+    if class_diff < 0:
+        return f"SIZE MISMATCH: {fighter_a} loses {int(-class_diff * SIZE_PENALTY * 100)}% effective ELO due to size difference ({-class_diff} classes)."
+    return ""
+
+def explain(winner, elo_gap, winner_streak, streak_gap, inactive_gap, uncertain=None):
+    """
+    Key factors behind a pick as [(kind, message)]; gaps are winner minus loser
+    (inactive_gap is loser minus winner). `uncertain` is (name, RD) of the
+    least known fighter when that deviation is above UNCERTAIN_RD.
+    """
+    factors = []
+    if elo_gap > 0:
+        factors.append(('edge', f"📈 Effective Skill Edge: {winner} has a higher adjusted ELO (+{int(elo_gap)})."))
+    if streak_gap >= 3:
+        factors.append(('momentum', f"🔥 Momentum: {winner} is on a {int(winner_streak)}-fight win streak."))
+    if inactive_gap > 6:
+        factors.append(('activity', f"⚡ Activity: {winner} has been far more active."))
+    if uncertain is not None:
+        name, rd = uncertain
+        factors.append(('uncertainty', f"❓ Uncertainty: {name}'s rating is still unsettled (RD {int(rd)}), so the pick is pulled towards a coin flip."))
+    return factors
+
+
+class MatchupPredictor:
+    def __init__(self, stats, model, matrices=None, rd=None):
+        self.stats = stats.reset_index(drop=True)
+        self.model = model
+        # optional precomputed per weight class probabilities (matchupmatrix.py)
+        self.matrices = matrices
+
+        # first row wins for duplicate names, same as df[df['Fighter'] == x].iloc[0]
+        names = self.stats['Fighter']
+        first = ~names.duplicated()
+        self.rows = pd.Series(np.flatnonzero(first.to_numpy()), index=names[first].to_numpy())
+        self.row_of = dict(zip(self.rows.index, self.rows.tolist()))
+
+        self.elo = statssnapshot.exact(self.stats, 'ELO')
+        self.streak = self.stats['Streak'].to_numpy(dtype=np.float64)
+        self.inactive = statssnapshot.exact(self.stats, 'Months_Inactive')
+        self.total = self.stats['Total_Fights'].to_numpy(dtype=np.float64)
+        if 'Weight_Class' in self.stats.columns:
+            self.size = self.stats['Weight_Class'].astype(str).map(WEIGHT_ORDER).fillna(0).to_numpy(dtype=np.int64)
+        else:
+            self.size = np.zeros(len(self.stats), dtype=np.int64)
+        # optional {fighter: glicko RD}; fighters it doesn't know count as brand new
+        self.rd = None
+        if rd is not None:
+            self.rd = self.stats['Fighter'].map(rd).fillna(glickoengine.STARTING_RD).to_numpy(dtype=np.float64)
+
+    @classmethod
+    def from_files(cls, stats_path=STATS_FILE, model_path=MODEL_FILE, matrices=None, rd_path=RD_FILE):
+        return cls(load_stats(stats_path), load_model(model_path), matrices, load_rd(rd_path))
+
+    def lookup(self, names):
+        """
+        Fighter names -> row positions in the stats table.
+        """
+        idx = self.rows.reindex(names)
+        missing = idx.isna()
+        if missing.any():
+            raise KeyError(f"Unknown fighter(s): {', '.join(map(str, idx.index[missing.to_numpy()]))}")
+        return idx.to_numpy(dtype=np.int64)
+
+    def features(self, fighters_a, fighters_b):
+        """
+        Builds the model input for every A vs B pair. Returns
+        (X, adj_elo_a, adj_elo_b, class_diff).
+        """
+        return self._features(self.lookup(fighters_a), self.lookup(fighters_b))
+
+    def _features(self, a, b):
+        adj_a, adj_b, diff = size_adjusted_elo(self.elo[a], self.elo[b], self.size[a], self.size[b])
+
+        X = pd.DataFrame({
+            'elo_diff': adj_a - adj_b,
+            'streak_diff': self.streak[a] - self.streak[b],
+            'months_since_diff': self.inactive[a] - self.inactive[b],
+            'exp_diff': self.total[a] - self.total[b],
+        }, columns=FEATURES)
+        return X, adj_a, adj_b, diff
+
+    def win_probability(self, fighters_a, fighters_b, X):
+        """
+        P(A beats B) for every row: from the matchup matrices where both
+        fighters share a weight class, from the model for everything else.
+        """
+        p_a = np.full(len(X), np.nan)
+        if self.matrices is not None and len(X):
+            p_a = self.matrices.lookup_many(fighters_a, fighters_b)
+
+        # float32 storage can push a coin flip across 0.5, let the model decide those
+        need = np.isnan(p_a) | (np.abs(p_a - 0.5) < 1e-6)
+        if need.any():
+            p_a[need] = self.model.predict_proba(X[need])[:, 1]
+        return p_a
+
+    def shrink(self, a, b, p_a):
+        """
+        p_a pulled towards 0.5 by the pair's glicko deviations (unchanged without them).
+        """
+        if self.rd is None:
+            return p_a
+        return 0.5 + (p_a - 0.5) * glickoengine.confidence_shrink(self.rd[a], self.rd[b])
+
+    def _uncertain(self, names, rows):
+        # (name, RD) of the least known of the fighters, if above UNCERTAIN_RD
+        if self.rd is None:
+            return None
+        rds = self.rd[rows]
+        i = int(np.argmax(rds))
+        return (names[i], rds[i]) if rds[i] > UNCERTAIN_RD else None
+
+    @tracing.timed("predict.batch")
+    def predict(self, fighters_a, fighters_b):
+        """
+        Scores N matchups with one predict_proba call. Returns a DataFrame with
+        the winner, confidence and the explanation factors for every row.
+        """
+        fighters_a = list(fighters_a)
+        fighters_b = list(fighters_b)
+        same = [x for x, y in zip(fighters_a, fighters_b) if x == y]
+        if same:
+            raise ValueError(f"A fighter can't fight themselves: {', '.join(same)}")
+
+        a = self.lookup(fighters_a)
+        b = self.lookup(fighters_b)
+        X, adj_a, adj_b, diff = self._features(a, b)
+        p_a = self.shrink(a, b, self.win_probability(fighters_a, fighters_b, X))
+
+        a_wins = p_a > 0.5
+        names_a = np.array(fighters_a, dtype=object)
+        names_b = np.array(fighters_b, dtype=object)
+
+        out = pd.DataFrame({
+            'fighter_a': names_a,
+            'fighter_b': names_b,
+            'prob_a': p_a,
+            'winner': np.where(a_wins, names_a, names_b),
+            'loser': np.where(a_wins, names_b, names_a),
+            'confidence': np.where(a_wins, p_a, 1.0 - p_a),
+            'adj_elo_a': adj_a,
+            'adj_elo_b': adj_b,
+        })
+
+        # explanation factors, computed for the whole batch at once
+        elo_gap = np.where(a_wins, adj_a - adj_b, adj_b - adj_a)
+        streak_w = np.where(a_wins, self.streak[a], self.streak[b])
+        streak_gap = streak_w - np.where(a_wins, self.streak[b], self.streak[a])
+        inactive_gap = np.where(a_wins, self.inactive[b] - self.inactive[a], self.inactive[a] - self.inactive[b])
+
+        penalty_msgs = [penalty_message(names_a[i], names_b[i], int(diff[i])) for i in range(len(out))]
+        factors = [
+            explain(winner, elo_gap[i], streak_w[i], streak_gap[i], inactive_gap[i],
+                    self._uncertain((names_a[i], names_b[i]), [a[i], b[i]]))
+            for i, winner in enumerate(out['winner'])
+        ]
+
+        out['penalty_msg'] = penalty_msgs
+        out['factors'] = factors
+        return out
+
+    @tracing.timed("predict.one")
+    def predict_one(self, fighter_a, fighter_b):
+        """
+        Single matchup without the DataFrame overhead of predict(). Returns a
+        dict with the same fields as a predict() row.
+        """
+        if fighter_a == fighter_b:
+            raise ValueError(f"A fighter can't fight themselves: {fighter_a}")
+        a = self.row_of.get(fighter_a)
+        b = self.row_of.get(fighter_b)
+        if a is None or b is None:
+            missing = [f for f, row in ((fighter_a, a), (fighter_b, b)) if row is None]
+            raise KeyError(f"Unknown fighter(s): {', '.join(missing)}")
+
+        adj_a, adj_b, diff = (float(x) for x in size_adjusted_elo(self.elo[a], self.elo[b], self.size[a], self.size[b]))
+        diff = int(diff)
+
+        p_a = self.matrices.lookup(fighter_a, fighter_b) if self.matrices is not None else None
+        if p_a is None or abs(p_a - 0.5) < 1e-6:
+            X = self._features(np.array([a]), np.array([b]))[0]
+            p_a = float(self.model.predict_proba(X)[0, 1])
+        p_a = float(self.shrink(a, b, p_a))
+
+        a_wins = p_a > 0.5
+        w, l = (a, b) if a_wins else (b, a)
+        winner = fighter_a if a_wins else fighter_b
+        return {
+            'fighter_a': fighter_a,
+            'fighter_b': fighter_b,
+            'prob_a': p_a,
+            'winner': winner,
+            'loser': fighter_b if a_wins else fighter_a,
+            'confidence': p_a if a_wins else 1.0 - p_a,
+            'adj_elo_a': adj_a,
+            'adj_elo_b': adj_b,
+            'penalty_msg': penalty_message(fighter_a, fighter_b, diff),
+            'factors': explain(
+                winner,
+                (adj_a - adj_b) if a_wins else (adj_b - adj_a),
+                self.streak[w],
+                self.streak[w] - self.streak[l],
+                self.inactive[l] - self.inactive[w],
+                self._uncertain((fighter_a, fighter_b), [a, b]),
+            ),
+        }
+
+    def predict_card(self, card):
+        """
+        card: [(red corner, blue corner), ...] -> predict() for the whole card.
+        """
+        if not card:
+            return self.predict([], [])
+        fighters_a, fighters_b = zip(*card)
+        return self.predict(fighters_a, fighters_b)
+
+    def predict_weight_class(self, weight_class):
+        """
+        Every pairing inside a weight class in one batch.
+        """
+        names = self.stats.loc[self.stats['Weight_Class'] == weight_class, 'Fighter'].drop_duplicates().tolist()
+        return self.predict_card(list(itertools.combinations(names, 2)))
+
+
+def check(pairs=200):
+    """
+    Scores the same matchups with every fighter at RD_ESTABLISHED and then at
+    STARTING_RD: each pick has to come out less confident with the high
+    deviations, from predict() and predict_one(), and carry the uncertainty factor.
+    Returns True if it does.
+    """
+    stats, model = load_stats(), load_model()
+    names = stats['Fighter'].drop_duplicates().tolist()[:pairs + 1]
+    card = list(zip(names[:-1], names[1:]))
+    settled = MatchupPredictor(stats, model, rd={n: glickoengine.RD_ESTABLISHED for n in names})
+    unsettled = MatchupPredictor(stats, model, rd={n: glickoengine.STARTING_RD for n in names})
+
+    low = settled.predict_card(card)
+    high = unsettled.predict_card(card)
+    picked = (low['confidence'] > 0.5).to_numpy()
+    ok = bool(np.all(high['confidence'].to_numpy()[picked] < low['confidence'].to_numpy()[picked]))
+    ok &= all(any(kind == 'uncertainty' for kind, _ in f) for f in high['factors'])
+    ok &= not any(kind == 'uncertainty' for f in low['factors'] for kind, _ in f)
+
+    i = int(np.argmax(picked))
+    one_low, one_high = settled.predict_one(*card[i]), unsettled.predict_one(*card[i])
+    ok &= one_high['confidence'] < one_low['confidence']
+    ok &= abs(one_high['confidence'] - high['confidence'].iloc[i]) < 1e-9
+
+    print(f"{int(picked.sum())} picks: mean confidence {low['confidence'][picked].mean():.1%} at RD {glickoengine.RD_ESTABLISHED}, "
+          f"{high['confidence'][picked].mean():.1%} at RD {glickoengine.STARTING_RD}")
+    return ok
+
+
+if __name__ == "__main__":
+    # python predictor.py --check    -> high glicko deviations must lower the confidence
+    if "--check" in sys.argv:
+        sys.exit(0 if check() else 1)
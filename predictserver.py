@@ -0,0 +1,240 @@
+import json
+import sys
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+
+import fighterindex
+import matchupmatrix
+import predictor
+import statssnapshot
+import tracing
+
+# standalone JSON prediction service (stdlib only). The model, stats and
+# matchup matrices are loaded once at startup.
+#
+#   GET  /predict?a=<fighter>&b=<fighter>      (or POST {"fighter_a": .., "fighter_b": ..})
+#   POST /predict/batch  {"matchups": [[a, b], ...]}
+#   GET  /fighter/<name>
+#   GET  /search?q=<text>[&weight_class=<class>][&limit=<n>]
+#   GET  /health
+#   GET  /metrics   Prometheus text, counters / span timings when run with FIGHTIQ_TRACE=1
+
+# config
+HOST = "127.0.0.1"
+PORT = 8000
+CACHE_SIZE = 4096 # recent matchups kept in the LRU
+MAX_BATCH = 10000
+MAX_LIMIT = 100 # search results
+
+
+class BadRequest(ValueError):
+    """
+    Client error; the message goes back in the 400 response as is.
+    """
+
+
+class LRUCache:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+            if value is not None:
+                self.data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+
+class PredictionService:
+    def __init__(self, model=None):
+        self.model = model or predictor.MatchupPredictor.from_files(matrices=matchupmatrix.load())
+        self.cache = LRUCache()
+        self.index = fighterindex.FighterIndex(self.model.stats)
+
+    def predict(self, fighter_a, fighter_b):
+        key = (fighter_a, fighter_b)
+        result = self.cache.get(key)
+        if result is None:
+            result = to_json(_with_factors(self.model.predict_one(fighter_a, fighter_b)))
+            self.cache.put(key, result)
+        return result
+
+    def predict_batch(self, matchups):
+        df = self.model.predict_card(matchups)
+        return [to_json(_with_factors(row)) for row in df.to_dict('records')]
+
+    def search(self, query, weight_class=fighterindex.ALL, limit=10):
+        return self.index.search(query, weight_class, limit)
+
+    def fighter(self, name):
+        row = self.index.row_of.get(name)
+        if row is None:
+            raise KeyError(f"Unknown fighter(s): {name}")
+        record = self.model.stats.iloc[row].to_dict()
+        # stats are float32 in the snapshot, back to the export's decimals like predict_one
+        for col, decimals in statssnapshot.DECIMALS.items():
+            if col in record:
+                record[col] = round(float(record[col]), decimals)
+        return to_json(record)
+
+
+def parse_matchups(body):
+    """
+    The batch body's matchups as [(fighter_a, fighter_b)], BadRequest unless
+    it's a list of name pairs.
+    """
+    matchups = body.get('matchups')
+    if not isinstance(matchups, list):
+        raise BadRequest("matchups must be a list of [fighter_a, fighter_b] pairs")
+    if len(matchups) > MAX_BATCH:
+        raise BadRequest(f"at most {MAX_BATCH} matchups per batch")
+    for i, pair in enumerate(matchups):
+        if not (isinstance(pair, list) and len(pair) == 2 and all(isinstance(name, str) and name for name in pair)):
+            raise BadRequest(f"matchups[{i}] must be a [fighter_a, fighter_b] pair of names")
+    return [tuple(pair) for pair in matchups]
+
+def parse_limit(query, default=10):
+    raw = query.get('limit', [None])[0]
+    if raw is None:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise BadRequest("limit must be an integer") from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def _with_factors(result):
+    """
+    A prediction with its [(kind, message)] factors as {'kind', 'message'} objects.
+    """
+    return {**result, 'factors': [{'kind': kind, 'message': message} for kind, message in result['factors']]}
+
+def to_json(value):
+    """
+    numpy scalars -> plain json types.
+    """
+    if isinstance(value, dict):
+        return {k: to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(x) for x in value]
+    if isinstance(value, np.float32):
+        return float(str(value)) # shortest repr, not the float64 expansion
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    disable_nagle_algorithm = True # headers and body go out as separate writes
+    service = None
+
+    def log_message(self, format, *args):
+        pass # access logs cost more than the predictions
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_text(self, status, text, content_type="text/plain; version=0.0.4"):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise BadRequest("request body must be valid JSON") from None
+        if not isinstance(body, dict):
+            raise BadRequest("request body must be a JSON object")
+        return body
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/health":
+                return self.send_json(200, {'status': 'ok', 'fighters': len(self.service.model.stats)})
+
+            if url.path == "/metrics":
+                return self.send_text(200, tracing.prometheus_text())
+
+            if url.path == "/predict":
+                if method == "POST":
+                    body = self.read_json()
+                    a, b = body.get('fighter_a'), body.get('fighter_b')
+                else:
+                    query = parse_qs(url.query)
+                    a, b = query.get('a', [None])[0], query.get('b', [None])[0]
+                if not (a and b and isinstance(a, str) and isinstance(b, str)):
+                    return self.send_json(400, {'error': "fighter_a and fighter_b are required"})
+                return self.send_json(200, self.service.predict(a, b))
+
+            if url.path == "/predict/batch" and method == "POST":
+                matchups = parse_matchups(self.read_json())
+                return self.send_json(200, {'predictions': self.service.predict_batch(matchups)})
+
+            if url.path == "/search":
+                query = parse_qs(url.query)
+                return self.send_json(200, {'results': self.service.search(
+                    query.get('q', [""])[0],
+                    query.get('weight_class', [fighterindex.ALL])[0],
+                    parse_limit(query),
+                )})
+
+            if url.path.startswith("/fighter/"):
+                return self.send_json(200, self.service.fighter(unquote(url.path[len("/fighter/"):])))
+
+            return self.send_json(404, {'error': "not found"})
+
+        except KeyError as e:
+            return self.send_json(404, {'error': str(e.args[0]) if e.args else "not found"})
+        except BadRequest as e:
+            return self.send_json(400, {'error': str(e)})
+        except (ValueError, TypeError):
+            return self.send_json(400, {'error': "bad request"})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+
+def serve(host=HOST, port=PORT, service=None):
+    Handler.service = service or PredictionService()
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving predictions on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == "__main__":
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else PORT
+    serve(port=port)
@@ -1,136 +1,120 @@
-import sqlite3
-import pandas as pd
-from datetime import datetime
-import random
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+import ratingengine
+import tracing
+
+# training rows for trainmodel.py. The replay's per-fight arrays are turned
+# into features CHUNK_ROWS fights at a time and written straight into
+# preallocated .npy files (memory stays flat however many feature columns
+# there are), with the csv streamed alongside:
+#
+#   training_data/X.npy       float32 (fights, features), the dtype the forest trains on
+#   training_data/target.npy  int8, 1 = A corner won
+#   training_data/day.npy     int32 event day, oldest first
+#   training_data/manifest.json
+#
+# the corner swap comes from a seeded generator, drawn chunk by chunk from
+# one stream, so the output is byte-identical between runs and chunk sizes.
+# New features go in ratingengine.features_frame and FEATURES.
 
 # config
-DB_NAME = "ufc_data.db"
-STARTING_ELO = 1500
-K_FACTOR_BASE = 32
-
-def get_expected_score(rating_a, rating_b):
-    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
-
-def get_k_factor(method, round_num):
-    k = K_FACTOR_BASE
-    method = method.lower()
-    round_num = str(round_num).strip()
-    if "ko" in method or "tko" in method:
-        k *= 1.5
-        if round_num == "1": k *= 1.2
-    elif "submission" in method:
-        k *= 1.3
-    return k
+DB_NAME = ratingengine.DB_NAME
+CSV_FILE = "ufc_training_data_v2.csv"
+TRAINING_DIR = "training_data"
+MANIFEST = "manifest.json"
+FEATURES = ['elo_diff', 'streak_diff', 'months_since_diff', 'exp_diff']
+SEED = 42 # backtest.py builds its rows with write() too, so the swap matches
+CHUNK_ROWS = 4096
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def read_manifest(out_dir=TRAINING_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@tracing.timed("features.write")
+def write(result, out_dir=TRAINING_DIR, csv_path=CSV_FILE, seed=SEED, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the features of a full Replay into `out_dir` (and `csv_path`, if given).
+    """
+    n = len(result.history)
+    os.makedirs(out_dir, exist_ok=True)
+    shapes = {'X': ((n, len(FEATURES)), np.float32), 'target': ((n,), np.int8), 'day': ((n,), np.int32)}
+    tmp = {name: os.path.join(out_dir, f"{name}.tmp.npy") for name in shapes}
+    arrays = {
+        name: np.lib.format.open_memmap(tmp[name], mode="w+", dtype=dtype, shape=shape)
+        for name, (shape, dtype) in shapes.items()
+    }
+
+    rng = np.random.default_rng(seed)
+    csv = open(csv_path + ".tmp", "w", newline="") if csv_path else None
+    try:
+        for lo in range(0, n, chunk_rows):
+            rows = slice(lo, min(n, lo + chunk_rows))
+            swap = rng.random(rows.stop - lo) <= 0.5
+            chunk = ratingengine.features_frame(result, swap, rows)
+
+            arrays['X'][rows] = chunk[FEATURES].to_numpy(dtype=np.float32)
+            arrays['target'][rows] = chunk['target'].to_numpy(dtype=np.int8)
+            arrays['day'][rows] = result.history.day[rows]
+            if csv:
+                chunk.to_csv(csv, header=(lo == 0), index=False)
+    finally:
+        for a in arrays.values():
+            a.flush()
+        arrays.clear()
+        if csv:
+            csv.close()
+
+    files = {}
+    for name, path in tmp.items():
+        final = os.path.join(out_dir, f"{name}.npy")
+        os.replace(path, final)
+        files[name] = file_hash(final)
+    if csv_path:
+        os.replace(csv_path + ".tmp", csv_path)
+
+    # manifest last, so a half written set is never picked up
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({'rows': n, 'features': FEATURES, 'seed': seed, 'files': files}, f, indent=2)
+
+
+def load(out_dir=TRAINING_DIR):
+    """
+    (X, target, day) memory-mapped from `out_dir`, None if it hasn't been built
+    (or was built for other features).
+    """
+    manifest = read_manifest(out_dir)
+    if manifest is None or manifest['features'] != FEATURES:
+        return None
+    return tuple(np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r") for name in ("X", "target", "day"))
+
 
 def main():
-    conn = sqlite3.connect(DB_NAME)
-    
     print("Loading fight history...")
-    query = """
-        SELECT f.winner, f.loser, f.method, f.round, e.date 
-        FROM fights f
-        JOIN events e ON f.event_id = e.id
-    """
-    df = pd.read_sql(query, conn)
-    conn.close()
-    
-    df['date_obj'] = pd.to_datetime(df['date'], format='%B %d, %Y', errors='coerce')
-    df = df.dropna(subset=['date_obj']).sort_values('date_obj')
-    
-    elo = {}            # { "Petr Yan": 1500 }
-    last_fight_date = {} # { "Petr Yan": datetime(2023, 3, 4) }
-    streak = {}         # { "Petr Yan": 13 }
-    total_fights = {}   # { "Petr Yan": 20 }
-
-    training_data = []
-    
-    print(f"Engineering features for {len(df)} fights...")
-    
-    for index, row in df.iterrows():
-        winner = row['winner'].strip()
-        loser = row['loser'].strip()
-        date = row['date_obj']
-        
-        if winner == "Draw/NC" or loser == "Draw/NC":
-            continue
-            
-        # initiliase fighters
-        for f in [winner, loser]:
-            if f not in elo: elo[f] = STARTING_ELO
-            if f not in streak: streak[f] = 0
-            if f not in total_fights: total_fights[f] = 0
-            # Default "last fight" to 365 days ago for debuts (neutral start)
-            if f not in last_fight_date: last_fight_date[f] = date - pd.Timedelta(days=365)
-
-        # pre-fight stats
-        
-        # INACTIVITY (Months since last fight)
-        days_since_w = (date - last_fight_date[winner]).days
-        months_since_w = max(0, days_since_w / 30)
-        
-        days_since_l = (date - last_fight_date[loser]).days
-        months_since_l = max(0, days_since_l / 30)
-        
-        # ELO
-        elo_w = elo[winner]
-        elo_l = elo[loser]
-        
-        # STREAK
-        streak_w = streak[winner]
-        streak_l = streak[loser]
-        
-        # EXPERIENCE
-        exp_w = total_fights[winner]
-        exp_l = total_fights[loser]
-        
-        # make training row (randomize winner/loser order)
-        if random.random() > 0.5:
-            # Case: Fighter A is Winner
-            row_data = {
-                'elo_diff': elo_w - elo_l,
-                'streak_diff': streak_w - streak_l,
-                'months_since_diff': months_since_w - months_since_l, # Negative is good (less rust)
-                'exp_diff': exp_w - exp_l,
-                'target': 1
-            }
-        else:
-            # Case: Fighter A is Loser
-            row_data = {
-                'elo_diff': elo_l - elo_w,
-                'streak_diff': streak_l - streak_w,
-                'months_since_diff': months_since_l - months_since_w,
-                'exp_diff': exp_l - exp_w,
-                'target': 0
-            }
-            
-        training_data.append(row_data)
-        
-        # update fighter stats
-        
-        # Update ELO
-        k = get_k_factor(row['method'], row['round'])
-        expected_w = get_expected_score(elo_w, elo_l)
-        change = k * (1 - expected_w)
-        elo[winner] += change
-        elo[loser] -= change
-        
-        # Update Dates
-        last_fight_date[winner] = date
-        last_fight_date[loser] = date
-        
-        # Update Streaks (Winner +1, Loser resets to 0)
-        streak[winner] += 1
-        streak[loser] = 0
-        
-        # Update Experience
-        total_fights[winner] += 1
-        total_fights[loser] += 1
-
-    # Save
-    train_df = pd.DataFrame(training_data)
-    train_df.to_csv("ufc_training_data_v2.csv", index=False)
-    print(f"Done. Saved 'ufc_training_data_v2.csv' with {train_df.shape[1]} columns.")
-    print(train_df.head())
+    history = ratingengine.load_history()
+
+    print(f"Engineering features for {len(history)} fights...")
+    result = ratingengine.replay(history)
+
+    # make training rows (seeded winner/loser order)
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else SEED
+    write(result, seed=seed)
+    print(f"Done. Saved '{CSV_FILE}' and {TRAINING_DIR}/ with {len(history)} rows, {len(FEATURES)} features.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
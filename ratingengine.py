@@ -0,0 +1,654 @@
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import database
+import tracing
+from database import EPOCH
+
+# shared rating engine used by eloengine, preptrainingdata and exportcurrentstats.
+# the history is loaded once into flat numpy columns (fighters mapped to ints)
+# and replayed in a single loop that produces ratings, features and stats.
+
+# config
+DB_NAME = database.DB_NAME
+STARTING_ELO = 1500
+K_FACTOR_BASE = 32 # Standard volatility
+KO_MULTIPLIER = 1.5
+ROUND_1_KO_MULTIPLIER = 1.2
+SUB_MULTIPLIER = 1.3
+INACTIVITY_DECAY = 0.0 # share of the gap to STARTING_ELO lost per year out, 0 = off
+DEBUT_LAYOFF_DAYS = 365 # debutants are treated as coming off a 1 year layoff
+OPPONENT_WINDOW = 3 # last N opponents for strength of schedule
+
+CATCH_WEIGHT = "Catch Weight"
+
+# tuned values (tuneelo.py) override the defaults above for every consumer
+CONFIG_FILE = "engine_config.json"
+CONFIG_KEYS = ('STARTING_ELO', 'K_FACTOR_BASE', 'KO_MULTIPLIER', 'ROUND_1_KO_MULTIPLIER', 'SUB_MULTIPLIER', 'INACTIVITY_DECAY')
+
+# finish types, index into k_table()
+DECISION, KO, KO_ROUND_1, SUBMISSION = 0, 1, 2, 3
+
+# decided fights in date order, straight off idx_fights_day (no join, no date parsing)
+HISTORY_QUERY = f"""
+    SELECT fight_id, fighter_a, fighter_b, method, round, weight_class, event_day
+    FROM fights
+    WHERE outcome = {database.WIN} AND event_day IS NOT NULL
+    ORDER BY event_day, rowid
+"""
+
+# elo calculation
+def get_expected_score(rating_a, rating_b):
+    """
+    Returns the probability (0-1) that A beats B.
+    """
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+def finish_type(method, round_num):
+    """
+    DECISION / KO / KO_ROUND_1 / SUBMISSION for a method string.
+    """
+    # input processing
+    method = method.lower()
+    round_num = str(round_num).strip()
+
+    if "ko" in method or "tko" in method:
+        return KO_ROUND_1 if round_num == "1" else KO
+    if "submission" in method or method.startswith("sub"): # ufcstats writes "SUB"
+        return SUBMISSION
+    return DECISION
+
+def k_table(params=None):
+    """
+    K-factor per finish type, for the current config or a `params` dict.
+    """
+    p = params or config()
+    k = p['K_FACTOR_BASE']
+    return [k, k * p['KO_MULTIPLIER'], k * p['KO_MULTIPLIER'] * p['ROUND_1_KO_MULTIPLIER'], k * p['SUB_MULTIPLIER']]
+
+def get_k_factor(method, round_num):
+    """
+    Dynamic K-Factor: KOs and early finishes mean more than Decisions.
+    """
+    return k_table()[finish_type(method, round_num)]
+
+def config():
+    return {key: globals()[key] for key in CONFIG_KEYS}
+
+def load_config(path=CONFIG_FILE):
+    """
+    Applies the parameters saved in `path` (if it exists). Returns the active config.
+    """
+    if os.path.exists(path):
+        with open(path) as f:
+            params = json.load(f).get('params', {})
+        globals().update({key: params[key] for key in CONFIG_KEYS if key in params})
+    return config()
+
+load_config()
+
+def parse_date(date_str):
+    """
+    'December 13, 2025' -> days since 1970-01-01, or None if it can't be parsed.
+    """
+    return database.parse_event_date(date_str)[1]
+
+def day_to_datetime(day):
+    return EPOCH + timedelta(days=int(day))
+
+
+@dataclass
+class History:
+    """
+    Chronological fight history in columnar form. Draws/NCs are already dropped.
+    """
+    names: list             # fighter id -> name
+    weight_classes: list    # weight class id -> name
+    day: np.ndarray         # int32, days since epoch (sorted ascending)
+    winner: np.ndarray      # int32 fighter ids
+    loser: np.ndarray       # int32 fighter ids
+    k: np.ndarray           # float64 k-factor for each fight
+    finish: np.ndarray      # int8 finish type (DECISION / KO / KO_ROUND_1 / SUBMISSION)
+    weight_class: np.ndarray # int16 weight class ids
+    fight_id: np.ndarray    # fights.fight_id of each fight
+
+    def __len__(self):
+        return len(self.day)
+
+
+@dataclass
+class Replay:
+    """
+    Output of a single replay: final per-fighter state plus pre-fight features per fight.
+    """
+    history: History
+    # per fighter
+    elo: np.ndarray
+    streak: np.ndarray
+    total_fights: np.ndarray
+    last_day: np.ndarray
+    opp_elo: np.ndarray        # (fighters, OPPONENT_WINDOW), most recent last
+    opp_count: np.ndarray
+    current_weight: np.ndarray # weight class id, -1 if only ever fought at catch weight
+    # per fight (pre-fight values)
+    elo_w: np.ndarray
+    elo_l: np.ndarray
+    streak_w: np.ndarray
+    streak_l: np.ndarray
+    months_w: np.ndarray
+    months_l: np.ndarray
+    exp_w: np.ndarray
+    exp_l: np.ndarray
+    # per fight (post-fight ratings)
+    post_elo_w: np.ndarray
+    post_elo_l: np.ndarray
+
+
+@tracing.timed("replay.load_history")
+def load_history(conn=None, event_ids=None, names=None, weight_classes=None):
+    """
+    Loads every decided fight, ordered by event date, into a History.
+    `event_ids` limits the load to those events. `names`/`weight_classes`
+    seed the id mappings so ids line up with a saved engine state.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = database.connect(DB_NAME)
+    if event_ids is None:
+        rows = conn.execute(HISTORY_QUERY).fetchall()
+    else:
+        event_ids = list(event_ids)
+        placeholders = ",".join("?" * len(event_ids))
+        query = HISTORY_QUERY.replace("ORDER BY", f"AND event_id IN ({placeholders})\n    ORDER BY")
+        rows = conn.execute(query, event_ids).fetchall() if event_ids else []
+    db_names = database.fighter_names(conn)
+    if own_conn:
+        conn.close()
+
+    names = list(names or [])
+    fighter_ids = {name: i for i, name in enumerate(names)}
+    weight_classes = list(weight_classes or [])
+    wc_ids = {wc: i for i, wc in enumerate(weight_classes)}
+    finish_cache = {}
+    k_of = k_table()
+    # db fighter id -> engine id, handed out in chronological order of first appearance
+    engine_ids = {}
+
+    n = len(rows)
+    day = np.empty(n, dtype=np.int32)
+    winner = np.empty(n, dtype=np.int32)
+    loser = np.empty(n, dtype=np.int32)
+    k = np.empty(n, dtype=np.float64)
+    finish = np.empty(n, dtype=np.int8)
+    weight_class = np.empty(n, dtype=np.int16)
+    fight_id = np.empty(n, dtype=object)
+
+    for i, (f_id, w, l, method, r_num, wc, d) in enumerate(rows):
+        key = (method, r_num)
+        if key not in finish_cache:
+            finish_cache[key] = finish_type(method, r_num)
+
+        wc = (wc or "").strip()
+        if wc not in wc_ids:
+            wc_ids[wc] = len(weight_classes)
+            weight_classes.append(wc)
+
+        for db_id, out in ((w, winner), (l, loser)):
+            if db_id not in engine_ids:
+                name = db_names[db_id]
+                if name not in fighter_ids:
+                    fighter_ids[name] = len(names)
+                    names.append(name)
+                engine_ids[db_id] = fighter_ids[name]
+            out[i] = engine_ids[db_id]
+
+        day[i] = d
+        finish[i] = finish_cache[key]
+        k[i] = k_of[finish[i]]
+        weight_class[i] = wc_ids[wc]
+        fight_id[i] = f_id
+
+    return History(
+        names=names,
+        weight_classes=weight_classes,
+        day=day,
+        winner=winner,
+        loser=loser,
+        k=k,
+        finish=finish,
+        weight_class=weight_class,
+        fight_id=fight_id,
+    )
+
+
+@tracing.timed("replay.elo")
+def replay(history, initial=None):
+    """
+    Replays the whole history once. Returns a Replay with the final state
+    of every fighter and the pre-fight features of every fight.
+    `initial` is a previous Replay (or saved state) to continue from; its
+    fighters must be the first ids of `history.names`.
+    """
+    n_fighters = len(history.names)
+    n_fights = len(history)
+
+    # per fighter state (python lists are much faster to index than numpy scalars)
+    elo = [float(STARTING_ELO)] * n_fighters
+    streak = [0] * n_fighters
+    total = [0] * n_fighters
+    last_day = [None] * n_fighters
+    opp = [[] for _ in range(n_fighters)]
+    current_weight = [-1] * n_fighters
+
+    if initial is not None:
+        n_known = len(initial.elo)
+        elo[:n_known] = initial.elo.tolist()
+        streak[:n_known] = initial.streak.tolist()
+        total[:n_known] = initial.total_fights.tolist()
+        last_day[:n_known] = initial.last_day.tolist()
+        current_weight[:n_known] = initial.current_weight.tolist()
+        for f, (window, count) in enumerate(zip(initial.opp_elo.tolist(), initial.opp_count.tolist())):
+            opp[f] = window[OPPONENT_WINDOW - count:] if count else []
+
+    # per fight output
+    elo_w = np.empty(n_fights)
+    elo_l = np.empty(n_fights)
+    post_w = np.empty(n_fights)
+    post_l = np.empty(n_fights)
+    streak_w = np.empty(n_fights, dtype=np.int32)
+    streak_l = np.empty(n_fights, dtype=np.int32)
+    months_w = np.empty(n_fights)
+    months_l = np.empty(n_fights)
+    exp_w = np.empty(n_fights, dtype=np.int32)
+    exp_l = np.empty(n_fights, dtype=np.int32)
+
+    start = float(STARTING_ELO)
+    decay = INACTIVITY_DECAY
+    catch_id = history.weight_classes.index(CATCH_WEIGHT) if CATCH_WEIGHT in history.weight_classes else -2
+
+    days = history.day.tolist()
+    winners = history.winner.tolist()
+    losers = history.loser.tolist()
+    ks = history.k.tolist()
+    wcs = history.weight_class.tolist()
+
+    for i in range(n_fights):
+        w = winners[i]
+        l = losers[i]
+        d = days[i]
+
+        # debutants
+        if last_day[w] is None: last_day[w] = d - DEBUT_LAYOFF_DAYS
+        elif decay: elo[w] = start + (elo[w] - start) * (1 - decay) ** ((d - last_day[w]) / 365)
+        if last_day[l] is None: last_day[l] = d - DEBUT_LAYOFF_DAYS
+        elif decay: elo[l] = start + (elo[l] - start) * (1 - decay) ** ((d - last_day[l]) / 365)
+
+        # pre-fight snapshot
+        r_w = elo[w]
+        r_l = elo[l]
+        elo_w[i] = r_w
+        elo_l[i] = r_l
+        streak_w[i] = streak[w]
+        streak_l[i] = streak[l]
+        months_w[i] = max(0, (d - last_day[w]) / 30)
+        months_l[i] = max(0, (d - last_day[l]) / 30)
+        exp_w[i] = total[w]
+        exp_l[i] = total[l]
+
+        # strength of schedule (opponent elo going into the fight)
+        opp_w = opp[w]
+        opp_w.append(r_l)
+        if len(opp_w) > OPPONENT_WINDOW: del opp_w[0]
+        opp_l = opp[l]
+        opp_l.append(r_w)
+        if len(opp_l) > OPPONENT_WINDOW: del opp_l[0]
+
+        # update elo
+        change = ks[i] * (1 - get_expected_score(r_w, r_l))
+        elo[w] = r_w + change
+        elo[l] = r_l - change
+        post_w[i] = r_w + change
+        post_l[i] = r_l - change
+
+        # update trackers
+        streak[w] += 1
+        streak[l] = 0
+        total[w] += 1
+        total[l] += 1
+        last_day[w] = d
+        last_day[l] = d
+        if wcs[i] != catch_id:
+            current_weight[w] = wcs[i]
+            current_weight[l] = wcs[i]
+
+    opp_elo = np.full((n_fighters, OPPONENT_WINDOW), np.nan)
+    opp_count = np.empty(n_fighters, dtype=np.int8)
+    for f, window in enumerate(opp):
+        opp_count[f] = len(window)
+        if window:
+            opp_elo[f, OPPONENT_WINDOW - len(window):] = window
+
+    return Replay(
+        history=history,
+        elo=np.array(elo),
+        streak=np.array(streak, dtype=np.int32),
+        total_fights=np.array(total, dtype=np.int32),
+        last_day=np.array(last_day, dtype=np.int32),
+        opp_elo=opp_elo,
+        opp_count=opp_count,
+        current_weight=np.array(current_weight, dtype=np.int16),
+        elo_w=elo_w, elo_l=elo_l,
+        streak_w=streak_w, streak_l=streak_l,
+        months_w=months_w, months_l=months_l,
+        exp_w=exp_w, exp_l=exp_l,
+        post_elo_w=post_w, post_elo_l=post_l,
+    )
+
+
+# outputs
+def ratings_frame(result):
+    """
+    Current ELO of every fighter, best first (current_ratings.csv).
+    """
+    df = pd.DataFrame({'Fighter': result.history.names, 'ELO': result.elo})
+    return df.sort_values('ELO', ascending=False, kind='stable')
+
+@tracing.timed("replay.features")
+def features_frame(result, swap, rows=slice(None)):
+    """
+    Pre-fight difference features (ufc_training_data_v2.csv).
+    `swap` is a bool array: True puts the loser in the A corner (target 0).
+    `rows` limits it to a slice of the fights (swap then covers just that slice).
+    """
+    r = result
+    sign = np.where(swap, -1, 1)
+    return pd.DataFrame({
+        'elo_diff': sign * (r.elo_w[rows] - r.elo_l[rows]),
+        'streak_diff': sign * (r.streak_w[rows] - r.streak_l[rows]),
+        'months_since_diff': sign * (r.months_w[rows] - r.months_l[rows]), # Negative is good (less rust)
+        'exp_diff': sign * (r.exp_w[rows] - r.exp_l[rows]),
+        'target': np.where(swap, 0, 1),
+    })
+
+@tracing.timed("replay.stats")
+def stats_frame(result, today=None):
+    """
+    Current per-fighter stats used by the dashboard (fighter_stats.csv).
+    """
+    if today is None:
+        today = datetime.now()
+    today_day = (today - EPOCH).days
+
+    inactive = (today_day - result.last_day) / 30
+
+    # average opponent elo for Strength of Schedule, 1500 for debutants
+    count = result.opp_count.astype(np.float64)
+    avg_opp = np.nansum(result.opp_elo, axis=1) / np.maximum(count, 1)
+    avg_opp = np.where(count > 0, avg_opp, STARTING_ELO)
+
+    wc_names = np.array(result.history.weight_classes + ["Unknown"], dtype=object)
+    weight = wc_names[result.current_weight] # -1 indexes "Unknown"
+
+    return pd.DataFrame({
+        'Fighter': result.history.names,
+        'ELO': np.round(result.elo, 2),
+        'Streak': result.streak,
+        'Avg_Opp_ELO': np.round(avg_opp, 2),
+        'Months_Inactive': np.round(inactive, 1),
+        'Total_Fights': result.total_fights,
+        'Weight_Class': weight,
+    })
+
+
+def run(conn=None):
+    """
+    Loads and replays the full history in one go.
+    """
+    return replay(load_history(conn))
+
+
+# persisted engine state
+# the per-fighter state and a high-water mark are kept in ufc_data.db so a
+# refresh only has to replay the fights that arrived since the last run.
+
+@dataclass
+class EngineState:
+    """
+    Per-fighter state as saved in engine_fighters (fighter id = list index).
+    """
+    names: list
+    weight_classes: list
+    elo: np.ndarray
+    streak: np.ndarray
+    total_fights: np.ndarray
+    last_day: np.ndarray
+    opp_elo: np.ndarray
+    opp_count: np.ndarray
+    current_weight: np.ndarray
+
+
+def setup_state_tables(conn):
+    cursor = conn.cursor()
+
+    # last_fight_day is days since 1970-01-01, opp_elo_1..3 is the
+    # strength of schedule window (oldest first, NULL when empty)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS engine_fighters (
+            id INTEGER PRIMARY KEY,
+            fighter TEXT UNIQUE,
+            elo REAL,
+            streak INTEGER,
+            last_fight_day INTEGER,
+            total_fights INTEGER,
+            opp_elo_1 REAL,
+            opp_elo_2 REAL,
+            opp_elo_3 REAL,
+            weight_class TEXT
+        )
+    ''')
+
+    # single row high-water mark
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS engine_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            last_event_day INTEGER,
+            last_event_date TEXT,
+            last_fight_id TEXT,
+            fights_seen INTEGER,
+            updated_at TEXT,
+            config TEXT,
+            fingerprint TEXT
+        )
+    ''')
+    # checkpoints saved before the engine config / fingerprint existed
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(engine_checkpoint)")]
+    for column in ("config", "fingerprint"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE engine_checkpoint ADD COLUMN {column} TEXT")
+    conn.commit()
+
+
+def load_state(conn):
+    """
+    Returns (EngineState, checkpoint dict), or (None, None) if nothing is saved yet.
+    """
+    setup_state_tables(conn)
+    row = conn.execute("SELECT last_event_day, last_fight_id, fights_seen, config, fingerprint FROM engine_checkpoint WHERE id = 0").fetchone()
+    if row is None:
+        return None, None
+    checkpoint = {
+        'last_event_day': row[0], 'last_fight_id': row[1], 'fights_seen': row[2],
+        'config': json.loads(row[3] or "null"), 'fingerprint': json.loads(row[4] or "null"),
+    }
+
+    rows = conn.execute('''
+        SELECT fighter, elo, streak, last_fight_day, total_fights,
+               opp_elo_1, opp_elo_2, opp_elo_3, weight_class
+        FROM engine_fighters ORDER BY id
+    ''').fetchall()
+
+    weight_classes = []
+    wc_ids = {}
+    current_weight = []
+    opp_elo = np.full((len(rows), OPPONENT_WINDOW), np.nan)
+    opp_count = np.zeros(len(rows), dtype=np.int8)
+    for f, row in enumerate(rows):
+        window = [x for x in row[5:8] if x is not None]
+        opp_count[f] = len(window)
+        if window:
+            opp_elo[f, OPPONENT_WINDOW - len(window):] = window
+        wc = row[8]
+        if wc is None:
+            current_weight.append(-1)
+            continue
+        if wc not in wc_ids:
+            wc_ids[wc] = len(weight_classes)
+            weight_classes.append(wc)
+        current_weight.append(wc_ids[wc])
+
+    state = EngineState(
+        names=[r[0] for r in rows],
+        weight_classes=weight_classes,
+        elo=np.array([r[1] for r in rows], dtype=np.float64),
+        streak=np.array([r[2] for r in rows], dtype=np.int32),
+        last_day=np.array([r[3] for r in rows], dtype=np.int32),
+        total_fights=np.array([r[4] for r in rows], dtype=np.int32),
+        opp_elo=opp_elo,
+        opp_count=opp_count,
+        current_weight=np.array(current_weight, dtype=np.int16),
+    )
+    return state, checkpoint
+
+
+@tracing.timed("db.save_engine_state")
+def save_state(conn, result, checkpoint, fighter_ids=None):
+    """
+    Writes the state of `fighter_ids` (default: everyone) and the checkpoint in one transaction.
+    """
+    setup_state_tables(conn)
+    full = fighter_ids is None
+    if full:
+        fighter_ids = range(len(result.history.names))
+
+    names = result.history.names
+    weight_classes = result.history.weight_classes
+    rows = []
+    for f in fighter_ids:
+        window = [None] * OPPONENT_WINDOW
+        count = int(result.opp_count[f])
+        if count:
+            window[OPPONENT_WINDOW - count:] = result.opp_elo[f, OPPONENT_WINDOW - count:].tolist()
+        wc = int(result.current_weight[f])
+        rows.append((
+            int(f), names[f], float(result.elo[f]), int(result.streak[f]),
+            int(result.last_day[f]), int(result.total_fights[f]),
+            *window, weight_classes[wc] if wc >= 0 else None,
+        ))
+
+    with conn:
+        if full:
+            # stale rows from an older state would otherwise linger
+            conn.execute("DELETE FROM engine_fighters")
+        conn.executemany('''
+            INSERT OR REPLACE INTO engine_fighters
+                (id, fighter, elo, streak, last_fight_day, total_fights,
+                 opp_elo_1, opp_elo_2, opp_elo_3, weight_class)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.execute('''
+            INSERT OR REPLACE INTO engine_checkpoint
+                (id, last_event_day, last_event_date, last_fight_id, fights_seen, updated_at, config, fingerprint)
+            VALUES (0, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            checkpoint['last_event_day'],
+            day_to_datetime(checkpoint['last_event_day']).date().isoformat() if checkpoint['last_event_day'] is not None else None,
+            checkpoint['last_fight_id'],
+            checkpoint['fights_seen'],
+            datetime.now().isoformat(timespec='seconds'),
+            json.dumps(config()),
+            json.dumps(checkpoint['fingerprint']),
+        ))
+
+
+def _event_fight_counts(conn):
+    """
+    [(event_id, day, number of fight rows)] for every event with a parseable date.
+    """
+    return conn.execute("""
+        SELECT event_id, MIN(event_day), COUNT(*) FROM fights
+        WHERE event_day IS NOT NULL
+        GROUP BY event_id
+    """).fetchall()
+
+def fingerprint(conn, last_day):
+    """
+    Summary of the fight rows up to `last_day`: count, rowids and fighter ids.
+    A re-scraped card gets new rowids and a merged fighter changes the id sums,
+    so either shows up even when the number of rows stays the same.
+    """
+    if last_day is None:
+        return [0, None, None, None, None]
+    return list(conn.execute("""
+        SELECT COUNT(*), MAX(rowid), SUM(rowid), SUM(fighter_a), SUM(fighter_b) FROM fights
+        WHERE event_day IS NOT NULL AND event_day <= ?
+    """, (last_day,)).fetchone())
+
+
+@tracing.timed("replay.update")
+def update(conn=None, full=False):
+    """
+    Brings the saved engine state up to date with the fights table.
+    Only fights from events after the checkpoint are replayed; a full replay
+    happens if there is no saved state, `full` is set, or the fights at or
+    before the checkpoint changed (added, re-scraped or re-assigned). Returns (Replay, number of fights applied, mode).
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = database.connect(DB_NAME)
+
+    state, checkpoint = (None, None) if full else load_state(conn)
+    events = _event_fight_counts(conn)
+
+    if state is not None and checkpoint['config'] != config():
+        print("Engine config changed since the checkpoint, rebuilding...")
+        state = None
+
+    if state is not None:
+        # checkpoints from before the fingerprint have none and always rebuild once
+        if fingerprint(conn, checkpoint['last_event_day']) != checkpoint['fingerprint']:
+            print("Fights at or before the checkpoint changed, rebuilding...")
+            state = None
+
+    if state is None:
+        mode = "full"
+        history = load_history(conn)
+        result = replay(history)
+        touched = None
+    else:
+        mode = "incremental"
+        last_day = checkpoint['last_event_day']
+        new_events = [event_id for event_id, day, n in events if n and (last_day is None or day > last_day)]
+        history = load_history(conn, event_ids=new_events, names=state.names, weight_classes=state.weight_classes)
+        result = replay(history, initial=state)
+        touched = np.unique(np.concatenate([history.winner, history.loser])).tolist()
+
+    # new high-water mark
+    played = [(day, n) for _, day, n in events if n]
+    new_last_day = max((day for day, _ in played), default=None)
+    new_checkpoint = {
+        'last_event_day': new_last_day,
+        'last_fight_id': history.fight_id[-1] if len(history) else (checkpoint or {}).get('last_fight_id'),
+        'fights_seen': sum(n for day, n in played),
+        'fingerprint': fingerprint(conn, new_last_day),
+    }
+    save_state(conn, result, new_checkpoint, touched)
+    tracing.count(f"replay.fights_{mode}", len(history))
+
+    if own_conn:
+        conn.close()
+    return result, len(history), mode
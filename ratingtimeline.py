@@ -0,0 +1,273 @@
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import database
+import ratingengine
+
+# every post-fight rating of every fighter, kept as memory-mapped arrays in a
+# per-fighter, date-sorted (CSR) layout:
+#   offsets[f]:offsets[f + 1]  -> fighter f's entries
+#   day[i], elo[i]             -> event day, rating after the fight
+#   opponent[i], won[i]        -> who it was against and whether f won
+# plus key[i] = (f << 32) + day[i], which is globally sorted, so "rating of X at
+# D" and "everyone's rating at D" are both a single np.searchsorted.
+# The manifest records the fingerprint of the fights table (the same one the
+# engine checkpoint keeps, ratingengine.fingerprint) and the elo config. A
+# refresh after an incremental engine update appends just the new fights'
+# ratings; the arrays are rebuilt from a full replay only when fights the
+# timeline already holds changed (re-scraped, re-dated, re-assigned to
+# another fighter) or the config did.
+
+# config
+TIMELINE_DIR = "rating_timeline"
+MANIFEST = "manifest.json"
+
+def to_day(when):
+    """
+    '2019-03-02', date/datetime or days since epoch -> days since epoch.
+    """
+    if isinstance(when, (int, np.integer)):
+        return int(when)
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    if isinstance(when, date) and not isinstance(when, datetime):
+        when = datetime(when.year, when.month, when.day)
+    return (when - database.EPOCH).days
+
+def _key(fighter, day):
+    return (fighter << 32) + day # a day before 1970 sorts before the fighter's first entry
+
+def source_key(conn):
+    """
+    Changes whenever fights are added, removed, re-dated or remapped to other fighters, or the elo config changes.
+    """
+    last_day = conn.execute("SELECT MAX(event_day) FROM fights").fetchone()[0]
+    return {
+        'last_event_day': last_day,
+        'fingerprint': ratingengine.fingerprint(conn, last_day),
+        'config': ratingengine.config(),
+    }
+
+def read_manifest(out_dir=TIMELINE_DIR):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _entries(result, first=0):
+    """
+    (fighter, seq, day, elo, opponent, won) of a Replay, two entries per fight.
+    seq orders a fighter's entries: `first` + the fight's position in the history.
+    """
+    history = result.history
+    n = len(history)
+    fight = np.concatenate([np.arange(n), np.arange(n)])
+    return (
+        np.concatenate([history.winner, history.loser]).astype(np.int64),
+        first + fight,
+        history.day[fight].astype(np.int64),
+        np.concatenate([result.post_elo_w, result.post_elo_l]),
+        np.concatenate([history.loser, history.winner]),
+        np.concatenate([np.ones(n, dtype=np.int8), np.zeros(n, dtype=np.int8)]),
+    )
+
+def _write(out_dir, names, source, fighter, seq, day, elo, opponent, won):
+    # ordered by fighter, then fight
+    order = np.lexsort((seq, fighter))
+    fighter = fighter[order]
+    day = day[order]
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(fighter, minlength=len(names)), out=offsets[1:])
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "day.npy"), day.astype(np.int32))
+    np.save(os.path.join(out_dir, "key.npy"), _key(fighter, day))
+    np.save(os.path.join(out_dir, "elo.npy"), elo[order])
+    np.save(os.path.join(out_dir, "opponent.npy"), opponent[order].astype(np.int32))
+    np.save(os.path.join(out_dir, "won.npy"), won[order])
+    with open(os.path.join(out_dir, "fighters.json"), "w") as f:
+        json.dump(list(names), f)
+
+    # manifest last, so a half finished build is never picked up as current
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump({'source': source, 'entries': int(len(day)), 'built_at': time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+    return len(day)
+
+def build(result, out_dir=TIMELINE_DIR, source=None):
+    """
+    Writes the timeline of a full Replay.
+    """
+    start = time.perf_counter()
+    entries = _write(out_dir, result.history.names, source, *_entries(result))
+    print(f"Built rating timeline: {entries} ratings for {len(result.history.names)} fighters in {time.perf_counter() - start:.2f}s")
+
+def can_append(conn, result, out_dir=TIMELINE_DIR):
+    """
+    True if `result` (an incremental Replay from ratingengine.update) holds
+    exactly the fights after the ones already in the timeline, and those are unchanged.
+    """
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        return False
+    old = manifest['source'] or {}
+    if old.get('config') != ratingengine.config() or 'fingerprint' not in old:
+        return False
+    last_day = old['last_event_day']
+    if ratingengine.fingerprint(conn, last_day) != old['fingerprint']:
+        return False
+    history = result.history
+    if len(history) and last_day is not None and int(history.day.min()) <= last_day:
+        return False
+    # nothing in between was applied to the engine state without reaching the timeline
+    decided = conn.execute(f"SELECT COUNT(*) FROM fights WHERE outcome = {database.WIN} AND event_day IS NOT NULL").fetchone()[0]
+    if manifest['entries'] // 2 + len(history) != decided:
+        return False
+    with open(os.path.join(out_dir, "fighters.json")) as f:
+        names = json.load(f)
+    return list(history.names[:len(names)]) == names
+
+def append(result, out_dir=TIMELINE_DIR, source=None):
+    """
+    Adds the post-fight ratings of an incremental Replay to the timeline (check can_append first).
+    """
+    start = time.perf_counter()
+    offsets = np.load(os.path.join(out_dir, "offsets.npy"))
+    old_fighter = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    old = (
+        old_fighter,
+        np.arange(len(old_fighter)),
+        np.load(os.path.join(out_dir, "day.npy")).astype(np.int64),
+        np.load(os.path.join(out_dir, "elo.npy")),
+        np.load(os.path.join(out_dir, "opponent.npy")),
+        np.load(os.path.join(out_dir, "won.npy")),
+    )
+    new = _entries(result, first=len(old_fighter))
+    entries = _write(out_dir, result.history.names, source, *(np.concatenate([a, b]) for a, b in zip(old, new)))
+    print(f"Appended {2 * len(result.history)} ratings to the timeline ({entries} total) in {time.perf_counter() - start:.2f}s")
+
+
+def refresh(conn=None, out_dir=TIMELINE_DIR, force=False, result=None, mode=None):
+    """
+    Brings the timeline up to date with the fights table. `result, mode` are
+    what ratingengine.update returned: an incremental Replay is appended when
+    can_append allows it, a full one is written as is, and otherwise the
+    history is replayed from scratch. Returns True if anything was written.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = database.connect(ratingengine.DB_NAME)
+    try:
+        source = source_key(conn)
+        manifest = read_manifest(out_dir)
+        if not force and manifest is not None and manifest['source'] == source:
+            return False
+        if not force and mode == "incremental" and can_append(conn, result, out_dir):
+            append(result, out_dir, source)
+        else:
+            build(result if mode == "full" else ratingengine.run(conn), out_dir, source)
+        return True
+    finally:
+        if own_conn:
+            conn.close()
+
+
+class RatingTimeline:
+    def __init__(self, out_dir=TIMELINE_DIR):
+        if read_manifest(out_dir) is None:
+            raise FileNotFoundError(f"No rating timeline in {out_dir}, run ratingtimeline.py first")
+
+        def load(name):
+            return np.load(os.path.join(out_dir, name), mmap_mode="r")
+        self.offsets = load("offsets.npy")
+        self.day = load("day.npy")
+        self.key = load("key.npy")
+        self.elo = load("elo.npy")
+        self.opponent = load("opponent.npy")
+        self.won = load("won.npy")
+        with open(os.path.join(out_dir, "fighters.json")) as f:
+            self.names = json.load(f)
+        self.id_of = {name: i for i, name in enumerate(self.names)}
+
+    def _fighter(self, name):
+        f = self.id_of.get(name)
+        if f is None:
+            raise KeyError(f"Unknown fighter(s): {name}")
+        return f
+
+    def rating_at(self, name, when):
+        """
+        Rating of `name` after their last fight on or before `when`, None before their debut.
+        """
+        f = self._fighter(name)
+        i = np.searchsorted(self.key, _key(f, to_day(when)), side='right') - 1
+        if i < self.offsets[f]:
+            return None
+        return float(self.elo[i])
+
+    def ratings_at(self, when):
+        """
+        Everyone's rating as of `when` (NaN for fighters who hadn't debuted) and
+        the day of the fight it came from.
+        """
+        fighters = np.arange(len(self.names), dtype=np.int64)
+        idx = np.searchsorted(self.key, _key(fighters, to_day(when)), side='right') - 1
+        debuted = idx >= self.offsets[:-1]
+        idx = np.maximum(idx, 0)
+        return np.where(debuted, self.elo[idx], np.nan), np.where(debuted, self.day[idx], -1)
+
+    def top_at(self, when, n=10, max_inactive_days=None):
+        """
+        Best `n` rated fighters as of `when`. `max_inactive_days` drops
+        fighters whose last fight is older than that.
+        """
+        elo, last = self.ratings_at(when)
+        keep = ~np.isnan(elo)
+        if max_inactive_days is not None:
+            keep &= last >= to_day(when) - max_inactive_days
+        ids = np.flatnonzero(keep)
+        ids = ids[np.argsort(-elo[ids], kind='stable')[:n]]
+        return pd.DataFrame({
+            'Fighter': [self.names[i] for i in ids],
+            'ELO': elo[ids],
+            'Last_Fight': [ratingengine.day_to_datetime(d).date() for d in last[ids]],
+        })
+
+    def trajectory(self, name):
+        """
+        Every post-fight rating of `name`, oldest first.
+        """
+        f = self._fighter(name)
+        lo, hi = int(self.offsets[f]), int(self.offsets[f + 1])
+        return pd.DataFrame({
+            'Date': [ratingengine.day_to_datetime(d).date() for d in self.day[lo:hi]],
+            'ELO': np.asarray(self.elo[lo:hi]),
+            'Opponent': [self.names[o] for o in self.opponent[lo:hi]],
+            'Result': np.where(self.won[lo:hi] == 1, 'W', 'L'),
+        })
+
+
+def load(conn=None, out_dir=TIMELINE_DIR):
+    """
+    RatingTimeline, rebuilt first if it's missing or stale.
+    """
+    refresh(conn, out_dir)
+    return RatingTimeline(out_dir)
+
+
+if __name__ == "__main__":
+    # python ratingtimeline.py [--force] [--at 2015-01-01] [--fighter "Jon Jones"]
+    refresh(force="--force" in sys.argv)
+    timeline = RatingTimeline()
+    if "--at" in sys.argv:
+        print(timeline.top_at(sys.argv[sys.argv.index("--at") + 1], max_inactive_days=2 * 365).to_string(index=False))
+    if "--fighter" in sys.argv:
+        print(timeline.trajectory(sys.argv[sys.argv.index("--fighter") + 1]).to_string(index=False))
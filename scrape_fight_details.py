@@ -0,0 +1,195 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import database
+import fetcher
+import htmlparsers
+import httpcache
+import tracing
+
+# second stage after scrape_fights.py: per-round strikes / takedowns / control
+# time from every fight's fight-details page.
+#   1. links: event pages (already in the http cache) give each fight's
+#      details url -> fight_pages, status PAGE_PENDING
+#   2. pages: pending pages are fetched by a thread pool (fetcher's token
+#      bucket keeps the whole pool under REQUESTS_PER_SECOND), parsed, and
+#      saved BATCH_SIZE fights per transaction -> round_stats, PAGE_DONE
+# failed pages stay pending, so rerunning picks up where the last run stopped.
+# The stats are attached to the fight's stored fighter_a / fighter_b, never to
+# whoever the page's names resolve to: each side is matched by ufc_id, then by
+# name / alias key, and a page that doesn't match the fight is skipped (PAGE_MISMATCH).
+
+# config
+DB_NAME = database.DB_NAME
+WORKERS = 8 # concurrent page downloads
+BATCH_SIZE = 50 # fights per db transaction
+
+def get_unlinked_events(conn):
+    """
+    Events with fights that don't have a fight_pages row yet.
+    """
+    return conn.execute('''
+        SELECT DISTINCT e.id, e.url FROM events e
+        JOIN fights f ON f.event_id = e.id
+        WHERE f.fight_id NOT IN (SELECT fight_id FROM fight_pages)
+    ''').fetchall()
+
+def get_pending_pages(conn, include_done=False):
+    """
+    Work queue: (fight_id, url) of pages not scraped yet (every page with include_done).
+    """
+    if include_done:
+        return conn.execute("SELECT fight_id, url FROM fight_pages").fetchall()
+    return conn.execute("SELECT fight_id, url FROM fight_pages WHERE status = ?", (database.PAGE_PENDING,)).fetchall()
+
+def links_for_event(event_id, event_url, session=None):
+    try:
+        return htmlparsers.parse_fight_links(event_id, fetcher.fetch_content(event_url, session=session))
+    except Exception as e:
+        print(f"Error reading links from {event_url}: {e}")
+        return []
+
+def details_for_fight(fight_id, url, session=None, revalidate=False):
+    """
+    Returns (people, rows) from parse_fight_details, None on failure.
+    """
+    try:
+        return htmlparsers.parse_fight_details(fetcher.fetch_content(url, session=session, revalidate=revalidate))
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+def save_links(conn, links):
+    """
+    Stores the details url of every known fight in one transaction.
+    """
+    with conn:
+        known = {row[0] for row in conn.execute("SELECT fight_id FROM fights")}
+        conn.executemany(
+            "INSERT OR IGNORE INTO fight_pages (fight_id, url, status) VALUES (?, ?, ?)",
+            [(fight_id, url, database.PAGE_PENDING) for fight_id, url in links if fight_id in known],
+        )
+
+def stored_fighters(conn, fight_ids):
+    """
+    {fight_id: [(fighter_id, name, ufc_id, {alias keys})] for fighter_a, fighter_b}.
+    """
+    fight_ids = list(fight_ids)
+    placeholders = ",".join("?" * len(fight_ids))
+    rows = conn.execute(f'''
+        SELECT f.fight_id, a.id, a.name, a.ufc_id, b.id, b.name, b.ufc_id
+        FROM fights f JOIN fighters a ON a.id = f.fighter_a JOIN fighters b ON b.id = f.fighter_b
+        WHERE f.fight_id IN ({placeholders})
+    ''', fight_ids).fetchall() if fight_ids else []
+    ids = {i for row in rows for i in (row[1], row[4])}
+    keys = {i: set() for i in ids}
+    if ids:
+        for key, fighter_id in conn.execute(
+            f"SELECT alias_key, fighter_id FROM fighter_aliases WHERE fighter_id IN ({','.join('?' * len(ids))})", list(ids)
+        ):
+            keys[fighter_id].add(key)
+    return {
+        fight_id: [(a, a_name, a_ufc, keys[a]), (b, b_name, b_ufc, keys[b])]
+        for fight_id, a, a_name, a_ufc, b, b_name, b_ufc in rows
+    }
+
+def match_sides(stored, people):
+    """
+    Fighter ids of the page's two sides, from the stored fighters of the fight:
+    by ufc_id, or by name / alias key where either side has no ufc_id.
+    None if the page isn't this fight's.
+    """
+    ids = []
+    for name, ufc_id in people:
+        found = [f for f, _, stored_ufc, _ in stored if ufc_id and stored_ufc == ufc_id]
+        if not found:
+            key = database.normalize(name)
+            found = [f for f, stored_name, stored_ufc, keys in stored
+                     if not (ufc_id and stored_ufc) and (stored_name == name or key in keys)]
+        ids.append(found[0] if len(found) == 1 else None)
+    if None in ids or ids[0] == ids[1]:
+        return None
+    return ids
+
+def save_batch(conn, batch):
+    """
+    Writes a batch of {fight_id: (people, rows)} in one transaction, each
+    fight's round_stats replaced as a unit.
+    """
+    with tracing.span("db.save_round_stats", fights=len(batch)), conn:
+        stored = stored_fighters(conn, batch)
+        status = []
+        for fight_id, (people, rows) in batch.items():
+            fighter = match_sides(stored.get(fight_id, []), people)
+            if fighter is None:
+                names = " vs ".join(name for name, _ in people)
+                print(f"Skipping {fight_id}: page is {names}, not the stored fight")
+                tracing.count("details.mismatched")
+                status.append((database.PAGE_MISMATCH, fight_id))
+                continue
+            database.save_round_stats(conn, fight_id, [(fighter[side], r, *values) for r, side, values in rows])
+            status.append((database.PAGE_DONE if rows else database.PAGE_NO_STATS, fight_id))
+        conn.executemany("UPDATE fight_pages SET status = ? WHERE fight_id = ?", status)
+
+def crawl_links(conn, session, workers=WORKERS):
+    events = get_unlinked_events(conn)
+    if not events:
+        return 0
+    print(f"Finding details pages on {len(events)} event pages...")
+    links = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(lambda e: links_for_event(*e, session), events):
+            links.extend(found)
+    save_links(conn, links)
+    return len(links)
+
+def main(workers=WORKERS, rescrape=False):
+    conn = database.connect(DB_NAME)
+    session = fetcher.make_session(pool_size=workers)
+
+    crawl_links(conn, session, workers)
+
+    # resumable: only PAGE_PENDING pages unless --rescrape, which also
+    # revalidates the cached pages so corrections are downloaded
+    pages = get_pending_pages(conn, include_done=rescrape)
+    total = len(pages)
+    print(f"Scraping {total} fight pages with {workers} workers...")
+
+    batch = {}
+    saved = failed = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(details_for_fight, fight_id, url, session, rescrape): fight_id for fight_id, url in pages}
+
+            for i, future in enumerate(as_completed(futures)):
+                fight_id = futures[future]
+                parsed = future.result()
+
+                if parsed is None or len(parsed[0]) != 2:
+                    # left pending, so the next run picks it up again
+                    failed += 1
+                    continue
+
+                batch[fight_id] = parsed
+                saved += 1
+                if (i + 1) % 100 == 0 or i + 1 == total:
+                    print(f"[{i+1}/{total}] pages scraped")
+
+                if len(batch) >= BATCH_SIZE:
+                    save_batch(conn, batch)
+                    batch = {}
+    finally:
+        # keep whatever finished even if the run is interrupted
+        if batch:
+            save_batch(conn, batch)
+
+    print(f"Done. {saved} fights saved, {failed} failed (rerun to retry).")
+    print(httpcache.get_cache().stats())
+    conn.close()
+
+if __name__ == "__main__":
+    # --offline re-parses cached pages without any network access
+    httpcache.OFFLINE = httpcache.OFFLINE or "--offline" in sys.argv
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else WORKERS
+    main(workers=workers, rescrape="--rescrape" in sys.argv)
@@ -1,92 +1,126 @@
-import sqlite3
-import requests
-from bs4 import BeautifulSoup
-import time
-import random
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import database
+import fetcher
+import htmlparsers
+import httpcache
+import identity
+import tracing
 
 # config
-DB_NAME = "ufc_data.db"
-HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+DB_NAME = database.DB_NAME
+HEADERS = fetcher.HEADERS
+WORKERS = 8 # concurrent event page downloads
+BATCH_SIZE = 25 # events per db transaction
 
-def get_event_urls(conn):
+def get_event_urls(conn, include_scraped=False):
+    """
+    Work queue: events that don't have any fights stored yet (all events with
+    include_scraped), oldest first.
+    """
     cursor = conn.cursor()
-    cursor.execute("SELECT id, url FROM events")
+    if include_scraped:
+        cursor.execute("SELECT id, url FROM events ORDER BY event_day, rowid")
+    else:
+        cursor.execute("""
+            SELECT id, url FROM events
+            WHERE id NOT IN (SELECT DISTINCT event_id FROM fights)
+            ORDER BY event_day, rowid
+        """)
     return cursor.fetchall()
 
-def scrape_fights_for_event(event_id, event_url):
+def parse_fights(event_id, html):
+    # lxml/SoupStrainer/html.parser backends live in htmlparsers.py
+    return htmlparsers.parse_event_fights(event_id, html)
+
+def scrape_fights_for_event(event_id, event_url, session=None, revalidate=False):
     try:
-        response = requests.get(event_url, headers=HEADERS)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        rows = soup.find_all('tr', class_='b-fight-details__table-row')
-        
-        fights_data = []
-        
-        for row in rows:
-            cols = row.find_all('td')
-            if len(cols) < 8: continue
-                
-            names_col = cols[1].find_all('p')
-            if len(names_col) < 2: continue
-            fighter_1 = names_col[0].text.strip()
-            fighter_2 = names_col[1].text.strip()
-            
-            win_text = list(cols[0].stripped_strings)
-            winner, loser = "Draw/NC", "Draw/NC"
-            
-            if len(win_text) > 0:
-                first_status = win_text[0].lower()
-                if 'win' in first_status:
-                    winner, loser = fighter_1, fighter_2
-                elif 'win' not in first_status or (len(win_text) > 1 and 'win' in win_text[1].lower()):
-                    winner, loser = fighter_2, fighter_1
-                if 'draw' in first_status or 'nc' in first_status:
-                    winner, loser = "Draw/NC", "Draw/NC"
-                    
-            weight_class = cols[6].text.strip() 
-            method = cols[7].text.strip()
-            round_num = cols[8].text.strip()
-            time_val = cols[9].text.strip()
-            
-            fight_id = f"{event_id}_{fighter_1}_{fighter_2}".replace(" ", "")
-            fights_data.append((fight_id, event_id, winner, loser, method, round_num, time_val, weight_class))
-            
-        return fights_data
-        
+        html = fetcher.fetch_content(event_url, session=session, revalidate=revalidate)
+        return parse_fights(event_id, html)
+
     except Exception as e:
         print(f"Error scraping {event_url}: {e}")
         return []
 
-def main():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    print("Wiping table to ensure clean schema...")
-    cursor.execute("DELETE FROM fights")
-    conn.commit()
-    
-    events = get_event_urls(conn)
+def save_batch(conn, batch):
+    """
+    Writes a batch of {event_id: fights} in one transaction. Each event's
+    rows are replaced as a unit so a re-scrape never leaves an event half stored.
+    """
+    with tracing.span("db.save_fights", events=len(batch)), conn:
+        resolver = identity.FighterResolver(conn) # fresh per transaction, never ahead of the db
+        for event_id, fights in batch.items():
+            day = conn.execute("SELECT event_day FROM events WHERE id = ?", (event_id,)).fetchone()
+            rows = [
+                (fight_id, e_id, day[0] if day else None, resolver.resolve(a, ufc_a), resolver.resolve(b, ufc_b),
+                 outcome, method, round_num, time_val, weight_class)
+                for fight_id, e_id, a, b, outcome, method, round_num, time_val, weight_class, ufc_a, ufc_b in fights
+            ]
+            conn.execute("DELETE FROM fights WHERE event_id = ?", (event_id,))
+            conn.executemany('''
+                INSERT OR REPLACE INTO fights (fight_id, event_id, event_day, fighter_a, fighter_b, outcome, method, round, time, weight_class)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            tracing.count("db.fights_written", len(rows))
+
+def main(workers=WORKERS, rescrape=False):
+    conn = database.connect(DB_NAME)
+
+    # resumable: events already in the fights table are skipped unless --rescrape,
+    # which also revalidates the cached pages so corrections are downloaded
+    events = get_event_urls(conn, include_scraped=rescrape)
     total = len(events)
-    print(f"Rescraping {total} events...")
-    
-    for i, (event_id, url) in enumerate(events):
-        fights = scrape_fights_for_event(event_id, url)
-        
-        if fights:
-            # Added weight_class to INSERT
-            cursor.executemany('''
-                INSERT OR IGNORE INTO fights (fight_id, event_id, winner, loser, method, round, time, weight_class)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', fights)
-            conn.commit()
-            
-            if i == 0:
-                print(f"DEBUG: {fights[0][2]} vs {fights[0][3]} ({fights[0][7]})") # Print weight class to verify
-                
-            print(f"[{i+1}/{total}] Saved {len(fights)} fights.")
-            
-        time.sleep(random.uniform(0.4, 0.7))
+    print(f"Scraping {total} events with {workers} workers...")
+
+    session = fetcher.make_session(pool_size=workers)
+    batch = {}
+    saved = failed = 0
+    done = {} # queue index -> fights, pages that came back ahead of an older event
+    next_up = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(scrape_fights_for_event, event_id, url, session, rescrape): i for i, (event_id, url) in enumerate(events)}
+
+            for i, future in enumerate(as_completed(futures)):
+                fights = done[futures[future]] = future.result()
+                print(f"[{i+1}/{total}] Scraped {len(fights)} fights.")
+
+                # pages are downloaded in any order but saved oldest event first, so
+                # the resolver always sees fighters in the same order: the same fighter
+                # claims a legacy record or gets the "Name (2)" display name every run
+                while next_up in done:
+                    fights = done.pop(next_up)
+                    event_id = events[next_up][0]
+                    next_up += 1
+
+                    if not fights:
+                        # left out of the db, so the next run picks it up again
+                        failed += 1
+                        continue
+
+                    if saved == 0:
+                        print(f"DEBUG: {fights[0][2]} vs {fights[0][3]} ({fights[0][8]})") # Print weight class to verify
+
+                    batch[event_id] = fights
+                    saved += 1
+
+                    if len(batch) >= BATCH_SIZE:
+                        save_batch(conn, batch)
+                        batch = {}
+    finally:
+        # keep whatever finished even if the run is interrupted (pages held back
+        # behind an unfinished older event are cached, the next run saves them)
+        if batch:
+            save_batch(conn, batch)
 
+    print(f"Done. {saved} events saved, {failed} failed or empty (rerun to retry).")
+    print(httpcache.get_cache().stats())
     conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --offline re-parses cached pages without any network access
+    httpcache.OFFLINE = httpcache.OFFLINE or "--offline" in sys.argv
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else WORKERS
+    main(workers=workers, rescrape="--rescrape" in sys.argv)
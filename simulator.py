@@ -0,0 +1,416 @@
+import math
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import predictor
+import ratingengine
+import statssnapshot
+
+# monte carlo simulation of fight cards, title runs and brackets, starting
+# from fighter_stats.csv. A plan is a list of rounds, each a list of bouts,
+# and a corner is either a fighter name or winner_of(j) / loser_of(j) for an
+# earlier bout j (bouts are numbered in order across rounds):
+#
+#   card([("A", "B"), ("C", "D")])       one round, independent bouts
+#   title_run("Champ", ["X", "Y", "Z"])  champ vs X, winner vs Y, winner vs Z
+#   bracket(["A", "B", "C", "D"])        single elimination, seeded in order
+#
+# every simulation is a row of (sims x fighters) arrays, so a batch of sims
+# plays each bout with one vectorized draw. Win probabilities come from the
+# elo expected score or the trained model (size adjusted elo, streak,
+# inactivity and experience, updated after every bout). After each bout both
+# fighters get the same elo update as ratingengine.replay, with the finish
+# type drawn from the historical mix, so get_k_factor's KO / submission
+# bonuses carry into later rounds. No time passes between rounds, so there is
+# no inactivity decay.
+#
+# batches get their own child of one SeedSequence, so a seed gives the same
+# result for any number of workers.
+
+# config
+N_SIMS = 100000
+BATCH_SIMS = 50000 # sims per batch (and per pool task)
+SEED = 42
+WORKERS = 1
+ELO_RANGE = 1000 # elo change histograms cover +-ELO_RANGE in 1 point bins
+SPREAD_RANGE = 4000 # spread histogram covers 0..SPREAD_RANGE
+MODES = ("elo", "model")
+
+_state = {} # per worker: plan and starting state
+
+
+# plans
+def winner_of(bout):
+    return ('winner', bout)
+
+def loser_of(bout):
+    return ('loser', bout)
+
+def card(pairs):
+    """
+    One round of independent bouts.
+    """
+    return [list(pairs)]
+
+def title_run(champion, challengers):
+    """
+    The champion (or whoever holds the belt by then) meets each challenger in turn.
+    """
+    rounds = []
+    holder = champion
+    for j, challenger in enumerate(challengers):
+        rounds.append([(holder, challenger)])
+        holder = winner_of(j)
+    return rounds
+
+def bracket(names):
+    """
+    Single elimination: 1 vs 2, 3 vs 4, ... then the winners, until one is left.
+    """
+    if len(names) < 2 or len(names) & (len(names) - 1):
+        raise ValueError(f"A bracket needs a power of two fighters, got {len(names)}")
+    rounds = [[(names[i], names[i + 1]) for i in range(0, len(names), 2)]]
+    bout = 0
+    while len(rounds[-1]) > 1:
+        prev = len(rounds[-1])
+        rounds.append([(winner_of(bout + i), winner_of(bout + i + 1)) for i in range(0, prev, 2)])
+        bout += prev
+    return rounds
+
+def describe(corner):
+    if isinstance(corner, tuple):
+        return f"{corner[0].title()} of bout {corner[1]}"
+    return corner
+
+
+def finish_mix(conn=None):
+    """
+    Share of DECISION / KO / KO_ROUND_1 / SUBMISSION among all recorded wins.
+    """
+    counts = np.bincount(ratingengine.load_history(conn).finish, minlength=4).astype(np.float64)
+    return counts / counts.sum()
+
+
+def _compile(rounds):
+    """
+    Validates a plan. Returns (fighter names, bouts) where every corner is
+    ('fighter', local id) / ('winner', bout) / ('loser', bout).
+    """
+    names = []
+    local = {}
+    bouts = []
+    for r, bouts_in_round in enumerate(rounds):
+        first_bout = len(bouts)
+        in_round = set()
+        for pair in bouts_in_round:
+            corners = []
+            for corner in pair:
+                if isinstance(corner, tuple):
+                    kind, ref = corner
+                    if kind not in ('winner', 'loser') or not 0 <= ref < first_bout:
+                        raise ValueError(f"Round {r}: {describe(corner)} isn't an earlier round's bout")
+                    key = corner
+                else:
+                    if corner not in local:
+                        local[corner] = len(names)
+                        names.append(corner)
+                    key = ('fighter', local[corner])
+                if key in in_round:
+                    raise ValueError(f"Round {r}: {describe(corner)} is in two bouts")
+                in_round.add(key)
+                corners.append(key)
+            if corners[0] == corners[1]:
+                raise ValueError(f"A fighter can't fight themselves: {describe(pair[0])}")
+            bouts.append(tuple(corners))
+    return names, bouts
+
+
+def _corner(key, winners, losers):
+    kind, ref = key
+    if kind == 'fighter':
+        return np.full(len(winners), ref, dtype=np.intp)
+    return winners[:, ref] if kind == 'winner' else losers[:, ref]
+
+def _model_probability(model, a, b, elo, streak, inactive, total, size, rows):
+    adj_a, adj_b, _ = predictor.size_adjusted_elo(elo[rows, a], elo[rows, b], size[a], size[b])
+    X = np.column_stack([
+        adj_a - adj_b,
+        streak[rows, a] - streak[rows, b],
+        inactive[rows, a] - inactive[rows, b],
+        total[rows, a] - total[rows, b],
+    ])
+    # sims only differ by the finish types and winners drawn so far, so there
+    # are few distinct states; score each once
+    unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    p = model.predict_proba(pd.DataFrame(unique, columns=predictor.FEATURES))[:, 1]
+    return p[inverse.ravel()]
+
+def _init_worker(state):
+    _state.update(state)
+
+def _simulate_batch(job):
+    """
+    Plays `n` sims of the plan. Returns the batch's counts and histograms.
+    """
+    n, seed = job
+    s = _state
+    rng = np.random.default_rng(seed)
+    bouts = s['bouts']
+    m = len(s['elo'])
+    rows = np.arange(n)
+
+    elo = np.tile(s['elo'], (n, 1))
+    if s['mode'] == 'model':
+        streak = np.tile(s['streak'], (n, 1))
+        inactive = np.tile(s['inactive'], (n, 1))
+        total = np.tile(s['total'], (n, 1))
+    winners = np.empty((n, len(bouts)), dtype=np.intp)
+    losers = np.empty((n, len(bouts)), dtype=np.intp)
+    wins = np.zeros((n, m), dtype=np.int16)
+    bout_wins = np.zeros((len(bouts), m), dtype=np.int64)
+
+    for j, (key_a, key_b) in enumerate(bouts):
+        a = _corner(key_a, winners, losers)
+        b = _corner(key_b, winners, losers)
+        expected_a = ratingengine.get_expected_score(elo[rows, a], elo[rows, b])
+        if s['mode'] == 'model':
+            p_a = _model_probability(s['model'], a, b, elo, streak, inactive, total, s['size'], rows)
+        else:
+            p_a = expected_a
+
+        a_wins = rng.random(n) < p_a
+        w = np.where(a_wins, a, b)
+        l = np.where(a_wins, b, a)
+        finish = rng.choice(len(s['k']), size=n, p=s['finish_mix'])
+
+        # same update as ratingengine.replay
+        change = s['k'][finish] * (1 - np.where(a_wins, expected_a, 1 - expected_a))
+        elo[rows, w] += change
+        elo[rows, l] -= change
+        if s['mode'] == 'model':
+            streak[rows, w] += 1
+            streak[rows, l] = 0
+            inactive[rows, w] = 0
+            inactive[rows, l] = 0
+            total[rows, w] += 1
+            total[rows, l] += 1
+
+        winners[:, j] = w
+        losers[:, j] = l
+        wins[rows, w] += 1
+        bout_wins[j] = np.bincount(w, minlength=m)
+
+    # per fighter distributions, as flat bincounts
+    n_counts = len(bouts) + 1
+    fighter = np.broadcast_to(np.arange(m), (n, m))
+    win_counts = np.bincount((fighter * n_counts + wins).ravel(), minlength=m * n_counts).reshape(m, n_counts)
+
+    change = elo - s['elo']
+    bins = np.clip(np.rint(change), -ELO_RANGE, ELO_RANGE).astype(np.int64) + ELO_RANGE
+    width = 2 * ELO_RANGE + 1
+    change_hist = np.bincount((fighter * width + bins).ravel(), minlength=m * width).reshape(m, width)
+
+    spread = elo.max(axis=1) - elo.min(axis=1)
+    spread_hist = np.bincount(np.clip(np.rint(spread), 0, SPREAD_RANGE).astype(np.int64), minlength=SPREAD_RANGE + 1)
+
+    return {
+        'bout_wins': bout_wins,
+        'win_counts': win_counts,
+        'change_sum': change.sum(axis=0),
+        'change_sq': (change ** 2).sum(axis=0),
+        'change_hist': change_hist,
+        'spread_sum': spread.sum(),
+        'spread_sq': (spread ** 2).sum(),
+        'spread_hist': spread_hist,
+    }
+
+
+def _percentiles(hist, qs, offset=0):
+    cdf = np.cumsum(hist) / hist.sum()
+    return [int(np.searchsorted(cdf, q)) - offset for q in qs]
+
+class SimResult:
+    """
+    Outcome distributions of a simulation, as counts over `n_sims`.
+    """
+    QUANTILES = (0.05, 0.5, 0.95)
+
+    def __init__(self, names, bouts, start_elo, n_sims, totals, seconds):
+        self.names = names
+        self.bouts = bouts
+        self.start_elo = start_elo
+        self.n_sims = n_sims
+        self.seconds = seconds
+        vars(self).update(totals)
+
+    def _label(self, key):
+        kind, ref = key
+        return self.names[ref] if kind == 'fighter' else describe(key)
+
+    def win_probability(self, fighter, bout=-1):
+        """
+        P(`fighter` wins `bout`), the last bout (the title / final) by default.
+        """
+        return float(self.bout_wins[bout, self.names.index(fighter)] / self.n_sims)
+
+    def champion(self):
+        """
+        Winner of the last bout, as probabilities per fighter.
+        """
+        p = self.bout_wins[-1] / self.n_sims
+        order = np.argsort(-p, kind='stable')
+        return pd.Series(p[order], index=[self.names[i] for i in order], name='p_win').loc[lambda s: s > 0]
+
+    def bout_table(self):
+        """
+        Every (bout, fighter) that can win it, with the probability.
+        """
+        rows = []
+        for j, (key_a, key_b) in enumerate(self.bouts):
+            for f in np.flatnonzero(self.bout_wins[j]):
+                rows.append({
+                    'bout': j,
+                    'corners': f"{self._label(key_a)} vs {self._label(key_b)}",
+                    'fighter': self.names[f],
+                    'p_win': self.bout_wins[j, f] / self.n_sims,
+                })
+        return pd.DataFrame(rows)
+
+    def wins_distribution(self):
+        """
+        P(fighter wins exactly k bouts), one column per k.
+        """
+        return pd.DataFrame(self.win_counts / self.n_sims, index=self.names,
+                            columns=[f"{k}_wins" for k in range(self.win_counts.shape[1])])
+
+    def elo_table(self):
+        """
+        Starting elo and the distribution of the change over the plan.
+        """
+        mean = self.change_sum / self.n_sims
+        std = np.sqrt(np.maximum(self.change_sq / self.n_sims - mean ** 2, 0))
+        out = pd.DataFrame({'Fighter': self.names, 'ELO': self.start_elo, 'mean_change': mean, 'std_change': std})
+        for q in self.QUANTILES:
+            out[f"p{int(q * 100)}"] = [_percentiles(h, [q], ELO_RANGE)[0] for h in self.change_hist]
+        return out
+
+    def spread(self):
+        """
+        Distribution of the elo gap between the best and worst rated fighter after the plan.
+        """
+        mean = self.spread_sum / self.n_sims
+        out = {'mean': mean, 'std': math.sqrt(max(self.spread_sq / self.n_sims - mean ** 2, 0))}
+        out.update(zip((f"p{int(q * 100)}" for q in self.QUANTILES), _percentiles(self.spread_hist, self.QUANTILES)))
+        return out
+
+
+class Simulator:
+    """
+    Plays plans against the current fighter_stats. `mode` is 'elo' (expected
+    score) or 'model' (the trained predictor).
+    """
+    def __init__(self, stats_path=predictor.STATS_FILE, mode="elo", model=None, finish_probs=None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.stats = statssnapshot.load_columns(stats_path)
+        self.row_of = {}
+        for i, name in enumerate(self.stats['Fighter']):
+            self.row_of.setdefault(name, i)
+        self.model = (model or predictor.load_model()) if mode == "model" else None
+        self.finish_probs = np.asarray(finish_probs if finish_probs is not None else finish_mix(), dtype=np.float64)
+
+    def _start_state(self, names):
+        missing = [n for n in names if n not in self.row_of]
+        if missing:
+            raise KeyError(f"Unknown fighter(s): {', '.join(missing)}")
+        rows = [self.row_of[n] for n in names]
+
+        def column(col):
+            return np.array([self.stats[col][i] for i in rows], dtype=np.float64)
+        state = {
+            'mode': self.mode,
+            'elo': column('ELO'),
+            'k': np.array(ratingengine.k_table()),
+            'finish_mix': self.finish_probs,
+        }
+        if self.mode == "model":
+            state.update({
+                'model': self.model,
+                'streak': column('Streak'),
+                'inactive': column('Months_Inactive'),
+                'total': column('Total_Fights'),
+                'size': np.array([predictor.WEIGHT_ORDER.get(str(self.stats['Weight_Class'][i]), 0) for i in rows], dtype=np.int64),
+            })
+        return state
+
+    def run(self, rounds, n_sims=N_SIMS, seed=SEED, workers=WORKERS, batch_sims=BATCH_SIMS):
+        """
+        Simulates the plan `n_sims` times. Returns a SimResult.
+        """
+        start = time.perf_counter()
+        names, bouts = _compile(rounds)
+        state = self._start_state(names)
+        state['bouts'] = bouts
+
+        sizes = [min(batch_sims, n_sims - lo) for lo in range(0, n_sims, batch_sims)]
+        jobs = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker, initargs=(state,)) as pool:
+                results = list(pool.map(_simulate_batch, jobs))
+        else:
+            _init_worker(state)
+            try:
+                results = [_simulate_batch(job) for job in jobs]
+            finally:
+                _state.clear()
+
+        totals = {key: sum(r[key] for r in results) for key in results[0]}
+        return SimResult(names, bouts, state['elo'], n_sims, totals, time.perf_counter() - start)
+
+
+def simulate(rounds, n_sims=N_SIMS, mode="elo", seed=SEED, workers=WORKERS):
+    return Simulator(mode=mode).run(rounds, n_sims=n_sims, seed=seed, workers=workers)
+
+
+def _arg(flag, default, cast=str):
+    return cast(sys.argv[sys.argv.index(flag) + 1]) if flag in sys.argv else default
+
+def _names_after(flag):
+    # fighter names following `flag` up to the next --option
+    i = sys.argv.index(flag) + 1
+    names = []
+    while i < len(sys.argv) and not sys.argv[i].startswith("--"):
+        names.append(sys.argv[i])
+        i += 1
+    return names
+
+if __name__ == "__main__":
+    # python simulator.py --title "Champ" "Challenger 1" "Challenger 2" [--sims 1000000] [--mode model] [--workers 4] [--seed 7]
+    # python simulator.py --bracket A B C D ...
+    # python simulator.py --card "A vs B" "C vs D"
+    if "--title" in sys.argv:
+        champion, *challengers = _names_after("--title")
+        plan = title_run(champion, challengers)
+    elif "--bracket" in sys.argv:
+        plan = bracket(_names_after("--bracket"))
+    elif "--card" in sys.argv:
+        plan = card([tuple(s.strip() for s in bout.split(" vs ")) for bout in _names_after("--card")])
+    else:
+        sys.exit("Give a plan: --title, --bracket or --card")
+
+    result = Simulator(mode=_arg("--mode", "elo")).run(
+        plan,
+        n_sims=_arg("--sims", N_SIMS, int),
+        seed=_arg("--seed", SEED, int),
+        workers=_arg("--workers", WORKERS, int),
+    )
+    print(result.bout_table().to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\nLast bout:\n{result.champion().to_string(float_format=lambda v: f'{v:.4f}')}")
+    print(f"\n{result.elo_table().to_string(index=False, float_format=lambda v: f'{v:.1f}')}")
+    print(f"\nelo spread after the plan: {result.spread()}")
+    print(f"\n{result.n_sims} sims in {result.seconds:.2f}s")
@@ -0,0 +1,141 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# cold start profile of the dashboard. app.py calls mark() at a few points
+# (imports done, stats loaded, first render done); the marks are only kept
+# when FIGHTIQ_PROFILE=1, so a normal run pays one env lookup.
+#
+#   python startupprofile.py [--check]
+#
+# runs app.py once in a fresh interpreter under `python -X importtime` with
+# streamlit in bare mode, then writes startup_profile.json with the time to
+# first render, the marks and the slowest imports. --check compares against
+# the previous report and exits 1 (keeping the old report) if first render
+# got more than REGRESSION times slower.
+
+# config
+APP_FILE = "app.py"
+REPORT_FILE = "startup_profile.json"
+ENV_FLAG = "FIGHTIQ_PROFILE"
+REGRESSION = 1.2 # allowed slowdown of first_render_ms before --check fails
+TOP_IMPORTS = 15
+
+ENABLED = os.environ.get(ENV_FLAG) == "1"
+MARKS_PREFIX = "FIGHTIQ_MARK " # how the child process hands its marks back
+
+_start = time.perf_counter()
+_marks = []
+
+def mark(label):
+    """
+    Records ms since this module was first imported (i.e. since app.py started).
+    """
+    if ENABLED:
+        _marks.append((label, round((time.perf_counter() - _start) * 1000, 1)))
+        print(f"{MARKS_PREFIX}{label} {_marks[-1][1]}", file=sys.stderr, flush=True)
+
+def marks():
+    return dict(_marks)
+
+
+def parse_importtime(stderr):
+    """
+    `-X importtime` output -> [(module, self ms, cumulative ms)], slowest cumulative first.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|", 2)
+        rows.append((module.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return sorted(rows, key=lambda r: -r[2])
+
+def parse_marks(stderr):
+    found = {}
+    for line in stderr.splitlines():
+        if line.startswith(MARKS_PREFIX):
+            label, ms = line[len(MARKS_PREFIX):].rsplit(" ", 1)
+            found[label] = float(ms)
+    return found
+
+
+# run in the child: streamlit without a server ("bare mode"), st.* calls render nothing
+CHILD = '''
+import runpy, sys
+runpy.run_path(sys.argv[1], run_name="__main__")
+'''
+
+def profile_app(app_file=APP_FILE):
+    """
+    Times one cold run of `app_file`. Returns the report dict.
+    """
+    env = dict(os.environ, **{ENV_FLAG: "1"})
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD, app_file],
+                          capture_output=True, text=True, env=env)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{app_file} failed:\n{proc.stderr[-2000:]}")
+
+    found = parse_marks(proc.stderr)
+    imports = parse_importtime(proc.stderr)
+    return {
+        'app': app_file,
+        'profiled_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'wall_ms': round(wall_ms, 1),
+        'first_render_ms': found.get('first_render'),
+        'marks': found,
+        'top_imports': [{'module': m, 'self_ms': s, 'cumulative_ms': c} for m, s, c in imports[:TOP_IMPORTS]],
+    }
+
+def compare(report, previous):
+    """
+    Lines describing the change against `previous` and whether it's a regression.
+    """
+    if not previous or not previous.get('first_render_ms') or not report.get('first_render_ms'):
+        return [], False
+    ratio = report['first_render_ms'] / previous['first_render_ms']
+    lines = [f"first render {previous['first_render_ms']:.0f}ms -> {report['first_render_ms']:.0f}ms ({ratio:.2f}x)"]
+    for label, ms in report['marks'].items():
+        if label in previous.get('marks', {}):
+            lines.append(f"  {label:<16} {previous['marks'][label]:>8.1f} -> {ms:>8.1f} ms")
+    return lines, ratio > REGRESSION
+
+def read_report(path=REPORT_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    report = profile_app()
+    previous = read_report()
+
+    print(f"first render {report['first_render_ms']}ms (process {report['wall_ms']:.0f}ms)")
+    for label, ms in report['marks'].items():
+        print(f"  {label:<16} {ms:>8.1f} ms")
+    print("slowest imports (cumulative):")
+    for row in report['top_imports']:
+        print(f"  {row['module']:<40} {row['cumulative_ms']:>8.1f} ms")
+
+    lines, regressed = compare(report, previous)
+    for line in lines:
+        print(line)
+
+    if "--check" in sys.argv and regressed:
+        # previous report stays the baseline
+        print(f"Startup is more than {REGRESSION - 1:.0%} slower than the previous run")
+        sys.exit(1)
+
+    with open(REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved to {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import csv
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# typed binary snapshot of fighter_stats.csv (.npz, no pickle). Numbers are
+# stored as float32/int16, weight classes as categorical codes and names as
+# one newline-joined utf-8 blob. The snapshot embeds a schema version, the build
+# time and the hash of the csv it was written with, so a stale snapshot is
+# never preferred over a newer csv.
+#
+# pandas is only imported by the DataFrame functions; read_columns /
+# load_columns return plain lists so the dashboard can show stats before
+# pandas (or the model) is loaded.
+
+# config
+STATS_FILE = "fighter_stats.csv"
+SNAPSHOT_FILE = "fighter_stats.npz"
+SCHEMA_VERSION = 1
+
+FLOAT_COLUMNS = ['ELO', 'Avg_Opp_ELO', 'Months_Inactive']
+INT_COLUMNS = ['Streak', 'Total_Fights']
+# decimals used by the export; float32 values are rounded back to these
+# when exact float64 values are needed (model features)
+DECIMALS = {'ELO': 2, 'Avg_Opp_ELO': 2, 'Months_Inactive': 1}
+CSV_COLUMNS = ['Fighter', 'ELO', 'Streak', 'Avg_Opp_ELO', 'Months_Inactive', 'Total_Fights', 'Weight_Class']
+
+def csv_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".npz"
+
+def _pack_strings(values):
+    # names never contain newlines, so one joined utf-8 blob is enough
+    return np.frombuffer("\n".join(map(str, values)).encode("utf-8"), dtype=np.uint8)
+
+def _unpack_strings(blob):
+    return blob.tobytes().decode("utf-8").split("\n") if len(blob) else []
+
+
+def write_snapshot(stats, path=SNAPSHOT_FILE, source_csv=None):
+    """
+    Saves the stats DataFrame as a typed .npz snapshot.
+    """
+    import pandas as pd
+    weight = pd.Categorical(stats['Weight_Class'].astype(str))
+    meta = {
+        'schema_version': SCHEMA_VERSION,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'source_sha256': csv_hash(source_csv) if source_csv else "",
+    }
+
+    # few, wide members: every zip member costs time in np.load
+    arrays = {
+        'meta': np.array(json.dumps(meta)),
+        'fighters': _pack_strings(stats['Fighter']),
+        'weight_classes': _pack_strings(weight.categories),
+        'weight_codes': weight.codes.astype(np.int8),
+        'floats': np.vstack([stats[col].to_numpy(dtype=np.float32) for col in FLOAT_COLUMNS]),
+        'ints': np.vstack([stats[col].to_numpy(dtype=np.int16) for col in INT_COLUMNS]),
+    }
+
+    # write to a temp file first so readers never see a half written snapshot
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _read_arrays(path):
+    """
+    Raw snapshot columns: {'Fighter': [..], float/int columns as arrays,
+    'weight_codes': int8 array, 'weight_classes': [..]} and the meta dict.
+    """
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(str(z['meta']))
+        if meta.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(f"snapshot schema {meta.get('schema_version')}, expected {SCHEMA_VERSION}")
+
+        columns = {'Fighter': _unpack_strings(z['fighters'])}
+        columns.update(zip(FLOAT_COLUMNS, z['floats']))
+        columns.update(zip(INT_COLUMNS, z['ints']))
+        columns['weight_codes'] = z['weight_codes']
+        columns['weight_classes'] = _unpack_strings(z['weight_classes'])
+    return columns, meta
+
+def read_snapshot(path=SNAPSHOT_FILE):
+    """
+    Loads a snapshot into a DataFrame with the same columns as the csv.
+    Returns (DataFrame, meta dict).
+    """
+    import pandas as pd
+    columns, meta = _read_arrays(path)
+    columns['Weight_Class'] = pd.Categorical.from_codes(columns.pop('weight_codes'), columns.pop('weight_classes'))
+    df = pd.DataFrame(columns)[CSV_COLUMNS]
+    return df, meta
+
+def read_columns(path=SNAPSHOT_FILE):
+    """
+    Snapshot as {column: list} without pandas, floats back at the export's rounding.
+    Returns (columns, meta dict).
+    """
+    arrays, meta = _read_arrays(path)
+    columns = {'Fighter': arrays['Fighter']}
+    for col in FLOAT_COLUMNS:
+        columns[col] = arrays[col].astype(np.float64).round(DECIMALS[col]).tolist()
+    for col in INT_COLUMNS:
+        columns[col] = arrays[col].tolist()
+    classes = arrays['weight_classes']
+    columns['Weight_Class'] = [classes[c] if c >= 0 else "" for c in arrays['weight_codes'].tolist()]
+    return columns, meta
+
+
+def _current_snapshot(csv_path, reader):
+    # snapshot contents if it exists, is readable and was built from this csv;
+    # one written without a source hash can't show that, so it's rebuilt too
+    path = snapshot_path(csv_path)
+    if os.path.exists(path):
+        try:
+            data, meta = reader(path)
+            if not os.path.exists(csv_path) or meta['source_sha256'] == csv_hash(csv_path):
+                return data
+        except (OSError, ValueError, KeyError):
+            pass
+    return None
+
+def load_stats(csv_path=STATS_FILE):
+    """
+    Prefers the binary snapshot next to `csv_path`, falls back to the csv
+    when the snapshot is missing, unreadable or was built from another csv.
+    """
+    df = _current_snapshot(csv_path, read_snapshot)
+    if df is None:
+        import pandas as pd
+        df = pd.read_csv(csv_path)
+    return df
+
+def load_columns(csv_path=STATS_FILE):
+    """
+    load_stats without pandas: {column: list} from the snapshot, or parsed
+    from the csv with the csv module.
+    """
+    columns = _current_snapshot(csv_path, read_columns)
+    if columns is None:
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        columns = {col: [r[col] for r in rows] for col in (rows[0].keys() if rows else CSV_COLUMNS)}
+        for col in FLOAT_COLUMNS + INT_COLUMNS:
+            if col in columns:
+                convert = float if col in FLOAT_COLUMNS else int
+                columns[col] = [convert(v) for v in columns[col]]
+    return columns
+
+
+def exact(stats, col):
+    """
+    float64 column with the export's rounding restored (undoes float32 storage).
+    """
+    values = stats[col].to_numpy(dtype=np.float64)
+    if col in DECIMALS and stats[col].dtype == np.float32:
+        values = values.round(DECIMALS[col])
+    return values
+
+
+if __name__ == "__main__":
+    # rebuild the snapshot from an existing csv
+    import pandas as pd
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else STATS_FILE
+    write_snapshot(pd.read_csv(csv_path), snapshot_path(csv_path), source_csv=csv_path)
+    print(f"Wrote {snapshot_path(csv_path)}")
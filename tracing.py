@@ -0,0 +1,300 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+# lightweight instrumentation for the scrapers, the rating / feature replay,
+# model loading and prediction. Off unless FIGHTIQ_TRACE=1; when off, span()
+# hands back one shared no-op context manager, count() returns straight away
+# and @timed leaves the function untouched, so the hooks can stay in the code.
+#
+# when on, every span is buffered and appended to TRACE_FILE as JSON lines
+# ({"type": "span", "name", "start", "ms", "parent", "thread", ...attrs}),
+# followed at exit by the counter and span totals of the run. The same
+# totals are written in Prometheus text format to METRICS_FILE (textfile
+# collector style), and predictserver.py serves them on GET /metrics.
+#
+# FIGHTIQ_SAMPLE=1 also starts a sampling profiler for the run: every
+# 1/SAMPLE_HZ seconds the stacks of all threads are recorded, and at exit
+# STACKS_FILE gets them in folded format ("thread;file:func;... count"),
+# which flamegraph.pl and speedscope read directly. Or, for any script:
+#
+#   python tracing.py --profile eloengine.py [args]   -> sampled run of one script
+#   python tracing.py [trace file]                    -> span totals of the last traced run
+
+# config
+ENV_FLAG = "FIGHTIQ_TRACE"
+SAMPLE_FLAG = "FIGHTIQ_SAMPLE"
+TRACE_FILE = "trace.jsonl"
+METRICS_FILE = "metrics.prom"
+STACKS_FILE = "stacks.folded"
+SAMPLE_HZ = 100
+FLUSH_EVERY = 1000 # buffered span events before they're appended to TRACE_FILE
+METRIC_PREFIX = "fightiq"
+
+ENABLED = os.environ.get(ENV_FLAG) == "1"
+SAMPLING = os.environ.get(SAMPLE_FLAG) == "1"
+
+RUN_ID = f"{os.path.basename(sys.argv[0] or 'python')}-{os.getpid()}-{int(time.time())}"
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+_lock = threading.Lock()
+_local = threading.local()
+_events = []
+_counters = Counter()
+_timers = defaultdict(lambda: [0, 0.0, 0.0]) # name -> [count, total s, max s]
+_start = time.perf_counter()
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "t0", "parent")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # attributes only known once the work is done (rows written, cache hit...)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1] if stack else None
+        stack.append(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        seconds = time.perf_counter() - self.t0
+        _local.stack.pop()
+        event = {
+            'type': "span", 'run': RUN_ID, 'name': self.name,
+            'start': round((self.t0 - _start) * 1000, 3), 'ms': round(seconds * 1000, 3),
+            'parent': self.parent, 'thread': threading.current_thread().name,
+        }
+        if exc_type is not None:
+            event['error'] = exc_type.__name__
+        event.update(self.attrs)
+        with _lock:
+            timer = _timers[self.name]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+            _events.append(event)
+            full = len(_events) >= FLUSH_EVERY
+        if full:
+            flush_events()
+        return False
+
+
+def span(name, **attrs):
+    """
+    with span("db.save_batch", events=25): ... -> one timed span (a no-op when tracing is off).
+    """
+    if not ENABLED:
+        return _NOOP
+    return _Span(name, attrs)
+
+def timed(name=None):
+    """
+    Decorator version of span(); returns the function itself when tracing is off.
+    """
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with _Span(label, {}):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+def count(name, n=1):
+    """
+    Adds n to a counter (http.cache_hit, db.rows_written...).
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] += n
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+def timers():
+    """
+    {span name: {'count', 'total_s', 'max_s'}} for this process.
+    """
+    with _lock:
+        return {k: {'count': c, 'total_s': total, 'max_s': peak} for k, (c, total, peak) in _timers.items()}
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus_text():
+    """
+    Counters and span timings in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, value in sorted(counters().items()):
+        metric = f"{METRIC_PREFIX}_{_metric_name(name)}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    spans = sorted(timers().items())
+    if spans:
+        metric = f"{METRIC_PREFIX}_span_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for name, t in spans:
+            lines.append(f'{metric}_count{{span="{name}"}} {t["count"]}')
+            lines.append(f'{metric}_sum{{span="{name}"}} {t["total_s"]:.6f}')
+        lines.append(f"# TYPE {metric}_max gauge")
+        for name, t in spans:
+            lines.append(f'{metric}_max{{span="{name}"}} {t["max_s"]:.6f}')
+    return "\n".join(lines) + "\n"
+
+def flush_events(path=TRACE_FILE):
+    with _lock:
+        events = _events[:]
+        _events.clear()
+    if events:
+        with open(path, "a") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in events))
+
+def flush(trace_path=TRACE_FILE, metrics_path=METRICS_FILE):
+    """
+    Appends the buffered spans plus this run's totals to the trace, rewrites the metrics file.
+    """
+    flush_events(trace_path)
+    summary = [{'type': "counter", 'run': RUN_ID, 'name': k, 'value': v} for k, v in sorted(counters().items())]
+    summary += [{'type': "timer", 'run': RUN_ID, 'name': k, **t} for k, t in sorted(timers().items())]
+    if summary:
+        with open(trace_path, "a") as f:
+            f.write("".join(json.dumps(e) + "\n" for e in summary))
+    with open(metrics_path, "w") as f:
+        f.write(prometheus_text())
+
+
+class Sampler(threading.Thread):
+    """
+    Records the stack of every thread SAMPLE_HZ times a second into folded-stack counts.
+    """
+    def __init__(self, hz=SAMPLE_HZ):
+        super().__init__(name="tracing-sampler", daemon=True)
+        self.interval = 1 / hz
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self, path=STACKS_FILE):
+        self.stopped.set()
+        self.join()
+        with open(path, "w") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        return sum(self.stacks.values())
+
+_sampler = None
+
+def start_sampler(hz=SAMPLE_HZ):
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(hz)
+        _sampler.start()
+    return _sampler
+
+def stop_sampler(path=STACKS_FILE):
+    global _sampler
+    if _sampler is None:
+        return 0
+    samples = _sampler.stop(path)
+    _sampler = None
+    return samples
+
+
+if ENABLED:
+    atexit.register(flush)
+if SAMPLING:
+    start_sampler()
+    atexit.register(stop_sampler)
+
+
+def read_trace(path=TRACE_FILE, run=None):
+    """
+    Events of one run from a trace file (the last run by default).
+    """
+    with open(path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    run = run or (events[-1]['run'] if events else None)
+    return [e for e in events if e.get('run') == run]
+
+def profile_script(script, args=(), hz=SAMPLE_HZ, path=STACKS_FILE):
+    """
+    Runs a script in this process with the sampler on, like `python script args`.
+    """
+    import runpy
+    sys.argv = [script, *args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    start_sampler(hz)
+    start = time.perf_counter()
+    try:
+        runpy.run_path(script, run_name="__main__")
+    finally:
+        samples = stop_sampler(path)
+        print(f"\n{samples} samples over {time.perf_counter() - start:.1f}s -> {path} (flamegraph.pl {path} > flame.svg)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    if "--profile" in sys.argv:
+        i = sys.argv.index("--profile")
+        profile_script(sys.argv[i + 1], sys.argv[i + 2:])
+        sys.exit(0)
+
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE
+    events = read_trace(path)
+    if not events:
+        sys.exit(f"No traced runs in {path} (run a script with {ENV_FLAG}=1)")
+    print(f"run {events[0]['run']}")
+    print(f"\n{'span':<32} {'count':>7} {'total ms':>10} {'max ms':>9}")
+    for e in sorted((e for e in events if e['type'] == "timer"), key=lambda e: -e['total_s']):
+        print(f"{e['name']:<32} {e['count']:>7} {e['total_s'] * 1000:>10.1f} {e['max_s'] * 1000:>9.1f}")
+    counts = [e for e in events if e['type'] == "counter"]
+    if counts:
+        print(f"\n{'counter':<32} {'value':>7}")
+        for e in counts:
+            print(f"{e['name']:<32} {e['value']:>7}")
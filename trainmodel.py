@@ -1,3 +1,5 @@
+import sys
+
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
@@ -5,33 +7,62 @@ from sklearn.ensemble import RandomForestClassifier # Adding a stronger brain
 from sklearn.metrics import accuracy_score
 import joblib
 
-# load data
-print("Loading V2 training data...")
-df = pd.read_csv("ufc_training_data_v2.csv")
+import forestmodel
+import preptrainingdata
+
+# config
+FEATURES = preptrainingdata.FEATURES
+
+def make_model():
+    # (using random forest because its better at complex patterns)
+    return RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42)
+
+def load_training_data():
+    """
+    (X, y): memory-mapped from training_data/ (preptrainingdata.py), the csv if that isn't built.
+    """
+    data = preptrainingdata.load()
+    if data is None:
+        df = pd.read_csv(preptrainingdata.CSV_FILE)
+        return df[FEATURES], df['target']
+    X, y, _ = data
+    # copy=False keeps the DataFrame on the memmap, the names are only there for feature_names_in_
+    return pd.DataFrame(X, columns=FEATURES, copy=False), y
+
+def main():
+    # load data
+    print("Loading V2 training data...")
+    X, y = load_training_data()
 
-# prepare data
-features = ['elo_diff', 'streak_diff', 'months_since_diff', 'exp_diff']
-X = df[features]
-y = df['target']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # train
+    print("Training Random Forest Model...")
+    model = make_model()
+    model.fit(X_train, y_train)
 
-# train (using random forest because its better at complex patterns)
-print("Training Random Forest Model...")
-model = RandomForestClassifier(n_estimators=100, max_depth=5, random_state=42)
-model.fit(X_train, y_train)
+    # evaluate
+    predictions = model.predict(X_test)
+    acc = accuracy_score(y_test, predictions)
 
-# evaluate
-predictions = model.predict(X_test)
-acc = accuracy_score(y_test, predictions)
+    print(f"\n--- UPGRADED MODEL RESULTS ---")
+    print(f"Accuracy: {acc:.2%}")
+    print("(random split, future fights leak into training: python trainmodel.py --walk-forward)")
 
-print(f"\n--- UPGRADED MODEL RESULTS ---")
-print(f"Accuracy: {acc:.2%}")
+    # feature importance
+    importances = model.feature_importances_
+    print("\n--- WHAT MATTERS MOST? ---")
+    for feature, importance in zip(FEATURES, importances):
+        print(f"{feature}: {importance:.1%}")
 
-# feature importance
-importances = model.feature_importances_
-print("\n--- WHAT MATTERS MOST? ---")
-for feature, importance in zip(features, importances):
-    print(f"{feature}: {importance:.1%}")
+    joblib.dump(model, "ufc_predictor_v2.pkl")
+    # packed numpy copy used for inference (no sklearn import at startup)
+    forestmodel.export(model, "ufc_predictor_v2.npz", source="ufc_predictor_v2.pkl")
 
-joblib.dump(model, "ufc_predictor_v2.pkl")
\ No newline at end of file
+if __name__ == "__main__":
+    if "--walk-forward" in sys.argv:
+        # train on everything before each year, predict that year (backtest.py)
+        import backtest
+        backtest.run()
+    else:
+        main()
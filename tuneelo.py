@@ -0,0 +1,299 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import ratingengine
+
+# random search over the elo engine parameters. Candidates are replayed
+# together by replay_batch, which keeps a (fighters x configs) ratings array
+# and updates every config with numpy broadcasting (a run of fights with no
+# fighter in common is applied as one step), and are scored
+# by the log-loss of the pre-fight expected score on chronological fights:
+# the tuning window picks the winner and the later holdout window is only
+# reported. The encoded fights are saved once as .npy and memory-mapped by
+# the pool workers, each of which replays one chunk of candidates.
+# expected_scores is the scalar kernel, kept as the reference (--check). The best set is written to
+# engine_config.json, which ratingengine (and so every consumer) loads.
+#
+# STARTING_ELO is not searched: updates are zero-sum and the decay pulls
+# towards it, so expected scores don't depend on it.
+
+# config
+TRIALS = 256
+SEED = 7
+TUNE_FROM = "January 01, 2005"
+HOLDOUT_FROM = "January 01, 2020"
+WORKERS = os.cpu_count() or 1
+
+SEARCH_SPACE = {
+    'K_FACTOR_BASE': (12.0, 80.0),
+    'KO_MULTIPLIER': (1.0, 2.0),
+    'ROUND_1_KO_MULTIPLIER': (1.0, 1.6),
+    'SUB_MULTIPLIER': (1.0, 2.0),
+    'INACTIVITY_DECAY': (0.0, 0.3),
+}
+
+_data = {} # per worker: memory-mapped fights
+
+def encode(history):
+    """
+    (n, 4) int32 array of winner, loser, day, finish type.
+    """
+    return np.column_stack([history.winner, history.loser, history.day, history.finish]).astype(np.int32)
+
+def expected_scores(fights, n_fighters, params):
+    """
+    Replays `fights` with `params`, returns the winner's pre-fight expected score per fight.
+    Same maths as ratingengine.replay.
+    """
+    start = float(params['STARTING_ELO'])
+    decay = params['INACTIVITY_DECAY']
+    k_of = ratingengine.k_table(params)
+    debut = ratingengine.DEBUT_LAYOFF_DAYS
+
+    elo = [start] * n_fighters
+    last = [None] * n_fighters
+    out = np.empty(len(fights))
+
+    for i, (w, l, d, finish) in enumerate(fights.tolist()):
+        if last[w] is None: last[w] = d - debut
+        elif decay: elo[w] = start + (elo[w] - start) * (1 - decay) ** ((d - last[w]) / 365)
+        if last[l] is None: last[l] = d - debut
+        elif decay: elo[l] = start + (elo[l] - start) * (1 - decay) ** ((d - last[l]) / 365)
+
+        r_w = elo[w]
+        r_l = elo[l]
+        p = 1 / (1 + 10 ** ((r_l - r_w) / 400))
+        out[i] = p
+
+        change = k_of[finish] * (1 - p)
+        elo[w] = r_w + change
+        elo[l] = r_l - change
+        last[w] = d
+        last[l] = d
+
+    return out
+
+def independent_runs(fights):
+    """
+    Splits the (date ordered) fights into consecutive runs in which no
+    fighter appears twice. Within a run no fight depends on another, so a
+    whole run (usually most of a card) can be updated at once.
+    Returns the run boundaries.
+    """
+    bounds = [0]
+    seen = set()
+    for i, (w, l) in enumerate(fights[:, :2].tolist()):
+        if w in seen or l in seen:
+            bounds.append(i)
+            seen = set()
+        seen.add(w)
+        seen.add(l)
+    bounds.append(len(fights))
+    return bounds
+
+def replay_batch(fights, n_fighters, candidates):
+    """
+    Replays `fights` once for every params dict in `candidates`.
+    Returns (expected, elo): the winner's pre-fight expected score as a
+    (fights, configs) array and the final ratings as (fighters, configs).
+    Same maths as expected_scores, broadcast over configs and over the
+    fights of each independent run.
+    """
+    start = np.array([float(p['STARTING_ELO']) for p in candidates])
+    keep = 1 - np.array([float(p['INACTIVITY_DECAY']) for p in candidates])
+    decay = bool(np.any(keep != 1))
+    k_of = np.array([ratingengine.k_table(p) for p in candidates]).T # (finish type, configs)
+    debut = ratingengine.DEBUT_LAYOFF_DAYS
+
+    elo = np.tile(start, (n_fighters, 1))
+    last = np.zeros(n_fighters, dtype=np.int64)
+    seen = np.zeros(n_fighters, dtype=bool)
+    out = np.empty((len(fights), len(candidates)))
+
+    fights = np.asarray(fights, dtype=np.int64)
+    bounds = independent_runs(fights)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        w, l, d, finish = fights[lo:hi].T
+
+        # debutants come off a DEBUT_LAYOFF_DAYS layoff, everyone else decays over the gap
+        for f in (w, l):
+            new = ~seen[f]
+            last[f[new]] = d[new] - debut
+            if decay and not new.all():
+                old = f[~new]
+                gap = ((d[~new] - last[old]) / 365)[:, None]
+                elo[old] = start + (elo[old] - start) * keep ** gap
+
+        r_w = elo[w]
+        r_l = elo[l]
+        p = 1 / (1 + 10 ** ((r_l - r_w) / 400))
+        out[lo:hi] = p
+
+        change = k_of[finish] * (1 - p)
+        elo[w] = r_w + change
+        elo[l] = r_l - change
+        last[w] = d
+        last[l] = d
+        seen[w] = True
+        seen[l] = True
+
+    return out, elo
+
+def batch_scores(expected):
+    """
+    Per config (column) log-loss / Brier / accuracy arrays.
+    """
+    p = np.clip(expected, 1e-12, 1)
+    return {
+        'log_loss': -np.mean(np.log(p), axis=0),
+        'brier': np.mean((1 - p) ** 2, axis=0),
+        'accuracy': np.mean(p > 0.5, axis=0) + 0.5 * np.mean(p == 0.5, axis=0),
+    }
+
+def scores(p):
+    """
+    Log-loss / Brier / accuracy of expected scores (every row is a win for the first fighter).
+    """
+    p = np.clip(p, 1e-12, 1)
+    return {
+        'log_loss': float(-np.mean(np.log(p))),
+        'brier': float(np.mean((1 - p) ** 2)),
+        'accuracy': float(np.mean(p > 0.5) + 0.5 * np.mean(p == 0.5)),
+    }
+
+def sample(rng, n, base):
+    """
+    `n` random parameter sets; the first one is the current config.
+    """
+    candidates = [dict(base)]
+    for _ in range(n - 1):
+        params = dict(base)
+        for key, (lo, hi) in SEARCH_SPACE.items():
+            params[key] = round(float(rng.uniform(lo, hi)), 4)
+        candidates.append(params)
+    return candidates
+
+
+def _init_worker(data_dir, n_fighters, tune, holdout):
+    _data['fights'] = np.load(os.path.join(data_dir, "fights.npy"), mmap_mode="r")
+    _data['n_fighters'] = n_fighters
+    _data['tune'] = tune
+    _data['holdout'] = holdout
+
+def _evaluate(candidates):
+    expected, _ = replay_batch(np.asarray(_data['fights']), _data['n_fighters'], candidates)
+    tuned = batch_scores(expected[_data['tune']:_data['holdout']])
+    held = batch_scores(expected[_data['holdout']:])
+    return [
+        (params, {k: float(v[c]) for k, v in tuned.items()}, {k: float(v[c]) for k, v in held.items()})
+        for c, params in enumerate(candidates)
+    ]
+
+
+def tune(trials=TRIALS, workers=WORKERS, seed=SEED, out_path=ratingengine.CONFIG_FILE):
+    start = time.perf_counter()
+    history = ratingengine.load_history()
+    fights = encode(history)
+    tune_from = int(np.searchsorted(history.day, ratingengine.parse_date(TUNE_FROM)))
+    holdout_from = int(np.searchsorted(history.day, ratingengine.parse_date(HOLDOUT_FROM)))
+    print(f"{len(fights)} fights: tuning on {holdout_from - tune_from}, holdout {len(fights) - holdout_from}")
+
+    candidates = sample(np.random.default_rng(seed), trials, ratingengine.config())
+
+    data_dir = tempfile.mkdtemp(prefix="tuneelo_")
+    try:
+        np.save(os.path.join(data_dir, "fights.npy"), fights)
+        init = (data_dir, len(history.names), tune_from, holdout_from)
+        # one vectorized chunk of candidates per worker
+        chunks = [candidates[i::workers] for i in range(workers) if candidates[i::workers]]
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker, initargs=init) as pool:
+                results = [r for chunk in pool.map(_evaluate, chunks) for r in chunk]
+        else:
+            _init_worker(*init)
+            results = _evaluate(candidates)
+    finally:
+        _data.clear()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    # by value: results from the pool are unpickled copies
+    current = next(r for r in results if r[0] == candidates[0])
+    best = min(results, key=lambda r: r[1]['log_loss'])
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{trials} candidates with {workers} worker(s) in {elapsed:.1f}s")
+    for label, (params, tuned, held) in (("current", current), ("best", best)):
+        print(f"{label:<8} tune log-loss {tuned['log_loss']:.4f}  holdout log-loss {held['log_loss']:.4f}"
+              f"  brier {held['brier']:.4f}  accuracy {held['accuracy']:.2%}")
+    print(json.dumps(best[0], indent=2))
+
+    with open(out_path, "w") as f:
+        json.dump({
+            'params': best[0],
+            'tune': best[1],
+            'holdout': best[2],
+            'trials': trials,
+            'tuned_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2)
+    print(f"Saved to {out_path}, rerun eloengine.py / exportcurrentstats.py to apply it")
+    return best
+
+
+def check(configs=4, seed=SEED):
+    """
+    replay_batch vs the scalar engine (ratingengine.replay with
+    get_expected_score / get_k_factor) for the current config and a few
+    random ones, then a small tune() with 1 and 2 workers. Returns the
+    largest difference seen.
+    """
+    history = ratingengine.load_history()
+    fights = encode(history)
+    base = ratingengine.config()
+    candidates = sample(np.random.default_rng(seed), configs, base)
+
+    start = time.perf_counter()
+    expected, elo = replay_batch(fights, len(history.names), candidates)
+    batch_secs = time.perf_counter() - start
+
+    worst = 0.0
+    start = time.perf_counter()
+    try:
+        for c, params in enumerate(candidates):
+            vars(ratingengine).update(params)
+            # reloaded so the k-factors are recomputed with this config
+            result = ratingengine.replay(ratingengine.load_history())
+            reference = ratingengine.get_expected_score(result.elo_w, result.elo_l)
+            worst = max(worst, np.abs(expected[:, c] - reference).max(), np.abs(elo[:, c] - result.elo).max())
+    finally:
+        vars(ratingengine).update(base)
+    scalar_secs = time.perf_counter() - start
+
+    print(f"{len(candidates)} configs: batch {batch_secs:.2f}s, scalar {scalar_secs:.2f}s, max difference {worst:.2e}")
+
+    # the pool path of tune() has to pick the same winner as the in-process one
+    out_dir = tempfile.mkdtemp(prefix="tuneelo_check_")
+    try:
+        single = tune(trials=configs * 2, workers=1, seed=seed, out_path=os.path.join(out_dir, "single.json"))
+        pooled = tune(trials=configs * 2, workers=2, seed=seed, out_path=os.path.join(out_dir, "pooled.json"))
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    if pooled[0] != single[0]:
+        print("2 workers picked a different config than 1")
+        return float("inf")
+    worst = max(worst, abs(pooled[1]['log_loss'] - single[1]['log_loss']))
+    return worst
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        sys.exit(0 if check() < 1e-9 else 1)
+    trials = int(sys.argv[sys.argv.index("--trials") + 1]) if "--trials" in sys.argv else TRIALS
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else WORKERS
+    tune(trials=trials, workers=workers)